@@ -6,6 +6,24 @@ load_dotenv()
 TURSO_DATABASE_URL = os.getenv("TURSO_DATABASE_URL")
 TURSO_AUTH_TOKEN = os.getenv("TURSO_AUTH_TOKEN")
 
+# Upper bound on concurrent database connections (one per worker thread)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+# How often each worker reloads the cached movement/equipment vocabulary
+VOCABULARY_REFRESH_SECONDS = int(os.getenv("VOCABULARY_REFRESH_SECONDS", "60"))
+
+# Local-first mode: reads and writes use a plain local database and a
+# background thread pushes changes to Turso (see app/services/replica_sync.py)
+LOCAL_FIRST = os.getenv("LOCAL_FIRST", "").lower() in ("1", "true", "yes")
+LOCAL_DATABASE_PATH = os.getenv("LOCAL_DATABASE_PATH", "local.db")
+# A local database file to push to instead of Turso, e.g. for testing
+SYNC_UPSTREAM_PATH = os.getenv("SYNC_UPSTREAM_PATH")
+# Changes are pushed once writes pause this long, and at least this often
+SYNC_DEBOUNCE_SECONDS = float(os.getenv("SYNC_DEBOUNCE_SECONDS", "2"))
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "30"))
+# Cap on the delay between retries while the upstream is unreachable
+SYNC_MAX_BACKOFF_SECONDS = float(os.getenv("SYNC_MAX_BACKOFF_SECONDS", "300"))
+
 EQUIPMENT_TYPES = [
     "dumbbell",
     "barbell",
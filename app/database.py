@@ -1,83 +1,134 @@
+import threading
+from contextlib import contextmanager, nullcontext
+
 import libsql_experimental as libsql
-from app.config import TURSO_DATABASE_URL, TURSO_AUTH_TOKEN, EQUIPMENT_TYPES
+from app.config import (
+    LOCAL_DATABASE_PATH,
+    LOCAL_FIRST,
+    SYNC_UPSTREAM_PATH,
+    TURSO_AUTH_TOKEN,
+    TURSO_DATABASE_URL,
+)
 
-_client = None
+# How long a local-first write waits for another connection's transaction
+BUSY_TIMEOUT_MS = 5000
 
+# The embedded replica's local file
+REPLICA_PATH = "local_replica.db"
 
-def get_db():
-    """Get database client (singleton)."""
-    global _client
-    if _client is None:
-        _client = libsql.connect(
-            database="local_replica.db",
-            sync_url=TURSO_DATABASE_URL,
-            auth_token=TURSO_AUTH_TOKEN,
-        )
-        _client.sync()
-    return _client
-
-
-def init_db():
-    """Initialize database schema."""
-    client = get_db()
-
-    # Create tables
-    client.execute("""
-        CREATE TABLE IF NOT EXISTS movements (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
-        )
-    """)
-
-    client.execute("""
-        CREATE TABLE IF NOT EXISTS equipment_types (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE
-        )
-    """)
-
-    client.execute("""
-        CREATE TABLE IF NOT EXISTS weightlifting_set (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            movement TEXT NOT NULL,
-            equipment_type TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            n_of_reps INTEGER NOT NULL,
-            weight REAL NOT NULL
-        )
-    """)
-
-    client.execute("""
-        CREATE TABLE IF NOT EXISTS cardio_set (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            movement TEXT NOT NULL,
-            equipment_type TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            distance REAL NOT NULL,
-            duration REAL NOT NULL,
-            power_output REAL DEFAULT 0
-        )
-    """)
-
-    # Create indexes
-    client.execute(
-        "CREATE INDEX IF NOT EXISTS idx_weightlifting_movement ON weightlifting_set(movement)"
-    )
-    client.execute(
-        "CREATE INDEX IF NOT EXISTS idx_weightlifting_timestamp ON weightlifting_set(timestamp)"
+_local = threading.local()
+
+# The one connection that syncs the replica and writes to Turso, and the lock
+# that serialises its use (see get_write_db)
+_replica = None
+_replica_lock = threading.RLock()
+
+
+def connect_replica():
+    """Open a new connection to the embedded replica of the Turso database."""
+    return libsql.connect(
+        database=REPLICA_PATH,
+        sync_url=TURSO_DATABASE_URL,
+        auth_token=TURSO_AUTH_TOKEN,
     )
 
-    # Seed default equipment types
-    for eq_type in EQUIPMENT_TYPES:
+
+def connect():
+    """
+    Open a new connection to the database the app reads.
+
+    That is the embedded replica's local file, read as a plain database, or
+    in LOCAL_FIRST mode a plain local database that never waits on the
+    network and is written through the same kind of connection.
+    """
+    if LOCAL_FIRST:
+        client = libsql.connect(database=LOCAL_DATABASE_PATH)
+        # WAL: commits append to the log, and readers (the sync thread among
+        # them) never wait on the writer
+        client.execute("PRAGMA journal_mode=WAL")
+        # Writers (the set writer, background imports, the sync thread's
+        # outbox cleanup) wait for each other's short transactions instead
+        # of failing with "database is locked"
+        client.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        return client
+    return libsql.connect(database=REPLICA_PATH)
+
+
+def connect_upstream():
+    """
+    Open a connection to the database local-first changes are pushed to.
+
+    That is the Turso replica, or SYNC_UPSTREAM_PATH standing in for it.
+    """
+    if SYNC_UPSTREAM_PATH:
+        return libsql.connect(database=SYNC_UPSTREAM_PATH)
+    return connect_replica()
+
+
+def pull_upstream(upstream):
+    """Bring an upstream connection up to date; a stand-in file has nothing to pull."""
+    if not SYNC_UPSTREAM_PATH:
+        upstream.sync()
+
+
+def get_db():
+    """
+    Get the database client for the calling thread.
+
+    libsql connections are blocking, so request handlers that query run in
+    the threadpool (sized by DB_POOL_SIZE) and each worker thread lazily opens
+    and keeps its own connection. Without LOCAL_FIRST these only read the
+    replica's file, after it was first synced; write with get_write_db().
+    """
+    client = getattr(_local, "client", None)
+    if client is None:
+        if not LOCAL_FIRST:
+            get_write_db()
+        client = connect()
+        _local.client = client
+    return client
+
+
+def get_write_db():
+    """
+    Get the client to write with.
+
+    Embedded replicas opened separately on one file would each sync it and
+    forward writes on their own, so there is exactly one replica connection,
+    opened and synced once per process, and every write goes through it.
+    Threads share it: write only inside transaction(), which holds it for
+    the whole transaction. In LOCAL_FIRST mode every thread writes through
+    its own get_db() connection instead, and SQLite's busy timeout
+    serialises them.
+    """
+    global _replica
+    if LOCAL_FIRST:
+        return get_db()
+    with _replica_lock:
+        if _replica is None:
+            _replica = connect_replica()
+            _replica.sync()
+        return _replica
+
+
+@contextmanager
+def transaction(db):
+    """
+    Run the enclosed statements in a single transaction.
+
+    Connections follow DB-API implicit transactions: a write outside this
+    block opens a transaction that holds the write lock until committed, and
+    BEGIN would then fail. Such a leftover is committed first. On the shared
+    replica connection the block waits for other threads' transactions.
+    """
+    with _replica_lock if db is _replica else nullcontext():
+        if db.in_transaction:
+            db.commit()
+        db.execute("BEGIN")
         try:
-            client.execute(
-                "INSERT OR IGNORE INTO equipment_types (name) VALUES (?)", [eq_type]
-            )
+            yield db
         except Exception:
-            pass
+            db.rollback()
+            raise
+        db.commit()
 
-    # Seed default movements table if empty
-    try:
-        client.execute("INSERT OR IGNORE INTO movements (name) VALUES (?)", ["bench press"])
-    except Exception:
-        pass
@@ -0,0 +1,108 @@
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.database import get_db
+from app.services import fragment_cache
+from app.templating import render, render_tabs
+
+# Pages that never depend on the data: (template, active tab or None)
+STATIC_PAGES = (
+    ("index.html", None),
+    ("partials/logger_form.html", "logger"),
+    ("partials/visualizer.html", "history"),
+    ("partials/import_form.html", "import"),
+)
+
+# (template, active tab) -> (content, etag)
+_static_pages: Dict[Tuple[str, Optional[str]], Tuple[str, str]] = {}
+
+
+def _etag(value: str) -> str:
+    return '"%s"' % hashlib.blake2b(value.encode(), digest_size=8).hexdigest()
+
+
+def _build_id() -> str:
+    """A digest of the app's code and templates, the same in every worker of one deploy."""
+    digest = hashlib.blake2b(digest_size=8)
+    root = Path(__file__).parent
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and "__pycache__" not in path.parts:
+            digest.update(str(path.relative_to(root)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+# Part of every fragment ETag, so browsers don't keep old markup after a deploy
+BUILD_ID = _build_id()
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match", "")
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _respond(request: Request, content: str, etag: str, media_type: str = "text/html") -> Response:
+    # no-cache: the browser keeps the body but revalidates every request
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def _render_static(template_name: str, active_tab: Optional[str]) -> Tuple[str, str]:
+    content = render(template_name, {})
+    if active_tab is not None:
+        content += render_tabs(active_tab)
+    return content, _etag(content)
+
+
+def prerender_static_pages():
+    """Render every static page once, at startup."""
+    for template_name, active_tab in STATIC_PAGES:
+        _static_pages[(template_name, active_tab)] = _render_static(template_name, active_tab)
+
+
+def static_page(request: Request, template_name: str, active_tab: Optional[str] = None) -> Response:
+    """Serve a pre-rendered page, with the tab bar swapped in when `active_tab` is set."""
+    key = (template_name, active_tab)
+    if key not in _static_pages:
+        _static_pages[key] = _render_static(template_name, active_tab)
+    content, etag = _static_pages[key]
+    return _respond(request, content, etag)
+
+
+def cached_fragment(
+    request: Request,
+    key: tuple,
+    render: Callable[[], str],
+    media_type: str = "text/html",
+    version: Optional[int] = None,
+) -> Response:
+    """
+    Serve an HTML (or `media_type`) fragment that only changes when the data does.
+
+    `key` must identify everything the fragment depends on besides the
+    data (endpoint, query parameters). Fragments are rendered once per data
+    version and served from memory after that. The ETag lets the browser
+    revalidate, so an unchanged fragment costs a 304 with no body.
+
+    `render` must read the data itself, after the version is read, so a
+    write in between can only make the cached fragment newer than its
+    version. Callers that read data for the key pass `version`, read first.
+    """
+    if version is None:
+        version = fragment_cache.data_version(get_db())
+    etag = _etag(repr((BUILD_ID, key, version)))
+
+    if _etag_matches(request, etag):
+        return _respond(request, "", etag)
+
+    content = fragment_cache.get(key, version)
+    if content is None:
+        content = render()
+        fragment_cache.put(key, version, content)
+    return _respond(request, content, etag, media_type)
@@ -1,20 +1,30 @@
 from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI, Request
-from fastapi.templating import Jinja2Templates
 
-from app.database import init_db
-from app.routers import exercises, autocomplete, visualizer, workout_summary, import_data
+from app.config import DB_POOL_SIZE, LOCAL_FIRST
+from app.database import get_db, get_write_db
+from app.fragments import prerender_static_pages, static_page
+from app.migrations import run_migrations
+from app.services import replica_sync
+from app.services.vocabulary import load_vocabulary
+from app.routers import exercises, autocomplete, visualizer, workout_summary, import_data, sync
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
-    init_db()
+    """Bring the schema up to date and warm caches on startup."""
+    # Sync handlers run in this threadpool, one database connection per thread
+    to_thread.current_default_thread_limiter().total_tokens = DB_POOL_SIZE
+    run_migrations(get_write_db())
+    if LOCAL_FIRST:
+        replica_sync.start(get_db())
+    load_vocabulary(get_db())
+    prerender_static_pages()
     yield
 
 
 app = FastAPI(title="Exercise Mentor", lifespan=lifespan)
-templates = Jinja2Templates(directory="app/templates")
 
 # Include routers
 app.include_router(exercises.router, prefix="/api/exercises", tags=["exercises"])
@@ -22,12 +32,13 @@ app.include_router(autocomplete.router, prefix="/api/autocomplete", tags=["autoc
 app.include_router(visualizer.router, prefix="/api/visualizer", tags=["visualizer"])
 app.include_router(workout_summary.router, prefix="/api/summary", tags=["summary"])
 app.include_router(import_data.router, prefix="/api/import", tags=["import"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
 
 
 @app.get("/")
 async def index(request: Request):
     """Render the main page."""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return static_page(request, "index.html")
 
 
 @app.get("/api/dismiss")
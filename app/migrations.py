@@ -0,0 +1,781 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Tuple
+
+from app.config import EQUIPMENT_TYPES
+from app.database import transaction
+
+# Rows per committed batch in online backfills
+BACKFILL_BATCH_SIZE = 5000
+
+# (version, description, apply, batched) in ascending version order. Applied
+# migrations are never renumbered, folded or changed; a fix is a new one.
+MIGRATIONS: List[Tuple[int, str, Callable, bool]] = []
+
+
+def migration(version: int, description: str, batched: bool = False):
+    """
+    Register a schema migration; each runs once.
+
+    Regular migrations run in a single transaction. Batched migrations manage
+    their own transactions (see `backfill`) so large data changes don't hold
+    one long write lock, and are only recorded once they have finished.
+    """
+
+    def register(apply: Callable):
+        MIGRATIONS.append((version, description, apply, batched))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return apply
+
+    return register
+
+
+def backfill(db, version: int, table: str, apply: Callable, batch_size: int = BACKFILL_BATCH_SIZE):
+    """
+    Call `apply(db, after_id, last_id)` over `table` in id order, one batch per transaction.
+
+    Progress is saved with every batch, so an interrupted backfill resumes
+    where it stopped instead of starting over.
+    """
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_backfill (
+            version INTEGER PRIMARY KEY,
+            last_id INTEGER NOT NULL
+        )
+    """)
+    row = db.execute("SELECT last_id FROM schema_backfill WHERE version = ?", [version]).fetchone()
+    after_id = row[0] if row else 0
+
+    while True:
+        last_id = db.execute(
+            f"SELECT max(id) FROM (SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?)",
+            [after_id, batch_size],
+        ).fetchone()[0]
+        if last_id is None:
+            return
+        with transaction(db):
+            apply(db, after_id, last_id)
+            db.execute(
+                "INSERT OR REPLACE INTO schema_backfill (version, last_id) VALUES (?, ?)",
+                [version, last_id],
+            )
+        after_id = last_id
+
+
+# Migrations never call into app.services: the services follow the newest
+# schema, while a migration has to do what it did when it was written against
+# the schema of its own version. Derived tables are filled with the frozen SQL
+# below instead, one INSERT ... SELECT per table, so SQLite does the work
+# without any rows coming back to Python. A later schema gets new SQL.
+
+# Sets numbered into workout sessions, a new one starting wherever the gap to
+# the previous set reaches two hours. {sets} selects (t, kind, id, movement,
+# n_of_reps, weight, distance, duration, power_output), kind being 0 for
+# lifting and 1 for cardio; {gap} is the ms between t and `previous`.
+_SESSION_SETS = """
+    WITH numbered AS (
+        SELECT *, sum(starts) OVER (ORDER BY t, kind, id) AS session
+        FROM (
+            SELECT *, coalesce({gap} >= 7200000, 1) AS starts
+            FROM (SELECT *, lag(t) OVER (ORDER BY t, kind, id) AS previous FROM ({sets}))
+        )
+    )
+"""
+
+_LIFTING_SETS = """
+    SELECT {t} AS t, 0 AS kind, id, movement, n_of_reps, weight,
+           NULL AS distance, NULL AS duration, NULL AS power_output
+    FROM weightlifting_set
+"""
+
+_CARDIO_SETS = """
+    SELECT timestamp_ms, 1, id, movement, NULL, NULL, distance, duration, power_output
+    FROM cardio_set
+"""
+
+# Per-session totals, movements ordered by most recent appearance
+_SESSION_MOVEMENTS = """
+    INSERT INTO workout_session_movement (session_id, movement, total_weight, set_count)
+    SELECT session, movement, total(weight * n_of_reps), count(*)
+    FROM numbered
+    WHERE kind = 0
+    GROUP BY session, movement
+    ORDER BY session, max(t) DESC
+"""
+
+_SESSION_CARDIO = """
+    INSERT INTO workout_session_cardio
+        (session_id, movement, distance, duration, work, powered_duration, set_count)
+    SELECT session, movement, total(distance), total(duration),
+           total(CASE WHEN power_output > 0 THEN power_output * duration ELSE 0 END),
+           total(CASE WHEN power_output > 0 THEN duration ELSE 0 END),
+           count(*)
+    FROM numbered
+    WHERE kind = 1
+    GROUP BY session, movement
+    ORDER BY session, max(t) DESC
+"""
+
+# Day totals: bodyweight sets count reps, dumbbells count double
+_VOLUME = """
+    total(CASE lower(equipment_type)
+              WHEN 'bodyweight' THEN 0
+              WHEN 'dumbbell' THEN weight * n_of_reps * 2
+              ELSE weight * n_of_reps
+          END),
+    sum(CASE lower(equipment_type) WHEN 'bodyweight' THEN n_of_reps ELSE 0 END)
+"""
+
+# Best estimated 1RM of the day by Epley, then by Brzycki (below 37 reps)
+_E1RM = """
+    max(CASE WHEN weight > 0 AND n_of_reps > 0
+             THEN CASE WHEN n_of_reps = 1 THEN weight ELSE weight * (1 + n_of_reps / 30.0) END
+        END),
+    max(CASE WHEN weight > 0 AND n_of_reps > 0 AND n_of_reps < 37
+             THEN CASE WHEN n_of_reps = 1 THEN weight ELSE weight * 36.0 / (37 - n_of_reps) END
+        END)
+"""
+
+_CARDIO_TOTALS = """
+    total(distance),
+    total(duration),
+    total(CASE WHEN power_output > 0 THEN power_output * duration ELSE 0 END),
+    total(CASE WHEN power_output > 0 THEN duration ELSE 0 END),
+    min(timestamp_ms),
+    max(timestamp_ms),
+    count(*)
+"""
+
+_USAGE = """
+    INSERT INTO movement_usage (movement, equipment_type, set_count, last_used)
+    SELECT movement, equipment_type, count(*), datetime(max(timestamp_ms) / 1000, 'unixepoch')
+    FROM weightlifting_set
+    GROUP BY movement, equipment_type
+"""
+
+# Weeks start on Monday and are totalled from the daily rows
+_WEEKS = """
+    INSERT INTO weekly_movement_rollup
+        (movement, week, total_weight, bodyweight_reps, set_count, e1rm_epley, e1rm_brzycki)
+    SELECT movement, date(date, '-' || ((strftime('%w', date) + 6) % 7) || ' days') AS week,
+           total(total_weight), sum(bodyweight_reps), sum(set_count),
+           max(e1rm_epley), max(e1rm_brzycki)
+    FROM daily_movement_rollup
+    GROUP BY movement, week
+"""
+
+# Heaviest set of at least each rep range's reps; ties go to the earliest set
+_RECORDS = """
+    INSERT INTO movement_pr (movement, min_reps, weight, n_of_reps, timestamp_ms)
+    SELECT movement, min_reps, weight, n_of_reps, timestamp_ms
+    FROM (
+        SELECT s.movement, r.column1 AS min_reps, s.weight, s.n_of_reps, s.timestamp_ms,
+               row_number() OVER (
+                   PARTITION BY s.movement, r.column1 ORDER BY s.weight DESC, s.timestamp_ms, s.id
+               ) AS place
+        FROM weightlifting_set s
+        JOIN (VALUES (1), (3), (5), (8), (10), (12), (15), (20)) r ON s.n_of_reps >= r.column1
+        WHERE s.weight > 0
+    )
+    WHERE place = 1
+"""
+
+
+def _replace(db, table: str, insert: str):
+    """Empty a derived table and fill it with `insert`."""
+    db.execute(f"DELETE FROM {table}")
+    db.execute(insert)
+
+
+def _rebuild_sessions(db, sets: str, gap: str, bounds: str, cardio: bool):
+    """
+    Replace every session with the ones `sets` number into.
+
+    `bounds` inserts (id, start, end, set_count) from `numbered`; ids are the
+    session numbers, so the per-session totals can refer to them.
+    """
+    numbered = _SESSION_SETS.format(sets=sets, gap=gap)
+    tables = ["workout_session_movement", "workout_session"]
+    if cardio:
+        tables.insert(0, "workout_session_cardio")
+    for table in tables:
+        db.execute(f"DELETE FROM {table}")
+    db.execute(numbered + bounds)
+    db.execute(numbered + _SESSION_MOVEMENTS)
+    if cardio:
+        db.execute(numbered + _SESSION_CARDIO)
+
+
+def _rebuild_ms_sessions(db):
+    """Sessions of lifting and cardio sets by epoch ms (schema of version 10 on)."""
+    _rebuild_sessions(
+        db,
+        _LIFTING_SETS.format(t="timestamp_ms") + " UNION ALL " + _CARDIO_SETS,
+        gap="t - previous",
+        bounds="""
+            INSERT INTO workout_session (id, start_ms, end_ms, set_count)
+            SELECT session, min(t), max(t), count(*) FROM numbered GROUP BY session
+        """,
+        cardio=True,
+    )
+
+
+def _day_rollups(columns: str, totals: str, equipment: bool = False) -> str:
+    """INSERT ... SELECT of lifting day totals, per movement and optionally equipment."""
+    key = "movement, equipment_type," if equipment else "movement,"
+    return f"""
+        INSERT INTO {"daily_equipment_rollup" if equipment else "daily_movement_rollup"}
+            ({key} date, {columns})
+        SELECT {key} substr(timestamp, 1, 10) AS date, {totals}
+        FROM weightlifting_set
+        GROUP BY {key} date
+    """
+
+
+def _cardio_rollups(equipment: bool = False) -> str:
+    """INSERT ... SELECT of cardio day totals, per movement and optionally equipment."""
+    key = "movement, equipment_type," if equipment else "movement,"
+    return f"""
+        INSERT INTO {"daily_cardio_equipment_rollup" if equipment else "daily_cardio_rollup"}
+            ({key} date, distance, duration, work, powered_duration, first_ms, last_ms, set_count)
+        SELECT {key} substr(timestamp, 1, 10) AS date, {_CARDIO_TOTALS}
+        FROM cardio_set
+        GROUP BY {key} date
+    """
+
+
+# Columns of the daily lifting rollups as of migration 14, and their totals
+_DAY_COLUMNS = (
+    "total_weight, bodyweight_reps, first_ms, last_ms, set_count,"
+    " e1rm_epley, e1rm_brzycki, top_weight"
+)
+_DAY_TOTALS = f"{_VOLUME}, min(timestamp_ms), max(timestamp_ms), count(*), {_E1RM}, max(weight)"
+
+
+@migration(1, "Base schema")
+def _base_schema(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS movements (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS equipment_types (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS weightlifting_set (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            movement TEXT NOT NULL,
+            equipment_type TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            n_of_reps INTEGER NOT NULL,
+            weight REAL NOT NULL
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS cardio_set (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            movement TEXT NOT NULL,
+            equipment_type TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            distance REAL NOT NULL,
+            duration REAL NOT NULL,
+            power_output REAL DEFAULT 0
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS workout_session (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_time DATETIME NOT NULL,
+            end_time DATETIME NOT NULL,
+            set_count INTEGER NOT NULL
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS workout_session_movement (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL REFERENCES workout_session(id),
+            movement TEXT NOT NULL,
+            total_weight REAL NOT NULL,
+            set_count INTEGER NOT NULL
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS movement_usage (
+            movement TEXT NOT NULL,
+            equipment_type TEXT NOT NULL,
+            set_count INTEGER NOT NULL,
+            last_used DATETIME NOT NULL,
+            PRIMARY KEY (movement, equipment_type)
+        )
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS daily_movement_rollup (
+            movement TEXT NOT NULL,
+            date TEXT NOT NULL,
+            total_weight REAL NOT NULL,
+            bodyweight_reps INTEGER NOT NULL,
+            first_timestamp DATETIME NOT NULL,
+            last_timestamp DATETIME NOT NULL,
+            set_count INTEGER NOT NULL,
+            PRIMARY KEY (movement, date)
+        )
+    """)
+
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workout_session_end ON workout_session(end_time)"
+    )
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workout_session_movement_session "
+        "ON workout_session_movement(session_id)"
+    )
+
+    # Seed default equipment types and movements
+    db.executemany(
+        "INSERT OR IGNORE INTO equipment_types (name) VALUES (?)",
+        [[eq_type] for eq_type in EQUIPMENT_TYPES],
+    )
+    db.execute("INSERT OR IGNORE INTO movements (name) VALUES (?)", ["bench press"])
+
+
+@migration(2, "Composite covering indexes for history, session and cardio queries")
+def _composite_indexes(db):
+    # History: WHERE movement = ? [AND timestamp range] ORDER BY timestamp.
+    # Covers every column the visualizer and rollups read, so no table lookups.
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_weightlifting_movement_timestamp
+        ON weightlifting_set(movement, timestamp, equipment_type, n_of_reps, weight)
+    """)
+    # Sessions: timestamp range scans ordered by timestamp
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_weightlifting_timestamp_covering
+        ON weightlifting_set(timestamp, movement, n_of_reps, weight)
+    """)
+    # Both single-column indexes are prefixes of the ones above
+    db.execute("DROP INDEX IF EXISTS idx_weightlifting_movement")
+    db.execute("DROP INDEX IF EXISTS idx_weightlifting_timestamp")
+
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cardio_movement_timestamp
+        ON cardio_set(movement, timestamp)
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_cardio_timestamp ON cardio_set(timestamp)")
+
+    # Session overlap lookups go through the end_time index instead
+    db.execute("DROP INDEX IF EXISTS idx_workout_session_start")
+
+
+@migration(3, "Backfill sessions, usage and rollups for sets logged before they were tracked")
+def _backfill_derived(db):
+    # Databases that already maintained every derived table have nothing to fill
+    for table in ("workout_session", "movement_usage", "daily_movement_rollup"):
+        if not db.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+            break
+    else:
+        return
+
+    # Timestamps are text here; julianday() reads both stored spellings
+    _rebuild_sessions(
+        db,
+        _LIFTING_SETS.format(t="julianday(timestamp)"),
+        gap="(t - previous) * 86400000",
+        bounds="""
+            INSERT INTO workout_session (id, start_time, end_time, set_count)
+            SELECT session, datetime(min(t)), datetime(max(t)), count(*)
+            FROM numbered
+            GROUP BY session
+        """,
+        cardio=False,
+    )
+    _replace(db, "movement_usage", """
+        INSERT INTO movement_usage (movement, equipment_type, set_count, last_used)
+        SELECT movement, equipment_type, count(*), max(datetime(timestamp))
+        FROM weightlifting_set
+        GROUP BY movement, equipment_type
+    """)
+    _replace(db, "daily_movement_rollup", f"""
+        INSERT INTO daily_movement_rollup
+            (movement, date, total_weight, bodyweight_reps, first_timestamp, last_timestamp,
+             set_count)
+        SELECT movement, substr(timestamp, 1, 10) AS date, {_VOLUME},
+               min(datetime(timestamp)), max(datetime(timestamp)), count(*)
+        FROM weightlifting_set
+        GROUP BY movement, date
+    """)
+
+
+@migration(4, "Integer epoch-ms timestamp columns on sets")
+def _epoch_ms_columns(db):
+    db.execute("ALTER TABLE weightlifting_set ADD COLUMN timestamp_ms INTEGER")
+    db.execute("ALTER TABLE cardio_set ADD COLUMN timestamp_ms INTEGER")
+
+
+def _epoch_ms(timestamp: str) -> int:
+    """Epoch ms of stored timestamp text, as the set writer computed it at version 5."""
+    ts = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - datetime(1970, 1, 1)) // timedelta(milliseconds=1)
+
+
+def _epoch_ms_backfill(table: str):
+    def apply(db, after_id: int, last_id: int):
+        rows = db.execute(
+            f"""
+            SELECT id, timestamp FROM {table}
+            WHERE id > ? AND id <= ? AND timestamp_ms IS NULL AND timestamp IS NOT NULL
+            """,
+            [after_id, last_id],
+        ).fetchall()
+        db.executemany(
+            f"UPDATE {table} SET timestamp_ms = ? WHERE id = ?",
+            [[_epoch_ms(row[1]), row[0]] for row in rows],
+        )
+
+    return apply
+
+
+@migration(5, "Backfill weightlifting epoch-ms timestamps", batched=True)
+def _backfill_weightlifting_ms(db, version):
+    backfill(db, version, "weightlifting_set", _epoch_ms_backfill("weightlifting_set"))
+
+
+@migration(6, "Backfill cardio epoch-ms timestamps", batched=True)
+def _backfill_cardio_ms(db, version):
+    backfill(db, version, "cardio_set", _epoch_ms_backfill("cardio_set"))
+
+
+@migration(7, "Index sets and store derived tables by epoch-ms timestamp")
+def _epoch_ms_indexes(db):
+    # Day lookups still range over the stored text (its date prefix is the
+    # day), so the movement index keeps it and adds timestamp_ms for sorting
+    db.execute("DROP INDEX IF EXISTS idx_weightlifting_movement_timestamp")
+    db.execute("""
+        CREATE INDEX idx_weightlifting_movement_timestamp
+        ON weightlifting_set(movement, timestamp, equipment_type, n_of_reps, weight, timestamp_ms)
+    """)
+    db.execute("DROP INDEX IF EXISTS idx_weightlifting_timestamp_covering")
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_weightlifting_time_covering
+        ON weightlifting_set(timestamp_ms, movement, n_of_reps, weight)
+    """)
+
+    db.execute("DROP INDEX IF EXISTS idx_cardio_movement_timestamp")
+    db.execute("DROP INDEX IF EXISTS idx_cardio_timestamp")
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cardio_movement_time
+        ON cardio_set(movement, timestamp_ms)
+    """)
+    db.execute("CREATE INDEX IF NOT EXISTS idx_cardio_time ON cardio_set(timestamp_ms)")
+
+    # Sessions and rollups are derived data; recreate them with integer
+    # times and let migration 8 fill them back in
+    db.execute("DROP TABLE IF EXISTS workout_session_movement")
+    db.execute("DROP TABLE IF EXISTS workout_session")
+    db.execute("DROP TABLE IF EXISTS daily_movement_rollup")
+
+    db.execute("""
+        CREATE TABLE workout_session (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            set_count INTEGER NOT NULL
+        )
+    """)
+    db.execute("""
+        CREATE TABLE workout_session_movement (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL REFERENCES workout_session(id),
+            movement TEXT NOT NULL,
+            total_weight REAL NOT NULL,
+            set_count INTEGER NOT NULL
+        )
+    """)
+    db.execute("CREATE INDEX idx_workout_session_end_ms ON workout_session(end_ms)")
+    db.execute(
+        "CREATE INDEX idx_workout_session_movement_session "
+        "ON workout_session_movement(session_id)"
+    )
+
+    db.execute("""
+        CREATE TABLE daily_movement_rollup (
+            movement TEXT NOT NULL,
+            date TEXT NOT NULL,
+            total_weight REAL NOT NULL,
+            bodyweight_reps INTEGER NOT NULL,
+            first_ms INTEGER NOT NULL,
+            last_ms INTEGER NOT NULL,
+            set_count INTEGER NOT NULL,
+            PRIMARY KEY (movement, date)
+        )
+    """)
+
+
+@migration(8, "Rebuild sessions, usage and rollups from the sets")
+def _rebuild_ms_derived(db):
+    _rebuild_sessions(
+        db,
+        _LIFTING_SETS.format(t="timestamp_ms"),
+        gap="t - previous",
+        bounds="""
+            INSERT INTO workout_session (id, start_ms, end_ms, set_count)
+            SELECT session, min(t), max(t), count(*) FROM numbered GROUP BY session
+        """,
+        cardio=False,
+    )
+    _replace(db, "movement_usage", _USAGE)
+    _replace(
+        db,
+        "daily_movement_rollup",
+        _day_rollups(
+            "total_weight, bodyweight_reps, first_ms, last_ms, set_count",
+            f"{_VOLUME}, min(timestamp_ms), max(timestamp_ms), count(*)",
+        ),
+    )
+
+
+@migration(9, "Data version counter for fragment caching")
+def _data_version(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    db.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+
+@migration(10, "Cardio covering indexes, rollups and session totals")
+def _cardio_aggregates(db):
+    # Same layout as the weightlifting indexes: day lookups and rollups by
+    # movement and stored text, session scans by timestamp_ms, both covering
+    db.execute("DROP INDEX IF EXISTS idx_cardio_movement_time")
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cardio_movement_timestamp
+        ON cardio_set(movement, timestamp, equipment_type, distance, duration, power_output, timestamp_ms)
+    """)
+    db.execute("DROP INDEX IF EXISTS idx_cardio_time")
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cardio_time_covering
+        ON cardio_set(timestamp_ms, movement, distance, duration, power_output)
+    """)
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS daily_cardio_rollup (
+            movement TEXT NOT NULL,
+            date TEXT NOT NULL,
+            distance REAL NOT NULL,
+            duration REAL NOT NULL,
+            work REAL NOT NULL,
+            powered_duration REAL NOT NULL,
+            first_ms INTEGER NOT NULL,
+            last_ms INTEGER NOT NULL,
+            set_count INTEGER NOT NULL,
+            PRIMARY KEY (movement, date)
+        )
+    """)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS workout_session_cardio (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL REFERENCES workout_session(id),
+            movement TEXT NOT NULL,
+            distance REAL NOT NULL,
+            duration REAL NOT NULL,
+            work REAL NOT NULL,
+            powered_duration REAL NOT NULL,
+            set_count INTEGER NOT NULL
+        )
+    """)
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_workout_session_cardio_session "
+        "ON workout_session_cardio(session_id)"
+    )
+
+
+@migration(11, "Fold cardio sets into sessions and cardio rollups")
+def _rebuild_cardio_derived(db):
+    _rebuild_ms_sessions(db)
+    _replace(db, "daily_cardio_rollup", _cardio_rollups())
+
+
+@migration(12, "Estimated 1RM, rep-range records and weekly rollups")
+def _progress_analytics(db):
+    db.execute("ALTER TABLE daily_movement_rollup ADD COLUMN e1rm_epley REAL")
+    db.execute("ALTER TABLE daily_movement_rollup ADD COLUMN e1rm_brzycki REAL")
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS weekly_movement_rollup (
+            movement TEXT NOT NULL,
+            week TEXT NOT NULL,
+            total_weight REAL NOT NULL,
+            bodyweight_reps INTEGER NOT NULL,
+            set_count INTEGER NOT NULL,
+            e1rm_epley REAL,
+            e1rm_brzycki REAL,
+            PRIMARY KEY (movement, week)
+        )
+    """)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS movement_pr (
+            movement TEXT NOT NULL,
+            min_reps INTEGER NOT NULL,
+            weight REAL NOT NULL,
+            n_of_reps INTEGER NOT NULL,
+            timestamp_ms INTEGER NOT NULL,
+            PRIMARY KEY (movement, min_reps)
+        )
+    """)
+
+
+@migration(13, "Rebuild sessions, usage, rollups and records from the sets")
+def _rebuild_analytics_derived(db):
+    _rebuild_ms_sessions(db)
+    _replace(db, "movement_usage", _USAGE)
+    _replace(
+        db,
+        "daily_movement_rollup",
+        _day_rollups(
+            "total_weight, bodyweight_reps, first_ms, last_ms, set_count,"
+            " e1rm_epley, e1rm_brzycki",
+            f"{_VOLUME}, min(timestamp_ms), max(timestamp_ms), count(*), {_E1RM}",
+        ),
+    )
+    _replace(db, "weekly_movement_rollup", _WEEKS)
+    _replace(db, "movement_pr", _RECORDS)
+
+
+@migration(14, "Top set weight on daily rollups")
+def _top_weight(db):
+    db.execute("ALTER TABLE daily_movement_rollup ADD COLUMN top_weight REAL")
+
+
+@migration(15, "Rebuild sessions, usage, rollups and records from the sets")
+def _rebuild_derived(db):
+    _rebuild_ms_sessions(db)
+    _replace(db, "movement_usage", _USAGE)
+    _replace(db, "daily_movement_rollup", _day_rollups(_DAY_COLUMNS, _DAY_TOTALS))
+    _replace(db, "weekly_movement_rollup", _WEEKS)
+    _replace(db, "movement_pr", _RECORDS)
+
+
+@migration(16, "Per-equipment daily rollups")
+def _equipment_rollups(db):
+    # Keyed for History pages (movement, equipment, days newest first); the
+    # (movement, date) index serves refreshes, which replace a whole day
+    db.execute("""
+        CREATE TABLE daily_equipment_rollup (
+            movement TEXT NOT NULL,
+            equipment_type TEXT NOT NULL,
+            date TEXT NOT NULL,
+            total_weight REAL NOT NULL,
+            bodyweight_reps INTEGER NOT NULL,
+            first_ms INTEGER NOT NULL,
+            last_ms INTEGER NOT NULL,
+            set_count INTEGER NOT NULL,
+            e1rm_epley REAL,
+            e1rm_brzycki REAL,
+            top_weight REAL,
+            PRIMARY KEY (movement, equipment_type, date)
+        )
+    """)
+    db.execute("""
+        CREATE TABLE daily_cardio_equipment_rollup (
+            movement TEXT NOT NULL,
+            equipment_type TEXT NOT NULL,
+            date TEXT NOT NULL,
+            distance REAL NOT NULL,
+            duration REAL NOT NULL,
+            work REAL NOT NULL,
+            powered_duration REAL NOT NULL,
+            first_ms INTEGER NOT NULL,
+            last_ms INTEGER NOT NULL,
+            set_count INTEGER NOT NULL,
+            PRIMARY KEY (movement, equipment_type, date)
+        )
+    """)
+    db.execute(
+        "CREATE INDEX idx_daily_equipment_rollup_day ON daily_equipment_rollup(movement, date)"
+    )
+    db.execute(
+        "CREATE INDEX idx_daily_cardio_equipment_rollup_day "
+        "ON daily_cardio_equipment_rollup(movement, date)"
+    )
+    db.execute(_day_rollups(_DAY_COLUMNS, _DAY_TOTALS, equipment=True))
+    db.execute(_cardio_rollups(equipment=True))
+
+
+@migration(17, "Index sets by movement, day and equipment for rollup refreshes")
+def _day_indexes(db):
+    # Keyed by the same date prefix the rollups use, so one day's sets come
+    # grouped by equipment; see _totals
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_weightlifting_movement_day
+        ON weightlifting_set(movement, substr(timestamp, 1, 10), equipment_type)
+    """)
+    db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_cardio_movement_day
+        ON cardio_set(movement, substr(timestamp, 1, 10), equipment_type)
+    """)
+
+
+@migration(18, "Rebuild every derived table from the sets")
+def _rebuild_all_derived(db):
+    # Databases that applied 8 or 13 while they were folded into other
+    # versions filled these tables for a different schema, so refill them all
+    _rebuild_ms_sessions(db)
+    _replace(db, "movement_usage", _USAGE)
+    _replace(db, "daily_movement_rollup", _day_rollups(_DAY_COLUMNS, _DAY_TOTALS))
+    _replace(db, "daily_equipment_rollup", _day_rollups(_DAY_COLUMNS, _DAY_TOTALS, equipment=True))
+    _replace(db, "daily_cardio_rollup", _cardio_rollups())
+    _replace(db, "daily_cardio_equipment_rollup", _cardio_rollups(equipment=True))
+    _replace(db, "weekly_movement_rollup", _WEEKS)
+    _replace(db, "movement_pr", _RECORDS)
+
+
+def schema_version(db) -> int:
+    """The highest applied migration, or 0 for a database that has none yet."""
+    try:
+        return db.execute("SELECT max(version) FROM schema_version").fetchone()[0] or 0
+    except Exception:
+        return 0
+
+
+def run_migrations(db):
+    """
+    Apply every migration newer than the recorded schema version.
+
+    When the schema is current this is a single query, so startup does no
+    DDL against the replica.
+    """
+    current = schema_version(db)
+    if current >= MIGRATIONS[-1][0]:
+        return
+
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for version, description, apply, batched in MIGRATIONS:
+        if version <= current:
+            continue
+        if batched:
+            apply(db, version)
+        with transaction(db):
+            if not batched:
+                apply(db)
+            db.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                [version, description],
+            )
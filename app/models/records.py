@@ -0,0 +1,37 @@
+from typing import NamedTuple
+
+# Row records are plain tuples (no per-instance __dict__), so a page of sets
+# costs one small tuple each instead of a six-key dict. Select the matching
+# *_COLUMNS and wrap rows with Record._make.
+
+WEIGHTLIFTING_COLUMNS = "id, movement, equipment_type, timestamp, timestamp_ms, n_of_reps, weight"
+
+CARDIO_COLUMNS = (
+    "id, movement, equipment_type, timestamp, timestamp_ms, distance, duration, power_output"
+)
+
+
+class WeightliftingRow(NamedTuple):
+    """A weightlifting set as read from the database, in WEIGHTLIFTING_COLUMNS order."""
+
+    id: int
+    movement: str
+    equipment_type: str
+    # As stored (ISO text); the date prefix is the day the set is grouped under
+    timestamp: str
+    timestamp_ms: int
+    n_of_reps: int
+    weight: float
+
+
+class CardioRow(NamedTuple):
+    """A cardio set as read from the database, in CARDIO_COLUMNS order."""
+
+    id: int
+    movement: str
+    equipment_type: str
+    timestamp: str
+    timestamp_ms: int
+    distance: float
+    duration: float
+    power_output: float
@@ -85,3 +85,34 @@ class ImportData(BaseModel):
     equipmentTypes: List[dict]
     weightliftingSets: List[dict]
     cardioSets: Optional[List[dict]] = []
+
+
+class ImportRowError(BaseModel):
+    section: str
+    index: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    movements_count: int = 0
+    equipment_count: int = 0
+    weightlifting_count: int = 0
+    cardio_count: int = 0
+    error_count: int = 0
+    errors: List[ImportRowError] = []
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_count(self) -> int:
+        return (
+            self.movements_count
+            + self.equipment_count
+            + self.weightlifting_count
+            + self.cardio_count
+        )
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.rows_count / self.elapsed_seconds
@@ -1,16 +1,15 @@
 from fastapi import APIRouter, Request, Query, Form
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
-from app.database import get_db
 from app.config import EQUIPMENT_TYPES
+from app.services import vocabulary
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/movements", response_class=HTMLResponse)
-async def search_movements(
+def search_movements(
     request: Request,
     movement: str = Query("", alias="movement"),
     equipment_type: str = Query("", alias="equipment_type"),
@@ -18,18 +17,12 @@ async def search_movements(
     n_of_reps: str = Query("", alias="n_of_reps"),
 ):
     """Search movements for autocomplete."""
-    db = get_db()
     q = movement.lower().strip()
 
     if not q:
         return HTMLResponse(content="")
 
-    result = db.execute(
-        "SELECT name FROM movements WHERE name LIKE ? LIMIT 10",
-        [f"%{q}%"],
-    )
-    rows = result.fetchall()
-    movements = [row[0] for row in rows]
+    movements = vocabulary.search_movements(q)
 
     return templates.TemplateResponse(
         "partials/autocomplete_results.html",
@@ -46,7 +39,7 @@ async def search_movements(
 
 
 @router.get("/equipment", response_class=HTMLResponse)
-async def search_equipment(
+def search_equipment(
     request: Request,
     movement: str = Query("", alias="movement"),
     equipment_type: str = Query("", alias="equipment_type"),
@@ -60,13 +53,7 @@ async def search_equipment(
         return HTMLResponse(content="")
 
     # Filter from predefined list + any custom ones in DB
-    db = get_db()
-    result = db.execute(
-        "SELECT name FROM equipment_types WHERE name LIKE ? LIMIT 10",
-        [f"%{q}%"],
-    )
-    rows = result.fetchall()
-    equipment = [row[0] for row in rows]
+    equipment = vocabulary.search_equipment(q, movement.lower().strip())
 
     # Also include predefined types that match
     for eq in EQUIPMENT_TYPES:
@@ -1,31 +1,28 @@
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
-from app.database import get_db
+from app.database import get_write_db, transaction
+from app.fragments import static_page
+from app.services import vocabulary
+from app.services.analytics import refresh_prs
+from app.services.fragment_cache import bump_data_version
+from app.services.rollups import refresh_cardio_rollups, refresh_rollups, rollup_key
+from app.services.sessions import refresh_sessions
+from app.services.set_writer import log_cardio_set, log_weightlifting_set
+from app.services.usage import refresh_usage
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/form", response_class=HTMLResponse)
 async def get_form(request: Request):
     """Return the exercise logging form."""
-    content = templates.TemplateResponse(
-        "partials/logger_form.html", {"request": request}
-    ).body.decode()
-
-    tabs = templates.TemplateResponse(
-        "partials/tabs.html", {"request": request, "active_tab": "logger"}
-    ).body.decode()
-
-    return HTMLResponse(
-        content=content + f'<div id="tabs-container" hx-swap-oob="innerHTML">{tabs}</div>'
-    )
+    return static_page(request, "partials/logger_form.html", active_tab="logger")
 
 
 @router.post("/weightlifting", response_class=HTMLResponse)
-async def create_weightlifting_set(
+def create_weightlifting_set(
     request: Request,
     movement: str = Form(...),
     equipment_type: str = Form(...),
@@ -33,34 +30,12 @@ async def create_weightlifting_set(
     n_of_reps: int = Form(...),
 ):
     """Create a new weightlifting set."""
-    db = get_db()
-
     # Normalize inputs
     movement = movement.lower().strip()
     equipment_type = equipment_type.lower().strip()
 
-    # Ensure movement exists in movements table
-    existing = db.execute(
-        "SELECT id FROM movements WHERE name = ?", [movement]
-    ).fetchone()
-    if not existing:
-        db.execute("INSERT INTO movements (name) VALUES (?)", [movement])
-
-    # Ensure equipment_type exists in equipment_types table
-    existing = db.execute(
-        "SELECT id FROM equipment_types WHERE name = ?", [equipment_type]
-    ).fetchone()
-    if not existing:
-        db.execute("INSERT INTO equipment_types (name) VALUES (?)", [equipment_type])
-
-    # Insert the weightlifting set
-    db.execute(
-        """
-        INSERT INTO weightlifting_set (movement, equipment_type, weight, n_of_reps)
-        VALUES (?, ?, ?, ?)
-        """,
-        [movement, equipment_type, weight, n_of_reps],
-    )
+    # Group-committed with other concurrent submissions
+    log_weightlifting_set(movement, equipment_type, weight, n_of_reps)
 
     # Return cleared form with success message
     return templates.TemplateResponse(
@@ -69,7 +44,7 @@ async def create_weightlifting_set(
 
 
 @router.put("/weightlifting/{set_id}", response_class=HTMLResponse)
-async def update_weightlifting_set(
+def update_weightlifting_set(
     request: Request,
     set_id: int,
     movement: str = Form(...),
@@ -78,21 +53,40 @@ async def update_weightlifting_set(
     n_of_reps: int = Form(...),
 ):
     """Update an existing weightlifting set."""
-    db = get_db()
+    db = get_write_db()
 
     # Normalize inputs
     movement = movement.lower().strip()
     equipment_type = equipment_type.lower().strip()
 
     # Update the record (preserving timestamp)
-    db.execute(
-        """
-        UPDATE weightlifting_set
-        SET movement = ?, equipment_type = ?, weight = ?, n_of_reps = ?
-        WHERE id = ?
-        """,
-        [movement, equipment_type, weight, n_of_reps, set_id],
-    )
+    usage = {}
+    with transaction(db):
+        previous = db.execute(
+            "SELECT movement, equipment_type, timestamp FROM weightlifting_set WHERE id = ?",
+            [set_id],
+        ).fetchone()
+        updated = db.execute(
+            """
+            UPDATE weightlifting_set
+            SET movement = ?, equipment_type = ?, weight = ?, n_of_reps = ?
+            WHERE id = ?
+            RETURNING timestamp, timestamp_ms
+            """,
+            [movement, equipment_type, weight, n_of_reps, set_id],
+        ).fetchone()
+        if updated:
+            refresh_sessions(db, updated[1])
+            refresh_rollups(
+                db,
+                [rollup_key(previous[0], previous[2]), rollup_key(movement, updated[0])],
+            )
+            usage = refresh_usage(
+                db, [(previous[0], previous[1]), (movement, equipment_type)]
+            )
+            refresh_prs(db, [previous[0], movement])
+            bump_data_version(db)
+    vocabulary.update_usage(usage)
 
     # Return success message (modal will close)
     return templates.TemplateResponse(
@@ -101,8 +95,101 @@ async def update_weightlifting_set(
 
 
 @router.delete("/weightlifting/{set_id}", response_class=HTMLResponse)
-async def delete_weightlifting_set(set_id: int):
+def delete_weightlifting_set(set_id: int):
     """Delete a weightlifting set."""
-    db = get_db()
-    db.execute("DELETE FROM weightlifting_set WHERE id = ?", [set_id])
+    db = get_write_db()
+    usage = {}
+    with transaction(db):
+        deleted = db.execute(
+            """
+            DELETE FROM weightlifting_set WHERE id = ?
+            RETURNING timestamp, timestamp_ms, movement, equipment_type
+            """,
+            [set_id],
+        ).fetchone()
+        if deleted:
+            refresh_sessions(db, deleted[1])
+            refresh_rollups(db, [rollup_key(deleted[2], deleted[0])])
+            usage = refresh_usage(db, [(deleted[2], deleted[3])])
+            refresh_prs(db, [deleted[2]])
+            bump_data_version(db)
+    vocabulary.update_usage(usage)
+    return HTMLResponse(content="", status_code=200)
+
+
+@router.post("/cardio", response_class=HTMLResponse)
+def create_cardio_set(
+    request: Request,
+    movement: str = Form(...),
+    equipment_type: str = Form(...),
+    distance: float = Form(...),
+    duration: float = Form(...),
+    power_output: float = Form(0),
+):
+    """Create a new cardio set (distance in miles, duration in seconds)."""
+    movement = movement.lower().strip()
+    equipment_type = equipment_type.lower().strip()
+
+    log_cardio_set(movement, equipment_type, distance, duration, power_output)
+
+    return templates.TemplateResponse(
+        "partials/cardio_form_success.html", {"request": request}
+    )
+
+
+@router.put("/cardio/{set_id}", response_class=HTMLResponse)
+def update_cardio_set(
+    request: Request,
+    set_id: int,
+    movement: str = Form(...),
+    equipment_type: str = Form(...),
+    distance: float = Form(...),
+    duration: float = Form(...),
+    power_output: float = Form(0),
+):
+    """Update an existing cardio set."""
+    db = get_write_db()
+
+    movement = movement.lower().strip()
+    equipment_type = equipment_type.lower().strip()
+
+    with transaction(db):
+        previous = db.execute(
+            "SELECT movement, timestamp FROM cardio_set WHERE id = ?", [set_id]
+        ).fetchone()
+        updated = db.execute(
+            """
+            UPDATE cardio_set
+            SET movement = ?, equipment_type = ?, distance = ?, duration = ?, power_output = ?
+            WHERE id = ?
+            RETURNING timestamp, timestamp_ms
+            """,
+            [movement, equipment_type, distance, duration, power_output, set_id],
+        ).fetchone()
+        if updated:
+            refresh_sessions(db, updated[1])
+            refresh_cardio_rollups(
+                db,
+                [rollup_key(previous[0], previous[1]), rollup_key(movement, updated[0])],
+            )
+            bump_data_version(db)
+
+    return templates.TemplateResponse(
+        "partials/edit_success.html", {"request": request}
+    )
+
+
+@router.delete("/cardio/{set_id}", response_class=HTMLResponse)
+def delete_cardio_set(set_id: int):
+    """Delete a cardio set."""
+    db = get_write_db()
+    with transaction(db):
+        deleted = db.execute(
+            "DELETE FROM cardio_set WHERE id = ? RETURNING timestamp, timestamp_ms, movement",
+            [set_id],
+        ).fetchone()
+        if deleted:
+            refresh_sessions(db, deleted[1])
+            refresh_cardio_rollups(db, [rollup_key(deleted[2], deleted[0])])
+            bump_data_version(db)
     return HTMLResponse(content="", status_code=200)
@@ -1,34 +1,56 @@
 import json
-from fastapi import APIRouter, Request, Form
+import shutil
+import tempfile
+from fastapi import APIRouter, Request, Form, File, UploadFile
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
-from app.database import get_db
+from app.database import get_write_db
+from app.fragments import static_page
+from app.services.importer import import_export, import_stream
+from app.services.import_jobs import get_job, submit_import
+from app.services.json_stream import CHUNK_SIZE
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("", response_class=HTMLResponse)
 async def get_import_form(request: Request):
     """Return the import form."""
-    content = templates.TemplateResponse(
-        "partials/import_form.html", {"request": request}
-    ).body.decode()
+    return static_page(request, "partials/import_form.html", active_tab="import")
 
-    tabs = templates.TemplateResponse(
-        "partials/tabs.html", {"request": request, "active_tab": "import"}
-    ).body.decode()
 
-    return HTMLResponse(
-        content=content + f'<div id="tabs-container" hx-swap-oob="innerHTML">{tabs}</div>'
+def _render_job(request: Request, job):
+    """Render a job as a polling progress bar, or its outcome once finished."""
+    if job.status == "failed":
+        saved = (
+            f"the {job.saved_rows} rows imported before the error were saved"
+            if job.saved_rows
+            else "nothing was saved"
+        )
+        return HTMLResponse(
+            content=f'<div class="notification is-danger">Import failed, {saved}: {job.error}</div>'
+        )
+    if job.status == "done":
+        return templates.TemplateResponse(
+            "partials/import_success.html", {"request": request, "result": job.result}
+        )
+    return templates.TemplateResponse(
+        "partials/import_progress.html", {"request": request, "job": job}
     )
 
 
 @router.post("", response_class=HTMLResponse)
-async def import_data(request: Request, json_data: str = Form(...)):
+def import_data(
+    request: Request, json_data: str = Form(...), background: bool = Form(False)
+):
     """Import data from JSON export."""
-    db = get_db()
+    if background:
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as tmp:
+            tmp.write(json_data)
+        return _render_job(request, submit_import(tmp.name))
+
+    db = get_write_db()
 
     try:
         data = json.loads(json_data)
@@ -38,81 +60,73 @@ async def import_data(request: Request, json_data: str = Form(...)):
             status_code=400,
         )
 
-    movements_count = 0
-    equipment_count = 0
-    weightlifting_count = 0
-    cardio_count = 0
-
-    # Import movements
-    for movement in data.get("movements", []):
-        try:
-            db.execute(
-                "INSERT OR IGNORE INTO movements (name) VALUES (?)",
-                [movement["name"].lower().strip()],
-            )
-            movements_count += 1
-        except Exception:
-            pass
-
-    # Import equipment types
-    for equipment in data.get("equipmentTypes", []):
-        try:
-            db.execute(
-                "INSERT OR IGNORE INTO equipment_types (name) VALUES (?)",
-                [equipment["name"].lower().strip()],
-            )
-            equipment_count += 1
-        except Exception:
-            pass
-
-    # Import weightlifting sets
-    for ws in data.get("weightliftingSets", []):
-        try:
-            db.execute(
-                """
-                INSERT INTO weightlifting_set (movement, equipment_type, timestamp, n_of_reps, weight)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                [
-                    ws["movement"].lower().strip(),
-                    ws["equipmentType"].lower().strip(),
-                    ws["timestamp"],
-                    ws["nOfReps"],
-                    ws["weight"],
-                ],
-            )
-            weightlifting_count += 1
-        except Exception as e:
-            print(f"Error importing weightlifting set: {e}")
-
-    # Import cardio sets
-    for cs in data.get("cardioSets", []):
-        try:
-            db.execute(
-                """
-                INSERT INTO cardio_set (movement, equipment_type, timestamp, distance, duration, power_output)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                [
-                    cs["movement"].lower().strip(),
-                    cs["equipmentType"].lower().strip(),
-                    cs["timestamp"],
-                    cs["distance"],
-                    cs["duration"],
-                    cs.get("powerOutput", 0),
-                ],
-            )
-            cardio_count += 1
-        except Exception as e:
-            print(f"Error importing cardio set: {e}")
+    if not isinstance(data, dict):
+        return HTMLResponse(
+            content='<div class="notification is-danger">Invalid export: expected a JSON object</div>',
+            status_code=400,
+        )
+
+    try:
+        result = import_export(db, data)
+    except Exception as e:
+        return HTMLResponse(
+            content=f'<div class="notification is-danger">Import failed, nothing was saved: {str(e)}</div>',
+            status_code=500,
+        )
 
     return templates.TemplateResponse(
         "partials/import_success.html",
         {
             "request": request,
-            "movements_count": movements_count,
-            "equipment_count": equipment_count,
-            "weightlifting_count": weightlifting_count,
-            "cardio_count": cardio_count,
+            "result": result,
         },
     )
+
+
+@router.post("/file", response_class=HTMLResponse)
+def import_file(
+    request: Request,
+    export_file: UploadFile = File(...),
+    background: bool = Form(False),
+):
+    """Import data from an uploaded JSON export, parsed incrementally."""
+    if background:
+        # The upload is closed when the request ends, so the job gets a copy
+        with tempfile.NamedTemporaryFile("wb", suffix=".json", delete=False) as tmp:
+            shutil.copyfileobj(export_file.file, tmp, CHUNK_SIZE)
+        return _render_job(request, submit_import(tmp.name))
+
+    db = get_write_db()
+
+    try:
+        result = import_stream(db, export_file.file)
+    except json.JSONDecodeError as e:
+        return HTMLResponse(
+            content=f'<div class="notification is-danger">Invalid JSON, nothing was saved: {str(e)}</div>',
+            status_code=400,
+        )
+    except Exception as e:
+        return HTMLResponse(
+            content=f'<div class="notification is-danger">Import failed, nothing was saved: {str(e)}</div>',
+            status_code=500,
+        )
+
+    return templates.TemplateResponse(
+        "partials/import_success.html",
+        {
+            "request": request,
+            "result": result,
+        },
+    )
+
+
+@router.get("/jobs/{job_id}", response_class=HTMLResponse)
+async def get_import_job(request: Request, job_id: str):
+    """Poll the progress of a background import."""
+    job = get_job(job_id)
+    if not job:
+        return HTMLResponse(
+            content='<div class="notification is-danger">Import job not found</div>',
+            status_code=404,
+        )
+    return _render_job(request, job)
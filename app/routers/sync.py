@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+
+from app.config import LOCAL_FIRST
+from app.database import get_db
+from app.services.replica_sync import sync_status
+
+router = APIRouter()
+
+
+@router.get("/status")
+def get_sync_status():
+    """Report how far Turso lags behind the local database in local-first mode."""
+    if not LOCAL_FIRST:
+        return {"mode": "replica"}
+    return {"mode": "local-first", **sync_status(get_db())}
@@ -1,46 +1,51 @@
+import json
+from datetime import date
+from typing import List, Optional
+
 from fastapi import APIRouter, Request, Query
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 
 from app.database import get_db
 from app.config import EQUIPMENT_TYPES
-from app.services.aggregation import aggregate_by_date
+from app.fragments import cached_fragment, static_page
+from app.models.records import CARDIO_COLUMNS, WEIGHTLIFTING_COLUMNS, CardioRow, WeightliftingRow
+from app.services import vocabulary
+from app.services.aggregation import (
+    format_cardio_day,
+    format_day,
+    summarize_cardio_days,
+    summarize_days,
+)
+from app.services.analytics import CHART_POINTS, chart_series, fetch_prs, fetch_weekly_trend
+from app.services.rollups import (
+    fetch_cardio_day_sets,
+    fetch_cardio_rollups,
+    fetch_day_sets,
+    fetch_rollups,
+)
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
+
+# Days of history rendered per page
+HISTORY_PAGE_SIZE = 30
 
 
 @router.get("", response_class=HTMLResponse)
 async def get_visualizer(request: Request):
     """Return the visualizer page."""
-    content = templates.TemplateResponse(
-        "partials/visualizer.html", {"request": request}
-    ).body.decode()
-
-    tabs = templates.TemplateResponse(
-        "partials/tabs.html", {"request": request, "active_tab": "history"}
-    ).body.decode()
-
-    return HTMLResponse(
-        content=content + f'<div id="tabs-container" hx-swap-oob="innerHTML">{tabs}</div>'
-    )
+    return static_page(request, "partials/visualizer.html", active_tab="history")
 
 
 @router.get("/autocomplete", response_class=HTMLResponse)
-async def visualizer_autocomplete(request: Request, movement: str = Query("")):
+def visualizer_autocomplete(request: Request, movement: str = Query("")):
     """Search movements for visualizer autocomplete."""
-    db = get_db()
     q = movement.lower().strip()
 
     if not q:
         return HTMLResponse(content="")
 
-    result = db.execute(
-        "SELECT name FROM movements WHERE name LIKE ? LIMIT 10",
-        [f"%{q}%"],
-    )
-    rows = result.fetchall()
-    movements = [row[0] for row in rows]
+    movements = vocabulary.search_movements(q)
 
     return templates.TemplateResponse(
         "partials/visualizer_autocomplete.html",
@@ -48,72 +53,304 @@ async def visualizer_autocomplete(request: Request, movement: str = Query("")):
     )
 
 
+# Size of the History tab's inline progress chart
+CHART_WIDTH = 600
+CHART_HEIGHT = 160
+
+# Table and appended-page templates per kind of history
+HISTORY_TEMPLATES = {
+    "weightlifting": ("partials/visualizer_table.html", "partials/visualizer_rows.html"),
+    "cardio": ("partials/visualizer_cardio_table.html", "partials/visualizer_cardio_rows.html"),
+}
+
+
+def _parse_movements(values: List[str]) -> List[str]:
+    """Movements from repeated and/or comma-separated `movement` parameters."""
+    return list(
+        dict.fromkeys(
+            name.lower().strip()
+            for value in values
+            for name in value.split(",")
+            if name.strip()
+        )
+    )
+
+
+def _parse_day(value: str) -> Optional[str]:
+    """A YYYY-MM-DD bound, or None when empty; raises ValueError otherwise."""
+    return date.fromisoformat(value.strip()).isoformat() if value.strip() else None
+
+
+def _history_groups(db, movements: List[str], kind: str, filters: dict, before: str) -> List[dict]:
+    """
+    One table's worth of days per movement.
+
+    Each kind of history is one query for all movements. Movements without
+    any weightlifting days show their cardio instead, unless `kind` pins one.
+    """
+    limit = HISTORY_PAGE_SIZE + 1
+    lifting = {}
+    if kind != "cardio":
+        lifting = fetch_rollups(db, movements, before=before or None, limit=limit, **filters)
+    cardio_movements = [
+        m for m in movements if kind == "cardio" or (not kind and not lifting[m])
+    ]
+    cardio = {}
+    if cardio_movements:
+        cardio = fetch_cardio_rollups(
+            db, cardio_movements, before=before or None, limit=limit, **filters
+        )
+
+    groups = []
+    for movement in movements:
+        if movement in cardio:
+            group_kind, days, format_row = "cardio", cardio[movement], format_cardio_day
+        else:
+            group_kind, days, format_row = "weightlifting", lifting[movement], format_day
+        aggregated = [format_row(day) for day in days[:HISTORY_PAGE_SIZE]]
+
+        # Each table pages on its own, keeping the filters
+        next_vals = None
+        if len(days) > HISTORY_PAGE_SIZE:
+            next_vals = {
+                "movement": movement,
+                "before": aggregated[-1]["date_key"],
+                "kind": group_kind,
+                **{name: value for name, value in filters.items() if value},
+            }
+        table, rows = HISTORY_TEMPLATES[group_kind]
+        groups.append(
+            {
+                "movement": movement,
+                "kind": group_kind,
+                "aggregated_data": aggregated,
+                "next_vals": next_vals,
+                "table": table,
+                "rows": rows,
+            }
+        )
+    return groups
+
+
 @router.get("/search", response_class=HTMLResponse)
-async def search_by_movement(request: Request, movement: str = Query(...)):
-    """Search weightlifting sets by movement and return aggregated data."""
-    db = get_db()
+def search_by_movement(
+    request: Request,
+    movement: List[str] = Query(...),
+    equipment: str = Query(""),
+    start: str = Query(""),
+    end: str = Query(""),
+    before: str = Query(""),
+    kind: str = Query(""),
+):
+    """
+    Search sets by one or more movements and return aggregated data.
+
+    `movement` may be repeated or comma-separated; results are grouped by
+    movement, optionally limited to one `equipment` type and to the days
+    from `start` to `end`. Weightlifting history is shown when a movement
+    has any, cardio otherwise; `kind` pins one of them. Returns the first
+    page as tables, or with `before` just the next page of rows to append.
+    """
+    movements = _parse_movements(movement)
+    try:
+        filters = {
+            "equipment": equipment.lower().strip() or None,
+            "start": _parse_day(start),
+            "end": _parse_day(end),
+        }
+    except ValueError:
+        return HTMLResponse(content="<p>Invalid date</p>", status_code=400)
+
+    def render():
+        # Daily totals are maintained on write; sets load when a day is expanded
+        groups = _history_groups(get_db(), movements, kind, filters, before)
+        if before and groups:
+            group = groups[0]
+            return templates.TemplateResponse(
+                group["rows"],
+                {
+                    "request": request,
+                    "aggregated_data": group["aggregated_data"],
+                    "next_vals": group["next_vals"],
+                    "equipment": filters["equipment"],
+                },
+            ).body.decode()
+        return templates.TemplateResponse(
+            "partials/visualizer_results.html",
+            {"request": request, "groups": groups, "equipment": filters["equipment"]},
+        ).body.decode()
+
+    key = ("history", tuple(movements), *filters.values(), before, kind)
+    return cached_fragment(request, key, render)
+
+
+@router.get("/progress", response_class=HTMLResponse)
+def get_progress(request: Request, movement: str = Query(...)):
+    """
+    Return a movement's rep-range records and weekly volume and 1RM trend.
+
+    Both are maintained on write, so this reads a handful of rows however
+    long the movement's history is.
+    """
     movement = movement.lower().strip()
 
-    result = db.execute(
-        """
-        SELECT id, movement, equipment_type, timestamp, n_of_reps, weight
-        FROM weightlifting_set
-        WHERE movement = ?
-        ORDER BY timestamp DESC
-        """,
-        [movement],
-    )
-    rows = result.fetchall()
-
-    # Convert to list of dicts
-    sets = []
-    for row in rows:
-        sets.append({
-            "id": row[0],
-            "movement": row[1],
-            "equipment_type": row[2],
-            "timestamp": row[3],
-            "n_of_reps": row[4],
-            "weight": row[5],
-        })
-
-    # Aggregate by date
-    aggregated = aggregate_by_date(sets)
+    def render():
+        db = get_db()
+        return templates.TemplateResponse(
+            "partials/visualizer_progress.html",
+            {
+                "request": request,
+                "prs": fetch_prs(db, movement),
+                "weeks": fetch_weekly_trend(db, movement),
+            },
+        ).body.decode()
 
-    return templates.TemplateResponse(
-        "partials/visualizer_table.html",
-        {"request": request, "aggregated_data": aggregated},
+    return cached_fragment(request, ("progress", movement), render)
+
+
+def _chart_data(movement: str, equipment: str, start: str, end: str, points: int) -> dict:
+    """Downsampled chart series over the same daily rollups the History search reads."""
+    filters = {
+        "equipment": equipment.lower().strip() or None,
+        "start": _parse_day(start),
+        "end": _parse_day(end),
+    }
+    days = fetch_rollups(get_db(), [movement], **filters)[movement]
+    return {"movement": movement, "days": len(days), **chart_series(days, points)}
+
+
+def _polyline(series: list, first: int, last: int, y_max: float) -> str:
+    """SVG polyline points for [date, value] pairs, scaled to the chart box."""
+    span = max(last - first, 1)
+    return " ".join(
+        "%.1f,%.1f"
+        % (
+            (date.fromisoformat(day).toordinal() - first) / span * CHART_WIDTH,
+            CHART_HEIGHT - value / y_max * CHART_HEIGHT,
+        )
+        for day, value in series
     )
 
 
+@router.get("/chart")
+def get_chart(
+    request: Request,
+    movement: str = Query(...),
+    equipment: str = Query(""),
+    start: str = Query(""),
+    end: str = Query(""),
+    points: int = Query(CHART_POINTS, ge=3, le=2000),
+):
+    """
+    Volume and top set weight over time as JSON, for charting.
+
+    Each series is downsampled server-side to at most `points` points, so
+    the payload stays the same size for a month or a decade of history.
+    """
+    movement = movement.lower().strip()
+
+    def render():
+        return json.dumps(_chart_data(movement, equipment, start, end, points))
+
+    try:
+        key = ("chart", movement, equipment, start, end, points)
+        return cached_fragment(request, key, render, media_type="application/json")
+    except ValueError:
+        return HTMLResponse(content="Invalid date", status_code=400)
+
+
+@router.get("/chart/svg", response_class=HTMLResponse)
+def get_chart_svg(request: Request, movement: str = Query(...)):
+    """The History tab's progress chart: the /chart series drawn as inline SVG."""
+    movement = movement.lower().strip()
+
+    def render():
+        chart = _chart_data(movement, "", "", "", CHART_POINTS)
+        lines = {}
+        all_days = [day for series in (chart["volume"], chart["top_weight"]) for day, _ in series]
+        if all_days:
+            first = date.fromisoformat(min(all_days)).toordinal()
+            last = date.fromisoformat(max(all_days)).toordinal()
+            for name in ("volume", "top_weight"):
+                y_max = max((value for _, value in chart[name]), default=0) or 1
+                lines[name] = _polyline(chart[name], first, last, y_max)
+        return templates.TemplateResponse(
+            "partials/visualizer_chart.html",
+            {
+                "request": request,
+                "chart": chart,
+                "lines": lines,
+                "width": CHART_WIDTH,
+                "height": CHART_HEIGHT,
+            },
+        ).body.decode()
+
+    return cached_fragment(request, ("chart_svg", movement), render)
+
+
+@router.get("/day", response_class=HTMLResponse)
+def get_day_sets(
+    request: Request,
+    movement: str = Query(...),
+    date: str = Query(...),
+    kind: str = Query("weightlifting"),
+    equipment: str = Query(""),
+):
+    """Return the individual sets of one movement on one day."""
+    equipment = equipment.lower().strip() or None
+
+    def render():
+        if kind == "cardio":
+            sets = fetch_cardio_day_sets(get_db(), movement, date, equipment)
+            days = summarize_cardio_days(sets)
+            template = "partials/visualizer_cardio_day_sets.html"
+        else:
+            days = summarize_days(fetch_day_sets(get_db(), movement, date, equipment))
+            template = "partials/visualizer_day_sets.html"
+        return templates.TemplateResponse(
+            template,
+            {"request": request, "sets": days[0]["sets"] if days else []},
+        ).body.decode()
+
+    try:
+        return cached_fragment(request, ("day", movement, date, kind, equipment), render)
+    except ValueError:
+        return HTMLResponse(content="<p>Invalid date</p>", status_code=400)
+
+
 @router.get("/edit/{set_id}", response_class=HTMLResponse)
-async def get_edit_modal(request: Request, set_id: int):
+def get_edit_modal(request: Request, set_id: int):
     """Return the edit modal for a specific set."""
     db = get_db()
 
-    result = db.execute(
-        """
-        SELECT id, movement, equipment_type, timestamp, n_of_reps, weight
-        FROM weightlifting_set
-        WHERE id = ?
-        """,
+    row = db.execute(
+        f"SELECT {WEIGHTLIFTING_COLUMNS} FROM weightlifting_set WHERE id = ?",
         [set_id],
-    )
-    row = result.fetchone()
+    ).fetchone()
 
     if not row:
         return HTMLResponse(content="<p>Set not found</p>", status_code=404)
 
-    set_data = {
-        "id": row[0],
-        "movement": row[1],
-        "equipment_type": row[2],
-        "timestamp": row[3],
-        "n_of_reps": row[4],
-        "weight": row[5],
-    }
+    set_data = WeightliftingRow._make(row)
 
     return templates.TemplateResponse(
         "partials/edit_modal.html",
         {"request": request, "set": set_data, "equipment_types": EQUIPMENT_TYPES},
     )
+
+
+@router.get("/cardio/edit/{set_id}", response_class=HTMLResponse)
+def get_cardio_edit_modal(request: Request, set_id: int):
+    """Return the edit modal for a specific cardio set."""
+    row = get_db().execute(
+        f"SELECT {CARDIO_COLUMNS} FROM cardio_set WHERE id = ?",
+        [set_id],
+    ).fetchone()
+
+    if not row:
+        return HTMLResponse(content="<p>Set not found</p>", status_code=404)
+
+    return templates.TemplateResponse(
+        "partials/cardio_edit_modal.html",
+        {"request": request, "set": CardioRow._make(row)},
+    )
@@ -1,11 +1,13 @@
-from typing import List, Dict
+from typing import Dict, List, Optional, Sequence
 from datetime import datetime
 
+from app.models.records import CardioRow, WeightliftingRow
+
 EQUIPMENT_BODYWEIGHT = "bodyweight"
 EQUIPMENT_DUMBBELL = "dumbbell"
 
 
-def calculate_total_weight(sets: List[dict]) -> tuple[float, int]:
+def calculate_total_weight(sets: Sequence[WeightliftingRow]) -> tuple[float, int]:
     """
     Calculate total weight moved based on equipment type.
 
@@ -18,9 +20,9 @@ def calculate_total_weight(sets: List[dict]) -> tuple[float, int]:
     bodyweight_reps = 0
 
     for s in sets:
-        eq_type = s["equipment_type"].lower()
-        weight = s["weight"]
-        reps = s["n_of_reps"]
+        eq_type = s.equipment_type.lower()
+        weight = s.weight
+        reps = s.n_of_reps
 
         if eq_type == EQUIPMENT_BODYWEIGHT:
             bodyweight_reps += reps
@@ -34,35 +36,24 @@ def calculate_total_weight(sets: List[dict]) -> tuple[float, int]:
     return total_weight, bodyweight_reps
 
 
-def calculate_time_elapsed(sets: List[dict]) -> str:
-    """Calculate time between first and last set."""
-    if not sets:
-        return "0m 0s"
-
-    timestamps = []
-    for s in sets:
-        ts = s["timestamp"]
-        if isinstance(ts, str):
-            # Handle ISO format with or without timezone
-            ts = ts.replace("Z", "+00:00")
-            if "+" not in ts and "-" not in ts[10:]:
-                ts = datetime.fromisoformat(ts)
-            else:
-                ts = datetime.fromisoformat(ts)
-        timestamps.append(ts)
-
-    if len(timestamps) < 2:
-        return "0m 0s"
-
-    timestamps.sort()
-    delta = timestamps[-1] - timestamps[0]
-    total_seconds = int(delta.total_seconds())
+def format_elapsed(first_ms: int, last_ms: int) -> str:
+    """Format the time between two epoch-ms timestamps as minutes and seconds."""
+    total_seconds = (last_ms - first_ms) // 1000
     minutes = total_seconds // 60
     seconds = total_seconds % 60
 
     return f"{minutes}m {seconds}s"
 
 
+def calculate_time_elapsed(sets: Sequence[WeightliftingRow]) -> str:
+    """Calculate time between first and last set."""
+    if len(sets) < 2:
+        return "0m 0s"
+
+    timestamps = [s.timestamp_ms for s in sets]
+    return format_elapsed(min(timestamps), max(timestamps))
+
+
 def format_total_display(
     total_weight: float, bodyweight_reps: int, time_elapsed: str
 ) -> str:
@@ -76,23 +67,16 @@ def format_total_display(
     return f"0 in {time_elapsed}"
 
 
-def aggregate_by_date(sets: List[dict]) -> List[Dict]:
+def _group_by_day(sets: Sequence) -> List[tuple]:
     """
-    Group sets by date and calculate aggregates.
-    Returns list sorted by date descending.
+    Group rows (either record type) by date, newest day first.
+    Returns (date, sets) pairs with the sets within a day newest first.
     """
     by_date = {}
 
     for s in sets:
-        ts = s["timestamp"]
-        if isinstance(ts, str):
-            ts = ts.replace("Z", "+00:00")
-            if "+" not in ts and "-" not in ts[10:]:
-                ts = datetime.fromisoformat(ts)
-            else:
-                ts = datetime.fromisoformat(ts)
-
-        date_key = ts.strftime("%Y-%m-%d")
+        # The stored text starts with the date the set was logged on
+        date_key = s.timestamp[:10]
 
         if date_key not in by_date:
             by_date[date_key] = []
@@ -101,31 +85,170 @@ def aggregate_by_date(sets: List[dict]) -> List[Dict]:
     result = []
     for date_str, date_sets in sorted(by_date.items(), reverse=True):
         # Sort sets within date by timestamp descending
-        date_sets.sort(
-            key=lambda x: (
-                x["timestamp"]
-                if isinstance(x["timestamp"], datetime)
-                else datetime.fromisoformat(x["timestamp"].replace("Z", "+00:00"))
-            ),
-            reverse=True,
-        )
+        date_sets.sort(key=lambda x: x.timestamp_ms, reverse=True)
+        result.append((date_str, date_sets))
+
+    return result
 
+
+def summarize_days(sets: Sequence[WeightliftingRow]) -> List[Dict]:
+    """
+    Group sets by date and calculate numeric totals.
+    Returns list sorted by date descending, sets within a day newest first.
+    """
+    result = []
+    for date_str, date_sets in _group_by_day(sets):
         total_weight, bodyweight_reps = calculate_total_weight(date_sets)
-        time_elapsed = calculate_time_elapsed(date_sets)
-        display = format_total_display(total_weight, bodyweight_reps, time_elapsed)
 
-        # Format date for display
-        dt = datetime.strptime(date_str, "%Y-%m-%d")
-        display_date = dt.strftime("%m/%d/%Y")
+        result.append(
+            {
+                "date": date_str,
+                "movement": date_sets[0].movement,
+                "total_weight": total_weight,
+                "bodyweight_reps": bodyweight_reps,
+                "first_ms": date_sets[-1].timestamp_ms,
+                "last_ms": date_sets[0].timestamp_ms,
+                "set_count": len(date_sets),
+                "sets": date_sets,
+            }
+        )
+
+    return result
+
+
+def calculate_cardio_totals(sets: Sequence[CardioRow]) -> tuple[float, float, float, float]:
+    """
+    Calculate cardio totals.
+
+    Returns: (distance, duration, work, powered_duration)
+    - Distance in miles, durations in seconds
+    - work and powered_duration only count sets that recorded power, so
+      average power is work / powered_duration
+    """
+    distance = 0.0
+    duration = 0.0
+    work = 0.0
+    powered_duration = 0.0
+
+    for s in sets:
+        distance += s.distance
+        duration += s.duration
+        if s.power_output and s.power_output > 0:
+            work += s.power_output * s.duration
+            powered_duration += s.duration
+
+    return distance, duration, work, powered_duration
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as h:mm:ss, or m:ss under an hour."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_pace(distance: float, duration: float) -> str:
+    """Format the time per mile, or '-' when no distance was covered."""
+    if distance <= 0:
+        return "-"
+    return f"{format_duration(duration / distance)} /mi"
+
+
+def average_power(work: float, powered_duration: float) -> Optional[float]:
+    """Duration-weighted average power, or None when no set recorded power."""
+    if powered_duration <= 0:
+        return None
+    return work / powered_duration
+
+
+def format_cardio_totals(
+    distance: float, duration: float, work: float, powered_duration: float
+) -> Dict:
+    """Display strings for cardio totals (a day, rollup or session)."""
+    power = average_power(work, powered_duration)
+    return {
+        "distance": f"{distance:.2f} mi",
+        "duration": format_duration(duration),
+        "pace": format_pace(distance, duration),
+        "average_power": f"{power:.0f} W" if power is not None else "-",
+    }
+
+
+def summarize_cardio_days(sets: Sequence[CardioRow]) -> List[Dict]:
+    """
+    Group cardio sets by date and calculate numeric totals.
+    Returns the same shape as a cardio rollup, plus the sets.
+    """
+    result = []
+    for date_str, date_sets in _group_by_day(sets):
+        distance, duration, work, powered_duration = calculate_cardio_totals(date_sets)
 
         result.append(
             {
-                "date": display_date,
-                "movement": date_sets[0]["movement"],
-                "total_weight_or_reps": display,
-                "time_elapsed": time_elapsed,
+                "date": date_str,
+                "movement": date_sets[0].movement,
+                "distance": distance,
+                "duration": duration,
+                "work": work,
+                "powered_duration": powered_duration,
+                "first_ms": date_sets[-1].timestamp_ms,
+                "last_ms": date_sets[0].timestamp_ms,
+                "set_count": len(date_sets),
                 "sets": date_sets,
             }
         )
 
     return result
+
+
+def _display_date(date_key: str) -> str:
+    return datetime.strptime(date_key, "%Y-%m-%d").strftime("%m/%d/%Y")
+
+
+def format_cardio_day(day: Dict) -> Dict:
+    """Format a day's cardio totals (from summarize_cardio_days or a rollup) for display."""
+    return {
+        "date": _display_date(day["date"]),
+        "date_key": day["date"],
+        "movement": day["movement"],
+        "set_count": day["set_count"],
+        **format_cardio_totals(
+            day["distance"], day["duration"], day["work"], day["powered_duration"]
+        ),
+    }
+
+
+def format_day(day: Dict) -> Dict:
+    """Format a day's numeric totals (from summarize_days or a rollup) for display."""
+    if day["set_count"] < 2:
+        time_elapsed = "0m 0s"
+    else:
+        time_elapsed = format_elapsed(day["first_ms"], day["last_ms"])
+    display = format_total_display(
+        day["total_weight"], day["bodyweight_reps"], time_elapsed
+    )
+
+    # Rollups carry the day's best estimated 1RM; raw summaries don't
+    e1rm = day.get("e1rm_epley")
+
+    return {
+        "date": _display_date(day["date"]),
+        "date_key": day["date"],
+        "movement": day["movement"],
+        "total_weight_or_reps": display,
+        "time_elapsed": time_elapsed,
+        "e1rm": f"{e1rm:.1f} lbs" if e1rm else "-",
+        "set_count": day["set_count"],
+    }
+
+
+def aggregate_by_date(sets: Sequence[WeightliftingRow]) -> List[Dict]:
+    """
+    Group sets by date and calculate aggregates.
+    Returns list sorted by date descending.
+    """
+    return [
+        {**format_day(day), "sets": day["sets"]} for day in summarize_days(sets)
+    ]
@@ -0,0 +1,245 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.timestamps import from_epoch_ms
+
+# A "5RM" is the heaviest set of at least 5 reps
+REP_RANGES = (1, 3, 5, 8, 10, 12, 15, 20)
+
+# Weeks averaged into the rolling volume trend
+ROLLING_WEEKS = 4
+
+# Points per chart series after downsampling
+CHART_POINTS = 200
+
+# Estimated one-rep max from a set of `n_of_reps` at `weight`. A single is
+# its own max, bodyweight sets (no weight) have none, and Brzycki is only
+# defined below 37 reps. Used by the rollup queries; epley()/brzycki() are
+# the same formulas in Python.
+EPLEY_SQL = """
+    CASE WHEN weight > 0 AND n_of_reps > 0
+         THEN CASE WHEN n_of_reps = 1 THEN weight ELSE weight * (1 + n_of_reps / 30.0) END
+    END
+"""
+BRZYCKI_SQL = """
+    CASE WHEN weight > 0 AND n_of_reps > 0 AND n_of_reps < 37
+         THEN CASE WHEN n_of_reps = 1 THEN weight ELSE weight * 36.0 / (37 - n_of_reps) END
+    END
+"""
+
+
+def epley(weight: float, reps: int) -> Optional[float]:
+    """Epley estimated 1RM: weight x (1 + reps / 30)."""
+    if weight <= 0 or reps <= 0:
+        return None
+    return weight if reps == 1 else weight * (1 + reps / 30.0)
+
+
+def brzycki(weight: float, reps: int) -> Optional[float]:
+    """Brzycki estimated 1RM: weight x 36 / (37 - reps)."""
+    if weight <= 0 or reps <= 0 or reps >= 37:
+        return None
+    return weight if reps == 1 else weight * 36.0 / (37 - reps)
+
+
+def week_start(day: str) -> str:
+    """The Monday (YYYY-MM-DD) of the week a YYYY-MM-DD day falls in."""
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def _best_by_range(sets: Iterable[tuple]) -> Dict[Tuple[str, int], tuple]:
+    """
+    Best (weight, n_of_reps, timestamp_ms) per (movement, rep range).
+
+    `sets` are (movement, weight, n_of_reps, timestamp_ms). Ties on weight
+    go to the earliest set, so a record dates from when it was first hit.
+    """
+    best = {}
+    for movement, weight, reps, timestamp_ms in sets:
+        if weight <= 0:
+            continue
+        for min_reps in REP_RANGES:
+            if reps < min_reps:
+                break
+            current = best.get((movement, min_reps))
+            if (
+                current is None
+                or weight > current[0]
+                or (weight == current[0] and timestamp_ms < current[2])
+            ):
+                best[(movement, min_reps)] = (weight, reps, timestamp_ms)
+    return best
+
+
+def record_prs(db, sets: Iterable[tuple]):
+    """
+    Fold newly inserted (movement, weight, n_of_reps, timestamp_ms) sets into the records.
+
+    Inserts can only raise a record, so this is an upsert per rep range and
+    never reads the set history.
+    """
+    db.executemany(
+        """
+        INSERT INTO movement_pr (movement, min_reps, weight, n_of_reps, timestamp_ms)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (movement, min_reps) DO UPDATE SET
+            weight = excluded.weight,
+            n_of_reps = excluded.n_of_reps,
+            timestamp_ms = excluded.timestamp_ms
+        WHERE excluded.weight > weight
+           OR (excluded.weight = weight AND excluded.timestamp_ms < timestamp_ms)
+        """,
+        [[m, r, *best] for (m, r), best in _best_by_range(sets).items()],
+    )
+
+
+def refresh_prs(db, movements: Iterable[str]):
+    """
+    Recompute the records of movements exactly after sets were edited or deleted.
+
+    A lowered or removed set can only be replaced by rescanning the
+    movement, which reads its sets from the covering movement index.
+    """
+    for movement in set(movements):
+        rows = db.execute(
+            """
+            SELECT movement, weight, n_of_reps, timestamp_ms FROM weightlifting_set
+            WHERE movement = ? AND weight > 0
+            """,
+            [movement],
+        ).fetchall()
+        db.execute("DELETE FROM movement_pr WHERE movement = ?", [movement])
+        record_prs(db, rows)
+
+
+def fetch_prs(db, movement: str) -> List[dict]:
+    """A movement's rep-range records, lowest rep range first."""
+    rows = db.execute(
+        """
+        SELECT min_reps, weight, n_of_reps, timestamp_ms
+        FROM movement_pr
+        WHERE movement = ?
+        ORDER BY min_reps
+        """,
+        [movement],
+    ).fetchall()
+    return [
+        {
+            "min_reps": row[0],
+            "weight": row[1],
+            "n_of_reps": row[2],
+            "achieved": from_epoch_ms(row[3]),
+        }
+        for row in rows
+    ]
+
+
+def fetch_weekly_trend(db, movement: str, weeks: int = 12) -> List[dict]:
+    """
+    Weekly volume and best estimated 1RM for the `weeks` up to the latest logged week.
+
+    Oldest week first. Weeks without sets are filled in with zero volume,
+    and `rolling_volume` averages each week with the ROLLING_WEEKS - 1
+    before it. Reads at most weeks + ROLLING_WEEKS - 1 stored rows.
+    """
+    span = weeks + ROLLING_WEEKS - 1
+    rows = db.execute(
+        """
+        SELECT week, total_weight, bodyweight_reps, set_count, e1rm_epley, e1rm_brzycki
+        FROM weekly_movement_rollup
+        WHERE movement = ? AND week >= (
+            SELECT date(max(week), ?) FROM weekly_movement_rollup WHERE movement = ?
+        )
+        ORDER BY week
+        """,
+        [movement, f"-{(span - 1) * 7} days", movement],
+    ).fetchall()
+    if not rows:
+        return []
+
+    stored = {row[0]: row for row in rows}
+    last = date.fromisoformat(rows[-1][0])
+    series = []
+    for i in reversed(range(span)):
+        week = (last - timedelta(weeks=i)).isoformat()
+        row = stored.get(week) or (week, 0.0, 0, 0, None, None)
+        series.append(
+            {
+                "week": week,
+                "total_weight": row[1],
+                "bodyweight_reps": row[2],
+                "set_count": row[3],
+                "e1rm_epley": row[4],
+                "e1rm_brzycki": row[5],
+            }
+        )
+
+    for i, point in enumerate(series):
+        window = series[max(0, i - ROLLING_WEEKS + 1) : i + 1]
+        point["rolling_volume"] = sum(p["total_weight"] for p in window) / len(window)
+    return series[-weeks:]
+
+
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[Tuple[float, float]]:
+    """
+    Downsample x-sorted (x, y) points to `threshold` with Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last point and, from each bucket in between, the
+    point forming the largest triangle with the previous pick and the next
+    bucket's average, so peaks and dips survive. O(n).
+    """
+    n = len(points)
+    if threshold >= n:
+        return list(points)
+    if threshold < 3:
+        return [points[0], points[-1]]
+
+    sampled = [points[0]]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        count = next_end - next_start
+        avg_x = sum(p[0] for p in points[next_start:next_end]) / count
+        avg_y = sum(p[1] for p in points[next_start:next_end]) / count
+
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def chart_series(days: Iterable[dict], points: int = CHART_POINTS) -> Dict[str, list]:
+    """
+    Volume and top set weight per day as [date, value] pairs, oldest first.
+
+    `days` are daily rollups (any order). Each series is downsampled to at
+    most `points` with LTTB, so the payload is bounded however long the
+    history is. Days without a weighted set have no top set.
+    """
+    days = sorted(days, key=lambda day: day["date"])
+    volume = [(date.fromisoformat(d["date"]).toordinal(), d["total_weight"]) for d in days]
+    top_weight = [
+        (date.fromisoformat(d["date"]).toordinal(), d["top_weight"])
+        for d in days
+        if d["top_weight"]
+    ]
+    return {
+        name: [[date.fromordinal(int(x)).isoformat(), y] for x, y in lttb(series, points)]
+        for name, series in (("volume", volume), ("top_weight", top_weight))
+    }
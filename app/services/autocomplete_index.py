@@ -0,0 +1,142 @@
+import heapq
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+# Minimum trigram similarity for a typo-tolerant match
+FUZZY_THRESHOLD = 0.3
+
+
+def _grams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _padded_trigrams(text: str) -> Set[str]:
+    return _grams(f"  {text} ", 3)
+
+
+class AutocompleteIndex:
+    """
+    In-memory ranked lookup over a vocabulary of names.
+
+    Results come in tiers: names starting with the query, names with a word
+    starting with it, names containing it, then names within a small typo
+    distance (trigram similarity). Prefix tiers are bisections of sorted
+    lists; substring and typo tiers use n-gram postings, so no tier scans
+    the whole vocabulary.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: Set[str] = set()
+        self._sorted: List[str] = []
+        # (word suffix, name) for every word after the first
+        self._words: List[tuple] = []
+        self._postings: Dict[str, Set[str]] = {}
+        for name in names:
+            if name and name not in self._names:
+                self._names.add(name)
+                self._sorted.append(name)
+                self._words.extend(self._word_suffixes(name))
+                self._index_grams(name)
+        self._sorted.sort()
+        self._words.sort()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _word_suffixes(name: str) -> List[tuple]:
+        return [
+            (name[i:], name)
+            for i in range(1, len(name))
+            if name[i - 1] == " " and name[i] != " "
+        ]
+
+    def _index_grams(self, name: str):
+        for gram in _grams(name, 2) | _grams(name, 3) | _padded_trigrams(name):
+            self._postings.setdefault(gram, set()).add(name)
+
+    def add(self, name: str):
+        """Add a single name, keeping every structure sorted."""
+        if not name or name in self._names:
+            return
+        self._names.add(name)
+        insort(self._sorted, name)
+        for entry in self._word_suffixes(name):
+            insort(self._words, entry)
+        self._index_grams(name)
+
+    def _prefix(self, q: str) -> List[str]:
+        matches = []
+        i = bisect_left(self._sorted, q)
+        while i < len(self._sorted) and self._sorted[i].startswith(q):
+            matches.append(self._sorted[i])
+            i += 1
+        return matches
+
+    def _word_prefix(self, q: str) -> List[str]:
+        matches = []
+        i = bisect_left(self._words, (q,))
+        while i < len(self._words) and self._words[i][0].startswith(q):
+            matches.append(self._words[i][1])
+            i += 1
+        return matches
+
+    def _substring(self, q: str) -> List[str]:
+        grams = _grams(q, min(len(q), 3))
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self._postings.get(g, ()))):
+            posting = self._postings.get(gram, set())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return []
+        return sorted(name for name in candidates if q in name)
+
+    def _fuzzy(self, q: str) -> List[str]:
+        q_grams = _padded_trigrams(q)
+        shared = Counter()
+        for gram in q_grams:
+            shared.update(self._postings.get(gram, ()))
+
+        scored = []
+        for name, count in shared.items():
+            n_grams = len(name) + 1
+            similarity = count / (len(q_grams) + n_grams - count)
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((-similarity, name))
+        scored.sort()
+        return [name for _, name in scored]
+
+    def tiers(self, q: str) -> Iterable[List[str]]:
+        """Yield the match tiers for `q`, best first, computed lazily."""
+        yield self._prefix(q)
+        yield self._word_prefix(q)
+        if len(q) >= 2:
+            yield self._substring(q)
+        if len(q) >= 3:
+            yield self._fuzzy(q)
+
+    def search(
+        self, q: str, limit: int = 10, rank: Optional[Callable[[str], Any]] = None
+    ) -> List[str]:
+        """
+        Return up to `limit` names ranked prefix, word prefix, substring, typo.
+
+        Within the exact-match tiers names are ordered by `rank` (highest
+        first, e.g. usage frecency); typo matches stay ordered by similarity.
+        """
+        results: List[str] = []
+        seen = set()
+        for tier_number, tier in enumerate(self.tiers(q)):
+            if rank is not None and tier_number < 3:
+                tier = heapq.nlargest(limit + len(seen), tier, key=rank)
+            for name in tier:
+                if name not in seen:
+                    seen.add(name)
+                    results.append(name)
+                    if len(results) == limit:
+                        return results
+        return results
@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Bounds on the rendered fragments kept in memory (per process)
+MAX_ENTRIES = 512
+MAX_BYTES = 8 * 1024 * 1024
+
+_lock = threading.Lock()
+# key -> rendered HTML, least recently used first
+_entries: "OrderedDict[tuple, str]" = OrderedDict()
+_size = 0
+_version = None
+
+
+def data_version(db) -> int:
+    """
+    The current data version.
+
+    Stored in the database and bumped in the same transaction as every
+    write, so it is right across worker processes.
+    """
+    return db.execute("SELECT version FROM data_version").fetchone()[0]
+
+
+def bump_data_version(db):
+    """Mark cached fragments stale; call inside the transaction that changes sets."""
+    db.execute("UPDATE data_version SET version = version + 1")
+
+
+def _clear():
+    global _size
+    _entries.clear()
+    _size = 0
+
+
+def get(key: tuple, version: int) -> Optional[str]:
+    """The fragment rendered for `key` at `version`, if still cached."""
+    with _lock:
+        if version != _version:
+            return None
+        content = _entries.get(key)
+        if content is not None:
+            _entries.move_to_end(key)
+        return content
+
+
+def put(key: tuple, version: int, content: str):
+    """Cache a fragment rendered at `version`, evicting the least recently used."""
+    global _size, _version
+    with _lock:
+        if _version is None or version > _version:
+            # Everything rendered before the latest write is stale
+            _clear()
+            _version = version
+        elif version < _version:
+            return
+
+        previous = _entries.pop(key, None)
+        if previous is not None:
+            _size -= len(previous)
+        _entries[key] = content
+        _size += len(content)
+        while _entries and (len(_entries) > MAX_ENTRIES or _size > MAX_BYTES):
+            _, evicted = _entries.popitem(last=False)
+            _size -= len(evicted)
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from app.database import get_write_db
+from app.models.schemas import ImportResult
+from app.services.importer import import_stream
+
+# Finished jobs are kept this long so their result can still be polled
+JOB_RETENTION_SECONDS = 60 * 60
+
+# A single worker so imports never compete with each other for the writer
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import")
+_jobs: Dict[str, "ImportJob"] = {}
+_jobs_lock = threading.Lock()
+
+
+class ImportJob:
+    """State of one background import, updated by the worker thread."""
+
+    def __init__(self, total_bytes: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.status = "queued"
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.result = ImportResult()
+        # Rows committed so far; a failed job keeps them
+        self.saved_rows = 0
+        self.error: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def fraction(self) -> float:
+        if self.status == "done":
+            return 1.0
+        if not self.total_bytes:
+            return 0.0
+        return min(self.bytes_read / self.total_bytes, 1.0)
+
+    @property
+    def eta_seconds(self) -> Optional[int]:
+        """Remaining time extrapolated from the bytes consumed so far."""
+        if self.started_at is None or self.is_finished or self.fraction <= 0:
+            return None
+        elapsed = time.monotonic() - self.started_at
+        return int(elapsed / self.fraction * (1 - self.fraction))
+
+
+def _run(job: ImportJob, path: str):
+    job.status = "running"
+    job.started_at = time.monotonic()
+
+    try:
+        # Every batch is its own transaction on the write connection, so
+        # other writers get in between batches
+        db = get_write_db()
+        with open(path, "rb") as stream:
+
+            # Batches commit one by one, so the set writer and other
+            # requests are never locked out for the whole import
+            def progress(result: ImportResult):
+                job.result = result
+                job.saved_rows = result.rows_count
+                job.bytes_read = stream.tell()
+
+            job.result = import_stream(db, stream, progress, batched=True)
+        job.status = "done"
+    except Exception as e:
+        job.error = f"{type(e).__name__}: {e}"
+        job.status = "failed"
+    finally:
+        job.finished_at = time.monotonic()
+        os.remove(path)
+
+
+def _prune_jobs():
+    cutoff = time.monotonic() - JOB_RETENTION_SECONDS
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at is not None and job.finished_at < cutoff:
+            del _jobs[job_id]
+
+
+def submit_import(path: str) -> ImportJob:
+    """
+    Queue the export stored at `path` for import and return immediately.
+
+    `path` is a temporary copy owned by the job and removed when it ends.
+    """
+    job = ImportJob(os.path.getsize(path))
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job.id] = job
+    _executor.submit(_run, job, path)
+    return job
+
+
+def get_job(job_id: str) -> Optional[ImportJob]:
+    """Look up a queued, running or recently finished import."""
+    with _jobs_lock:
+        return _jobs.get(job_id)
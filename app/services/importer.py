@@ -0,0 +1,231 @@
+import time
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+from app.database import transaction
+from app.models.schemas import ImportResult, ImportRowError
+from app.services import vocabulary
+from app.services.analytics import record_prs
+from app.services.fragment_cache import bump_data_version
+from app.services.json_stream import iter_sections
+from app.services.rollups import refresh_cardio_rollups, refresh_rollups, rollup_key
+from app.services.sessions import refresh_sessions
+from app.services.timestamps import to_epoch_ms
+from app.services.usage import record_usage
+
+# Rows sent per executemany call
+IMPORT_BATCH_SIZE = 1000
+
+# Row errors kept for display; the rest are only counted
+MAX_REPORTED_ERRORS = 50
+
+IMPORT_SECTIONS = ("movements", "equipmentTypes", "weightliftingSets", "cardioSets")
+
+INSERT_MOVEMENT = "INSERT OR IGNORE INTO movements (name) VALUES (?)"
+INSERT_EQUIPMENT = "INSERT OR IGNORE INTO equipment_types (name) VALUES (?)"
+INSERT_WEIGHTLIFTING = """
+    INSERT INTO weightlifting_set (movement, equipment_type, timestamp, timestamp_ms, n_of_reps, weight)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_CARDIO = """
+    INSERT INTO cardio_set
+        (movement, equipment_type, timestamp, timestamp_ms, distance, duration, power_output)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def iter_export_rows(data: dict) -> Iterator[Tuple[str, int, dict]]:
+    """Yield (section, index, item) for every row of a parsed export."""
+    for section in IMPORT_SECTIONS:
+        for index, item in enumerate(data.get(section) or []):
+            yield section, index, item
+
+
+def _normalize_name(value) -> str:
+    return value.lower().strip()
+
+
+class _BatchImporter:
+    """
+    Accumulates converted rows and flushes them in executemany chunks.
+
+    With `batched`, every flush is its own transaction that also refreshes
+    the derived tables for its rows; otherwise the caller's transaction
+    covers everything and `refresh` runs once at the end.
+    """
+
+    def __init__(self, db, result: ImportResult, progress=None, batched: bool = False):
+        self.db = db
+        self.result = result
+        self.progress = progress
+        self.batched = batched
+        self.movements = set()
+        self.equipment = set()
+        self.pending = {
+            INSERT_MOVEMENT: [],
+            INSERT_EQUIPMENT: [],
+            INSERT_WEIGHTLIFTING: [],
+            INSERT_CARDIO: [],
+        }
+        self.first_ms = None
+        self.last_ms = None
+        self.usage = {}
+        self.rollup_keys = set()
+        self.cardio_rollup_keys = set()
+
+    def record_error(self, section: str, index: int, error: Exception):
+        self.result.error_count += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(
+                ImportRowError(
+                    section=section,
+                    index=index,
+                    error=f"{type(error).__name__}: {error}",
+                )
+            )
+
+    def add_movement(self, name: str):
+        if name not in self.movements:
+            self.movements.add(name)
+            self.pending[INSERT_MOVEMENT].append((name,))
+
+    def add_equipment(self, name: str):
+        if name not in self.equipment:
+            self.equipment.add(name)
+            self.pending[INSERT_EQUIPMENT].append((name,))
+
+    def add_row(self, section: str, index: int, item: dict):
+        try:
+            if section == "movements":
+                self.add_movement(_normalize_name(item["name"]))
+                self.result.movements_count += 1
+            elif section == "equipmentTypes":
+                self.add_equipment(_normalize_name(item["name"]))
+                self.result.equipment_count += 1
+            elif section == "weightliftingSets":
+                params = (
+                    _normalize_name(item["movement"]),
+                    _normalize_name(item["equipmentType"]),
+                    item["timestamp"],
+                    to_epoch_ms(item["timestamp"]),
+                    int(item["nOfReps"]),
+                    float(item["weight"]),
+                )
+                self._track_timestamp(params[3])
+                self.add_movement(params[0])
+                self.add_equipment(params[1])
+                self.pending[INSERT_WEIGHTLIFTING].append(params)
+                self.rollup_keys.add(rollup_key(params[0], params[2]))
+                self.result.weightlifting_count += 1
+            elif section == "cardioSets":
+                params = (
+                    _normalize_name(item["movement"]),
+                    _normalize_name(item["equipmentType"]),
+                    item["timestamp"],
+                    to_epoch_ms(item["timestamp"]),
+                    float(item["distance"]),
+                    float(item["duration"]),
+                    float(item.get("powerOutput") or 0),
+                )
+                self._track_timestamp(params[3])
+                self.add_movement(params[0])
+                self.add_equipment(params[1])
+                self.pending[INSERT_CARDIO].append(params)
+                self.cardio_rollup_keys.add(rollup_key(params[0], params[2]))
+                self.result.cardio_count += 1
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            self.record_error(section, index, e)
+
+        if any(len(rows) >= IMPORT_BATCH_SIZE for rows in self.pending.values()):
+            self.flush()
+
+    def _track_timestamp(self, timestamp):
+        if self.first_ms is None or timestamp < self.first_ms:
+            self.first_ms = timestamp
+        if self.last_ms is None or timestamp > self.last_ms:
+            self.last_ms = timestamp
+
+    def flush(self):
+        if not self.batched:
+            self._write()
+        elif any(self.pending.values()):
+            with transaction(self.db):
+                self._write()
+                self.refresh()
+        if self.progress:
+            self.progress(self.result)
+
+    def _write(self):
+        # Vocabulary first so sets never reference names that are missing
+        for sql, rows in self.pending.items():
+            if rows:
+                self.db.executemany(sql, rows)
+                if sql is INSERT_WEIGHTLIFTING:
+                    self.usage.update(
+                        record_usage(self.db, [(r[0], r[1], r[3]) for r in rows])
+                    )
+                    record_prs(self.db, [(r[0], r[5], r[4], r[3]) for r in rows])
+                rows.clear()
+
+    def refresh(self):
+        """Bring sessions and rollups up to date for the rows written since the last refresh."""
+        # Merge the imported range into the stored workout sessions
+        if self.first_ms is not None:
+            refresh_sessions(self.db, self.first_ms, self.last_ms)
+        refresh_rollups(self.db, self.rollup_keys)
+        refresh_cardio_rollups(self.db, self.cardio_rollup_keys)
+        bump_data_version(self.db)
+        self.first_ms = self.last_ms = None
+        self.rollup_keys = set()
+        self.cardio_rollup_keys = set()
+
+
+def import_rows(
+    db,
+    rows: Iterable[Tuple[str, int, dict]],
+    progress: Optional[Callable[[ImportResult], None]] = None,
+    batched: bool = False,
+) -> ImportResult:
+    """
+    Import export rows using batched inserts.
+
+    Rows that cannot be converted are skipped and reported in the result.
+    By default everything is one transaction, so database errors abort the
+    whole import and nothing is half-applied. With `batched` each batch
+    commits on its own, so a long import never holds the write lock for
+    more than one batch and other writers get in between; a failure then
+    keeps the batches already committed.
+
+    `rows` may be a lazy stream; at most one batch is buffered at a time and
+    `progress` is called with the running result after every batch.
+    """
+    result = ImportResult()
+    started = time.perf_counter()
+    importer = _BatchImporter(db, result, progress, batched)
+
+    if batched:
+        for section, index, item in rows:
+            importer.add_row(section, index, item)
+        importer.flush()
+    else:
+        with transaction(db):
+            for section, index, item in rows:
+                importer.add_row(section, index, item)
+            importer.flush()
+            importer.refresh()
+
+    vocabulary.add_movements(importer.movements)
+    vocabulary.add_equipment(importer.equipment)
+    vocabulary.update_usage(importer.usage)
+
+    result.elapsed_seconds = time.perf_counter() - started
+    return result
+
+
+def import_export(db, data: dict) -> ImportResult:
+    """Import a fully parsed Flutter export."""
+    return import_rows(db, iter_export_rows(data))
+
+
+def import_stream(db, stream: BinaryIO, progress=None, batched: bool = False) -> ImportResult:
+    """Import an export file incrementally without loading it into memory."""
+    return import_rows(db, iter_sections(stream), progress, batched)
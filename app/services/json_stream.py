@@ -0,0 +1,138 @@
+import codecs
+import json
+import re
+from typing import Any, BinaryIO, Iterator, Tuple
+
+# Bytes read from the upload per refill
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+# Buffer tails that may be the start of a token cut off by a chunk boundary:
+# a literal, the rest of a number (`1.`, `1e+`) or a \u escape, including
+# a surrogate escape whose pair may follow
+_LITERAL_PREFIXES = frozenset(
+    word[:i]
+    for word in ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+    for i in range(1, len(word))
+)
+_PARTIAL_TOKEN = re.compile(r"\.|[eE][+-]?|u[0-9a-fA-F]{0,4}")
+
+
+class _Reader:
+    """Buffered UTF-8 reader that only keeps the unconsumed tail in memory."""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size: int = 0) -> bool:
+        """Append the next `size` (default chunk_size) bytes, dropping consumed text. False at EOF."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        self.eof = not chunk
+        self.buf = self.buf[self.pos:] + self.text_decoder.decode(chunk, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consume the next character, which must be one of `chars`."""
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expected one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def truncated(self, pos: int, error: json.JSONDecodeError = None) -> bool:
+        """
+        Whether decoding stopped at `pos` because the input may continue past the buffer.
+
+        Only a value reaching the end of the buffer can be incomplete; any
+        other error is malformed input, raised without reading further.
+        """
+        if self.eof:
+            return False
+        tail = self.buf[pos:]
+        if not tail or (error is not None and error.msg.startswith("Unterminated string")):
+            return True
+        return tail in _LITERAL_PREFIXES or _PARTIAL_TOKEN.fullmatch(tail) is not None
+
+    def decode(self) -> Any:
+        """Decode one complete JSON value, reading more input as needed."""
+        self.peek()
+        # Read sizes double while one value spans chunks, so buffering a
+        # large value costs linear rather than quadratic copying
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if not self.truncated(e.pos, e):
+                    raise
+            else:
+                # A value ending at the buffer edge may be cut short (`12` of `125`)
+                if not self.truncated(end):
+                    self.pos = end
+                    return value
+            self.fill(size)
+            size *= 2
+
+
+def iter_sections(
+    stream: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[str, int, Any]]:
+    """
+    Incrementally parse a top-level JSON object of arrays.
+
+    Yields (key, index, item) for every element of every top-level array,
+    one element at a time, so memory use is bounded by the largest single
+    element rather than the whole document. Non-array values are skipped.
+    """
+    reader = _Reader(stream, chunk_size)
+    yield from _iter_object(reader)
+
+
+def _iter_object(reader: _Reader) -> Iterator[Tuple[str, int, Any]]:
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+
+    while True:
+        key = reader.decode()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError("Expected an object key", reader.buf, reader.pos)
+        reader.expect(":")
+
+        if reader.peek() == "[":
+            reader.pos += 1
+            index = 0
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, index, reader.decode()
+                    index += 1
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            reader.decode()
+
+        if reader.expect(",}") == "}":
+            return
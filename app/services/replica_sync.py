@@ -0,0 +1,305 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.config import (
+    SYNC_DEBOUNCE_SECONDS,
+    SYNC_INTERVAL_SECONDS,
+    SYNC_MAX_BACKOFF_SECONDS,
+)
+from app.database import connect_upstream, get_db, pull_upstream, transaction
+from app.migrations import run_migrations
+from app.models.records import CARDIO_COLUMNS, WEIGHTLIFTING_COLUMNS
+from app.services.analytics import record_prs, refresh_prs
+from app.services.fragment_cache import bump_data_version
+from app.services.rollups import (
+    rebuild_cardio_rollups,
+    rebuild_rollups,
+    refresh_cardio_rollups,
+    refresh_rollups,
+    rollup_key,
+)
+from app.services.sessions import rebuild_sessions, refresh_sessions
+from app.services.usage import rebuild_usage, record_usage, refresh_usage
+
+# Raw tables whose changes are pushed; everything else is derived from them
+REPLICATED = {
+    "weightlifting_set": WEIGHTLIFTING_COLUMNS,
+    "cardio_set": CARDIO_COLUMNS,
+}
+
+# Outbox entries pushed per upstream transaction
+PUSH_BATCH_SIZE = 500
+
+# Rows copied per query when seeding a new local database
+SEED_PAGE_SIZE = 5000
+
+_NOW_MS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+
+_lock = threading.Lock()
+_thread = None
+_last_synced: Optional[datetime] = None
+_last_error: Optional[str] = None
+_failures = 0
+_retry_at: Optional[float] = None
+
+
+def _install_outbox(db):
+    """
+    Record every change to a replicated table in sync_outbox.
+
+    Triggers catch every writer (the set writer, edits, imports), in the
+    same transaction as the change. Only the row id is kept: the row is
+    read when it is pushed, so repeated edits collapse into one push.
+    """
+    db.execute(f"""
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            created_ms INTEGER NOT NULL DEFAULT ({_NOW_MS})
+        )
+    """)
+    for table in REPLICATED:
+        for event, rows in (
+            ("INSERT", ["NEW.id"]),
+            ("UPDATE", ["OLD.id", "NEW.id"]),
+            ("DELETE", ["OLD.id"]),
+        ):
+            values = ", ".join(f"('{table}', {row})" for row in rows)
+            db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS sync_outbox_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO sync_outbox (table_name, row_id) VALUES {values};
+                END
+            """)
+
+
+def is_seeded(db) -> bool:
+    """Whether the local database was seeded from the upstream and records its changes."""
+    return bool(
+        db.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'sync_outbox'"
+        ).fetchone()[0]
+    )
+
+
+def _copy_table(db, upstream, table: str, columns: str):
+    marks = ", ".join("?" * len(columns.split(",")))
+    after = 0
+    while True:
+        rows = upstream.execute(
+            f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+            [after, SEED_PAGE_SIZE],
+        ).fetchall()
+        if not rows:
+            return
+        db.executemany(f"INSERT INTO {table} ({columns}) VALUES ({marks})", rows)
+        after = rows[-1][0]
+
+
+def seed(db, upstream):
+    """
+    Copy the upstream's sets into a new local database and derive the rest.
+
+    Sets keep their ids, so local inserts continue after the upstream's and
+    pushed rows land on the same ids. The outbox is installed in the same
+    transaction, so a database is either seeded and recording or untouched.
+    """
+    with transaction(db):
+        for table in ("movements", "equipment_types"):
+            rows = upstream.execute(f"SELECT name FROM {table}").fetchall()
+            db.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", rows)
+        for table, columns in REPLICATED.items():
+            _copy_table(db, upstream, table, columns)
+
+        rebuild_sessions(db)
+        rebuild_rollups(db)
+        rebuild_cardio_rollups(db)
+        rebuild_usage(db)
+        movements = db.execute("SELECT DISTINCT movement FROM weightlifting_set").fetchall()
+        refresh_prs(db, [row[0] for row in movements])
+        _install_outbox(db)
+        bump_data_version(db)
+
+
+def _fetch_rows(db, table: str, ids: List[int]) -> List[tuple]:
+    marks = ", ".join("?" * len(ids))
+    return db.execute(
+        f"SELECT {REPLICATED[table]} FROM {table} WHERE id IN ({marks})", ids
+    ).fetchall()
+
+
+def _refresh_derived(upstream, old: Dict[str, list], new: Dict[str, list]):
+    """Bring the upstream's derived tables up to date for replaced (old) and pushed (new) rows."""
+    lifting = old["weightlifting_set"] + new["weightlifting_set"]
+    cardio = old["cardio_set"] + new["cardio_set"]
+    rows = lifting + cardio
+    if not rows:
+        return
+
+    for table, column in (("movements", 1), ("equipment_types", 2)):
+        names = {row[column] for pushed in new.values() for row in pushed}
+        upstream.executemany(
+            f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [[name] for name in names]
+        )
+    # Rows are in *_COLUMNS order: (id, movement, equipment_type, timestamp, timestamp_ms, ...)
+    refresh_sessions(upstream, min(row[4] for row in rows), max(row[4] for row in rows))
+    refresh_rollups(upstream, {rollup_key(row[1], row[3]) for row in lifting})
+    refresh_cardio_rollups(upstream, {rollup_key(row[1], row[3]) for row in cardio})
+
+    # Edited or deleted sets need exact recounts, before and after the edit;
+    # brand new ones only add up
+    replaced_ids = {row[0] for row in old["weightlifting_set"]}
+    changed = old["weightlifting_set"] + [
+        row for row in new["weightlifting_set"] if row[0] in replaced_ids
+    ]
+    added = [row for row in new["weightlifting_set"] if row[0] not in replaced_ids]
+    pairs = {(row[1], row[2]) for row in changed}
+    movements = {row[1] for row in changed}
+    refresh_usage(upstream, pairs)
+    refresh_prs(upstream, movements)
+    record_usage(upstream, [(r[1], r[2], r[4]) for r in added if (r[1], r[2]) not in pairs])
+    record_prs(upstream, [(r[1], r[6], r[5], r[4]) for r in added if r[1] not in movements])
+
+
+def push_changes(db, upstream, limit: int = PUSH_BATCH_SIZE) -> int:
+    """
+    Push the oldest `limit` outbox entries to the upstream; returns how many.
+
+    Each changed row is pushed as it is now (or deleted if it is gone) in
+    one upstream transaction that also refreshes the upstream's derived
+    tables, and only then dropped from the outbox. Pushing is idempotent, so
+    entries left behind by a failure are simply pushed again.
+    """
+    entries = db.execute(
+        "SELECT id, table_name, row_id FROM sync_outbox ORDER BY id LIMIT ?", [limit]
+    ).fetchall()
+    if not entries:
+        return 0
+
+    ids = {table: [] for table in REPLICATED}
+    for _, table, row_id in entries:
+        ids[table].append(row_id)
+
+    pull_upstream(upstream)
+    old = {table: [] for table in REPLICATED}
+    new = {table: [] for table in REPLICATED}
+    with transaction(upstream):
+        for table, row_ids in ids.items():
+            if not row_ids:
+                continue
+            row_ids = list(dict.fromkeys(row_ids))
+            old[table] = _fetch_rows(upstream, table, row_ids)
+            new[table] = _fetch_rows(db, table, row_ids)
+            marks = ", ".join("?" * len(row_ids))
+            upstream.execute(f"DELETE FROM {table} WHERE id IN ({marks})", row_ids)
+            columns = REPLICATED[table]
+            values = ", ".join("?" * len(columns.split(",")))
+            upstream.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({values})", new[table]
+            )
+        _refresh_derived(upstream, old, new)
+        bump_data_version(upstream)
+
+    # Committed right away: left open, it would keep the write lock from the set writer
+    with transaction(db):
+        db.execute("DELETE FROM sync_outbox WHERE id <= ?", [entries[-1][0]])
+    return len(entries)
+
+
+def _pending(db) -> tuple:
+    """(count, oldest created_ms, newest created_ms) of the unpushed changes."""
+    return db.execute(
+        "SELECT count(*), min(created_ms), max(created_ms) FROM sync_outbox"
+    ).fetchone()
+
+
+def _backoff(failures: int) -> float:
+    delay = min(max(SYNC_DEBOUNCE_SECONDS, 1) * 2 ** failures, SYNC_MAX_BACKOFF_SECONDS)
+    # Jitter so several instances don't retry in lockstep
+    return delay * random.uniform(0.5, 1)
+
+
+def _due(db) -> bool:
+    """Whether there are changes and writes paused for the debounce, or the oldest waited an interval."""
+    count, oldest, newest = _pending(db)
+    now_ms = time.time() * 1000
+    return bool(count) and (
+        now_ms - newest >= SYNC_DEBOUNCE_SECONDS * 1000
+        or now_ms - oldest >= SYNC_INTERVAL_SECONDS * 1000
+    )
+
+
+def _run():
+    global _last_synced, _last_error, _failures, _retry_at
+    db = get_db()
+    upstream = None
+    while True:
+        time.sleep(SYNC_DEBOUNCE_SECONDS)
+        if _retry_at is not None and time.monotonic() < _retry_at:
+            continue
+
+        try:
+            if not _due(db):
+                continue
+            if upstream is None:
+                upstream = connect_upstream()
+                run_migrations(upstream)
+            while push_changes(db, upstream):
+                pass
+        except Exception as e:
+            # Reconnect on the next attempt, in case the connection is what broke
+            upstream = None
+            with _lock:
+                _failures += 1
+                _last_error = f"{type(e).__name__}: {e}"
+                _retry_at = time.monotonic() + _backoff(_failures)
+        else:
+            with _lock:
+                _last_synced = datetime.now(timezone.utc)
+                _last_error = None
+                _failures = 0
+                _retry_at = None
+
+
+def start(db):
+    """
+    Start pushing local changes to the upstream in the background.
+
+    A new local database is seeded from the upstream first, which is the
+    only time the upstream has to be reachable for the app to start.
+    """
+    global _thread
+    if not is_seeded(db):
+        upstream = connect_upstream()
+        run_migrations(upstream)
+        pull_upstream(upstream)
+        seed(db, upstream)
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name="replica-sync", daemon=True)
+            _thread.start()
+
+
+def sync_status(db) -> dict:
+    """
+    How far the upstream lags behind the local database.
+
+    `lag_seconds` is the age of the oldest change not yet pushed (0 when
+    fully synced); `retry_in_seconds` is set while backing off after errors.
+    """
+    count, oldest, _ = _pending(db)
+    with _lock:
+        retry_in = None if _retry_at is None else max(_retry_at - time.monotonic(), 0)
+        return {
+            "pending_changes": count,
+            "lag_seconds": round(max(time.time() * 1000 - oldest, 0) / 1000, 1) if count else 0.0,
+            "last_synced": _last_synced.isoformat() if _last_synced else None,
+            "last_error": _last_error,
+            "failures": _failures,
+            "retry_in_seconds": None if retry_in is None else round(retry_in, 1),
+        }
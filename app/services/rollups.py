@@ -0,0 +1,379 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.models.records import (
+    CARDIO_COLUMNS,
+    WEIGHTLIFTING_COLUMNS,
+    CardioRow,
+    WeightliftingRow,
+)
+from app.services.aggregation import EQUIPMENT_BODYWEIGHT, EQUIPMENT_DUMBBELL
+from app.services.analytics import BRZYCKI_SQL, EPLEY_SQL, week_start
+
+# One row per (movement, day), totalled by SQLite with the same rules as
+# calculate_total_weight: bodyweight counts reps, dumbbells count double.
+# The day is the stored text's date prefix, like summarize_days. The last
+# columns are the day's best estimated 1RM by each formula and its top set.
+# {equipment}, {where} and {group} pick the key and the sets (see _totals).
+DAY_TOTALS = f"""
+    SELECT movement, {{equipment}}
+           substr(timestamp, 1, 10) AS date,
+           total(CASE lower(equipment_type)
+                     WHEN '{EQUIPMENT_BODYWEIGHT}' THEN 0
+                     WHEN '{EQUIPMENT_DUMBBELL}' THEN weight * n_of_reps * 2
+                     ELSE weight * n_of_reps
+                 END),
+           sum(CASE lower(equipment_type)
+                   WHEN '{EQUIPMENT_BODYWEIGHT}' THEN n_of_reps
+                   ELSE 0
+               END),
+           min(timestamp_ms),
+           max(timestamp_ms),
+           count(*),
+           max({EPLEY_SQL}),
+           max({BRZYCKI_SQL}),
+           max(weight)
+    FROM weightlifting_set
+    {{where}}
+    GROUP BY {{group}}
+"""
+
+INSERT_ROLLUPS = """
+    INSERT INTO {table}
+        (movement, {equipment} date, total_weight, bodyweight_reps, first_ms, last_ms, set_count,
+         e1rm_epley, e1rm_brzycki, top_weight)
+"""
+
+# Weeks (starting Monday) are totalled from the daily rows, never the sets
+WEEK_TOTALS = """
+    INSERT INTO weekly_movement_rollup
+        (movement, week, total_weight, bodyweight_reps, set_count, e1rm_epley, e1rm_brzycki)
+    SELECT movement, ?, total(total_weight), sum(bodyweight_reps), sum(set_count),
+           max(e1rm_epley), max(e1rm_brzycki)
+    FROM daily_movement_rollup
+    WHERE movement = ? AND date >= ? AND date < ?
+    GROUP BY movement
+"""
+
+# Every week of the daily rows {where} picks, each dated by its Monday
+WEEKS_TOTALS = """
+    INSERT INTO weekly_movement_rollup
+        (movement, week, total_weight, bodyweight_reps, set_count, e1rm_epley, e1rm_brzycki)
+    SELECT movement, date(date, '-' || ((strftime('%w', date) + 6) % 7) || ' days') AS week,
+           total(total_weight), sum(bodyweight_reps), sum(set_count),
+           max(e1rm_epley), max(e1rm_brzycki)
+    FROM daily_movement_rollup
+    {where}
+    GROUP BY movement, week
+"""
+
+# The cardio equivalent, with the same rules as calculate_cardio_totals:
+# power only counts over the duration of sets that recorded any.
+CARDIO_DAY_TOTALS = """
+    SELECT movement, {equipment}
+           substr(timestamp, 1, 10) AS date,
+           total(distance),
+           total(duration),
+           total(CASE WHEN power_output > 0 THEN power_output * duration ELSE 0 END),
+           total(CASE WHEN power_output > 0 THEN duration ELSE 0 END),
+           min(timestamp_ms),
+           max(timestamp_ms),
+           count(*)
+    FROM cardio_set
+    {where}
+    GROUP BY {group}
+"""
+
+INSERT_CARDIO_ROLLUPS = """
+    INSERT INTO {table}
+        (movement, {equipment} date, distance, duration, work, powered_duration,
+         first_ms, last_ms, set_count)
+"""
+
+# Day lookups range over the stored text; see fetch_day_sets
+_DAY_RANGE = "WHERE movement = ? AND timestamp >= ? AND timestamp < ?"
+
+# The same day by its date prefix, which the day indexes are keyed by
+_DAY = "WHERE movement = ? AND substr(timestamp, 1, 10) = ?"
+
+# Days first through last, inclusive, by the same prefix
+_SPAN = "WHERE movement = ? AND substr(timestamp, 1, 10) BETWEEN ? AND ?"
+
+# A movement with at least this many changed days or weeks (an import, say)
+# is re-totalled over its whole span in one statement per table rather
+# than a pair of statements per day
+SPAN_REFRESH_MIN = 8
+
+# Every daily rollup has a per-equipment twin keyed (movement, equipment_type,
+# date), so History filtered by equipment pages over stored rows as well
+EQUIPMENT_ROLLUPS = {
+    "daily_movement_rollup": "daily_equipment_rollup",
+    "daily_cardio_rollup": "daily_cardio_equipment_rollup",
+}
+
+
+def rollup_key(movement: str, timestamp) -> Tuple[str, str]:
+    """The (movement, YYYY-MM-DD) rollup row a set belongs to."""
+    return movement, str(timestamp)[:10]
+
+
+def _next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def _fetch_day(db, table: str, columns: str, movement: str, day: str, equipment: Optional[str]):
+    where, params = _DAY_RANGE, [movement, day, _next_day(day)]
+    if equipment:
+        where += " AND equipment_type = ?"
+        params.append(equipment)
+    return db.execute(
+        f"""
+        SELECT {columns}
+        FROM {table}
+        {where}
+        ORDER BY timestamp DESC
+        """,
+        params,
+    ).fetchall()
+
+
+def fetch_day_sets(
+    db, movement: str, day: str, equipment: Optional[str] = None
+) -> List[WeightliftingRow]:
+    """
+    Fetch one movement's sets for one day, newest first, optionally of one equipment type.
+
+    Both stored timestamp spellings start with the date, so the day is a
+    plain range on the timestamp text.
+    """
+    rows = _fetch_day(db, "weightlifting_set", WEIGHTLIFTING_COLUMNS, movement, day, equipment)
+    return [WeightliftingRow._make(row) for row in rows]
+
+
+def fetch_cardio_day_sets(
+    db, movement: str, day: str, equipment: Optional[str] = None
+) -> List[CardioRow]:
+    """Fetch one movement's cardio sets for one day, newest first."""
+    rows = _fetch_day(db, "cardio_set", CARDIO_COLUMNS, movement, day, equipment)
+    return [CardioRow._make(row) for row in rows]
+
+
+def _totals(
+    insert: str, totals: str, rollup_table: str, by_equipment: bool, scope: str
+) -> str:
+    """
+    An INSERT ... SELECT of day totals into a rollup table or its per-equipment twin.
+
+    `scope` is "all" days, one "day" or a "span" of days. One day's totals
+    are read in index order, so SQLite never sorts to group them: the whole
+    day is a range of the (movement, timestamp) index, and its equipment
+    types follow each other in the (movement, day, equipment) index. The
+    date is constant there and left out of the grouping. A span is a range
+    of the (movement, day, equipment) index, grouped in that order too.
+    """
+    equipment = "equipment_type," if by_equipment else ""
+    table = EQUIPMENT_ROLLUPS[rollup_table] if by_equipment else rollup_table
+    if scope == "all":
+        where, group = "", f"movement, {equipment} date"
+    elif scope == "span":
+        where = _SPAN
+        group = "movement, date, equipment_type" if by_equipment else "movement, date"
+    elif by_equipment:
+        where, group = _DAY, "movement, equipment_type"
+    else:
+        where, group = _DAY_RANGE, "movement"
+    return insert.format(table=table, equipment=equipment) + totals.format(
+        where=where, equipment=equipment, group=group
+    )
+
+
+def _by_movement(keys) -> Dict[str, List[str]]:
+    days = {}
+    for movement, day in keys:
+        days.setdefault(movement, []).append(day)
+    return days
+
+
+def _refresh(db, rollup_table: str, insert: str, totals: str, keys):
+    by_movement = _by_movement(set(keys))
+    for table, by_equipment in ((rollup_table, False), (EQUIPMENT_ROLLUPS[rollup_table], True)):
+        select = _totals(insert, totals, rollup_table, by_equipment, "day")
+        for movement, days in by_movement.items():
+            if len(days) >= SPAN_REFRESH_MIN:
+                first, last = min(days), max(days)
+                db.execute(
+                    f"DELETE FROM {table} WHERE movement = ? AND date BETWEEN ? AND ?",
+                    [movement, first, last],
+                )
+                db.execute(
+                    _totals(insert, totals, rollup_table, by_equipment, "span"),
+                    [movement, first, last],
+                )
+                continue
+            for day in days:
+                db.execute(
+                    f"DELETE FROM {table} WHERE movement = ? AND date = ?",
+                    [movement, day],
+                )
+                params = [movement, day] if by_equipment else [movement, day, _next_day(day)]
+                db.execute(select, params)
+
+
+def refresh_rollups(db, keys: Iterable[Tuple[str, str]]):
+    """
+    Recompute the rollup rows for the given (movement, date) keys.
+
+    Totals are computed inside SQLite with INSERT ... SELECT, so no set rows
+    are transferred to Python. The weeks containing those days are then
+    re-totalled from at most seven daily rows each.
+    """
+    keys = set(keys)
+    _refresh(db, "daily_movement_rollup", INSERT_ROLLUPS, DAY_TOTALS, keys)
+    for movement, days in _by_movement(keys).items():
+        weeks = {week_start(day) for day in days}
+        if len(weeks) >= SPAN_REFRESH_MIN:
+            _refresh_weeks(db, movement, min(weeks), max(weeks))
+        else:
+            for week in weeks:
+                _refresh_week(db, movement, week)
+
+
+def _refresh_week(db, movement: str, week: str):
+    db.execute(
+        "DELETE FROM weekly_movement_rollup WHERE movement = ? AND week = ?",
+        [movement, week],
+    )
+    db.execute(WEEK_TOTALS, [week, movement, week, _next_week(week)])
+
+
+def _refresh_weeks(db, movement: str, first: str, last: str):
+    db.execute(
+        "DELETE FROM weekly_movement_rollup WHERE movement = ? AND week BETWEEN ? AND ?",
+        [movement, first, last],
+    )
+    db.execute(
+        WEEKS_TOTALS.format(where="WHERE movement = ? AND date >= ? AND date < ?"),
+        [movement, first, _next_week(last)],
+    )
+
+
+def _next_week(week: str) -> str:
+    return (date.fromisoformat(week) + timedelta(days=7)).isoformat()
+
+
+def refresh_cardio_rollups(db, keys: Iterable[Tuple[str, str]]):
+    """Recompute the cardio rollup rows for the given (movement, date) keys, like refresh_rollups."""
+    _refresh(db, "daily_cardio_rollup", INSERT_CARDIO_ROLLUPS, CARDIO_DAY_TOTALS, keys)
+
+
+def _rebuild(db, rollup_table: str, insert: str, totals: str):
+    for by_equipment in (False, True):
+        table = EQUIPMENT_ROLLUPS[rollup_table] if by_equipment else rollup_table
+        db.execute(f"DELETE FROM {table}")
+        db.execute(_totals(insert, totals, rollup_table, by_equipment, "all"))
+
+
+def rebuild_rollups(db):
+    """Recompute every rollup row in a single grouped query per table."""
+    _rebuild(db, "daily_movement_rollup", INSERT_ROLLUPS, DAY_TOTALS)
+    db.execute("DELETE FROM weekly_movement_rollup")
+    db.execute(WEEKS_TOTALS.format(where=""))
+
+
+def rebuild_cardio_rollups(db):
+    """Recompute every cardio rollup row in a single grouped query per table."""
+    _rebuild(db, "daily_cardio_rollup", INSERT_CARDIO_ROLLUPS, CARDIO_DAY_TOTALS)
+
+
+ROLLUP_COLUMNS = (
+    "movement", "date", "total_weight", "bodyweight_reps", "first_ms", "last_ms", "set_count",
+    "e1rm_epley", "e1rm_brzycki", "top_weight",
+)
+
+CARDIO_ROLLUP_COLUMNS = (
+    "movement", "date", "distance", "duration", "work", "powered_duration",
+    "first_ms", "last_ms", "set_count",
+)
+
+
+def _fetch_history(
+    db,
+    rollup_table: str,
+    columns: Tuple[str, ...],
+    movements: Sequence[str],
+    equipment: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    before: Optional[str],
+    limit: int,
+) -> Dict[str, List[dict]]:
+    # Upper bound is exclusive: the earlier of `before` and the day after `end`
+    upper = min(before or "9999-12-31", _next_day(end) if end else "9999-12-31")
+    lower = start or ""
+
+    # One keyset-limited arm per movement, sent as a single statement. Each
+    # arm is a bounded range scan of a rollup primary key: the per-equipment
+    # rollup's when totals are filtered by equipment.
+    arms, params = [], []
+    for movement in dict.fromkeys(movements):
+        if equipment:
+            where = "movement = ? AND equipment_type = ?"
+            params += [movement, equipment, lower, upper]
+            table = EQUIPMENT_ROLLUPS[rollup_table]
+        else:
+            where = "movement = ?"
+            params += [movement, lower, upper]
+            table = rollup_table
+        arms.append(f"""
+            SELECT * FROM (
+                SELECT {", ".join(columns)} FROM {table}
+                WHERE {where} AND date >= ? AND date < ?
+                ORDER BY date DESC LIMIT ?
+            )
+        """)
+        params.append(limit)
+
+    history = {movement: [] for movement in movements}
+    if arms:
+        for row in db.execute(" UNION ALL ".join(arms), params).fetchall():
+            history[row[0]].append(dict(zip(columns, row)))
+    return history
+
+
+def fetch_rollups(
+    db,
+    movements: Sequence[str],
+    equipment: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = -1,
+) -> Dict[str, List[dict]]:
+    """
+    Daily totals for each movement, newest day first, in one query.
+
+    `start` and `end` bound the days (inclusive, YYYY-MM-DD). Pages are
+    keyset-based: pass the last date seen as `before` to get the next
+    `limit` days of every movement. With `equipment` the totals only count
+    sets of that equipment type, from the per-equipment rollups.
+    """
+    return _fetch_history(
+        db, "daily_movement_rollup", ROLLUP_COLUMNS,
+        movements, equipment, start, end, before, limit,
+    )
+
+
+def fetch_cardio_rollups(
+    db,
+    movements: Sequence[str],
+    equipment: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: int = -1,
+) -> Dict[str, List[dict]]:
+    """Daily cardio totals for each movement, filtered and paged like fetch_rollups."""
+    return _fetch_history(
+        db, "daily_cardio_rollup", CARDIO_ROLLUP_COLUMNS,
+        movements, equipment, start, end, before, limit,
+    )
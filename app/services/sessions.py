@@ -0,0 +1,229 @@
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from app.services.aggregation import format_cardio_totals
+from app.services.timestamps import from_epoch_ms
+
+# Workout session threshold (2 hours)
+WORKOUT_SESSION_THRESHOLD = timedelta(hours=2)
+_THRESHOLD_MS = WORKOUT_SESSION_THRESHOLD // timedelta(milliseconds=1)
+
+
+def _iter_cursor(cursor, batch_size: int = 500) -> Iterator[tuple]:
+    """Yield rows from a cursor in batches."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def _iter_sets(db, start_ms: Optional[int] = None, end_ms: Optional[int] = None):
+    """
+    Yield (timestamp_ms, movement, n_of_reps, weight, distance, duration,
+    power_output) in time order, weightlifting and cardio sets interleaved.
+
+    Each table is a single range scan of its epoch-ms index and SQLite
+    merges the two ordered streams; only one batch is held in memory at a
+    time. Columns the other table lacks are NULL.
+    """
+    where = ""
+    params = []
+    if start_ms is not None:
+        where = " WHERE timestamp_ms BETWEEN ? AND ?"
+        params = [start_ms, end_ms, start_ms, end_ms]
+    sql = (
+        "SELECT timestamp_ms, movement, n_of_reps, weight, NULL, NULL, NULL"
+        " FROM weightlifting_set" + where
+        + " UNION ALL"
+        " SELECT timestamp_ms, movement, NULL, NULL, distance, duration, power_output"
+        " FROM cardio_set" + where
+        + " ORDER BY 1"
+    )
+    return _iter_cursor(db.execute(sql, params))
+
+
+def _iter_sessions(sets: Iterable[tuple]) -> Iterator[List[tuple]]:
+    """Split time-ordered sets wherever the gap reaches the threshold."""
+    session = []
+    for s in sets:
+        if session and (s[0] - session[-1][0]) >= _THRESHOLD_MS:
+            yield session
+            session = []
+        session.append(s)
+    if session:
+        yield session
+
+
+# Sessions stored per round of batched statements
+SESSION_BATCH_SIZE = 500
+
+
+def _session_totals(session_sets: List[tuple]):
+    """Per-movement lifting and cardio totals of one session, most recent movement first."""
+    exercises = {}
+    cardio = {}
+    for _, movement, reps, weight, distance, duration, power in reversed(session_sets):
+        if distance is None:
+            if movement not in exercises:
+                exercises[movement] = [0.0, 0]
+            exercises[movement][0] += weight * reps
+            exercises[movement][1] += 1
+        else:
+            # Same totals as calculate_cardio_totals
+            if movement not in cardio:
+                cardio[movement] = [0.0, 0.0, 0.0, 0.0, 0]
+            totals = cardio[movement]
+            totals[0] += distance
+            totals[1] += duration
+            if power and power > 0:
+                totals[2] += power * duration
+                totals[3] += duration
+            totals[4] += 1
+    return exercises, cardio
+
+
+def _insert_sessions(db, sessions: List[List[tuple]]):
+    """
+    Store time-ordered sessions and their per-movement totals.
+
+    Each table gets one statement, whatever the number of sessions; the
+    sessions never overlap, so their new ids come back keyed by start time.
+    """
+    ids = dict(
+        db.execute(
+            "INSERT INTO workout_session (start_ms, end_ms, set_count) VALUES "
+            + ", ".join(["(?, ?, ?)"] * len(sessions))
+            + " RETURNING start_ms, id",
+            [value for s in sessions for value in (s[0][0], s[-1][0], len(s))],
+        ).fetchall()
+    )
+
+    # Keep movements ordered by most recent appearance, like the summary view
+    movement_rows, cardio_rows = [], []
+    for session_sets in sessions:
+        session_id = ids[session_sets[0][0]]
+        exercises, cardio = _session_totals(session_sets)
+        movement_rows += [[session_id, m, total, count] for m, (total, count) in exercises.items()]
+        cardio_rows += [[session_id, m, *totals] for m, totals in cardio.items()]
+
+    db.executemany(
+        """
+        INSERT INTO workout_session_movement (session_id, movement, total_weight, set_count)
+        VALUES (?, ?, ?, ?)
+        """,
+        movement_rows,
+    )
+    db.executemany(
+        """
+        INSERT INTO workout_session_cardio
+            (session_id, movement, distance, duration, work, powered_duration, set_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        cardio_rows,
+    )
+
+
+def _store_sessions(db, sets: Iterable[tuple]):
+    """Split time-ordered sets into sessions and store them a batch at a time."""
+    batch = []
+    for session_sets in _iter_sessions(sets):
+        batch.append(session_sets)
+        if len(batch) >= SESSION_BATCH_SIZE:
+            _insert_sessions(db, batch)
+            batch = []
+    if batch:
+        _insert_sessions(db, batch)
+
+
+def _delete_sessions(db, session_ids: List[int]):
+    """Delete sessions and their movement totals."""
+    params = [[session_id] for session_id in session_ids]
+    db.executemany("DELETE FROM workout_session_movement WHERE session_id = ?", params)
+    db.executemany("DELETE FROM workout_session_cardio WHERE session_id = ?", params)
+    db.executemany("DELETE FROM workout_session WHERE id = ?", params)
+
+
+def refresh_sessions(db, start_ms: int, end_ms: Optional[int] = None):
+    """
+    Bring stored sessions up to date after sets between start_ms and end_ms changed.
+
+    Only sessions within the threshold of the changed range can gain, lose,
+    merge or split, so those are deleted and rebuilt from the raw sets they
+    span. Everything else is left untouched. (The unary + keeps the lookup on
+    the end_ms index, which is the selective side for recent changes.)
+    """
+    if end_ms is None:
+        end_ms = start_ms
+
+    affected = db.execute(
+        """
+        SELECT id, start_ms, end_ms
+        FROM workout_session
+        WHERE end_ms > ? AND +start_ms < ?
+        """,
+        [start_ms - _THRESHOLD_MS, end_ms + _THRESHOLD_MS],
+    ).fetchall()
+
+    lo, hi = start_ms, end_ms
+    for row in affected:
+        lo = min(lo, row[1])
+        hi = max(hi, row[2])
+
+    _delete_sessions(db, [row[0] for row in affected])
+    _store_sessions(db, _iter_sets(db, lo, hi))
+
+
+def rebuild_sessions(db):
+    """Recompute every stored session from the raw sets."""
+    db.execute("DELETE FROM workout_session_movement")
+    db.execute("DELETE FROM workout_session_cardio")
+    db.execute("DELETE FROM workout_session")
+    _store_sessions(db, _iter_sets(db))
+
+
+def get_latest_session(db) -> Optional[Dict]:
+    """Return the most recent session with its per-movement and cardio totals."""
+    row = db.execute(
+        """
+        SELECT id, start_ms, end_ms, set_count
+        FROM workout_session
+        ORDER BY end_ms DESC
+        LIMIT 1
+        """
+    ).fetchone()
+
+    if not row:
+        return None
+
+    movements = db.execute(
+        """
+        SELECT movement, total_weight, set_count
+        FROM workout_session_movement
+        WHERE session_id = ?
+        ORDER BY id
+        """,
+        [row[0]],
+    ).fetchall()
+    cardio = db.execute(
+        """
+        SELECT movement, distance, duration, work, powered_duration, set_count
+        FROM workout_session_cardio
+        WHERE session_id = ?
+        ORDER BY id
+        """,
+        [row[0]],
+    ).fetchall()
+
+    return {
+        "start_time": from_epoch_ms(row[1]),
+        "end_time": from_epoch_ms(row[2]),
+        "set_count": row[3],
+        "exercises": {
+            m[0]: {"total_weight": m[1], "count": m[2]} for m in movements
+        },
+        "cardio": {
+            c[0]: {**format_cardio_totals(c[1], c[2], c[3], c[4]), "count": c[5]}
+            for c in cardio
+        },
+    }
@@ -0,0 +1,132 @@
+import queue
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+from app.database import get_write_db, transaction
+from app.services import vocabulary
+from app.services.analytics import record_prs
+from app.services.fragment_cache import bump_data_version
+from app.services.rollups import refresh_cardio_rollups, refresh_rollups, rollup_key
+from app.services.sessions import refresh_sessions
+from app.services.timestamps import format_timestamp, to_epoch_ms
+from app.services.usage import record_usage
+
+# Most sets folded into one group commit
+MAX_BATCH_SIZE = 200
+
+# Queued params end with (..., timestamp, timestamp_ms)
+INSERT_WEIGHTLIFTING = """
+    INSERT INTO weightlifting_set
+        (movement, equipment_type, weight, n_of_reps, timestamp, timestamp_ms)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_CARDIO = """
+    INSERT INTO cardio_set
+        (movement, equipment_type, distance, duration, power_output, timestamp, timestamp_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_queue: "queue.Queue[tuple]" = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _write_batch(db, batch):
+    """Write a batch of (insert, params, future) entries in one transaction."""
+    rows = [params for _, params, _ in batch]
+    weightlifting = [params for insert, params, _ in batch if insert is INSERT_WEIGHTLIFTING]
+    cardio = [params for insert, params, _ in batch if insert is INSERT_CARDIO]
+    # Names already in the vocabulary cache need no upsert at all
+    movements = [m for m in {row[0] for row in rows} if not vocabulary.has_movement(m)]
+    equipment = [e for e in {row[1] for row in rows} if not vocabulary.has_equipment(e)]
+
+    with transaction(db):
+        if movements:
+            db.executemany(
+                "INSERT OR IGNORE INTO movements (name) VALUES (?)",
+                [[m] for m in movements],
+            )
+        if equipment:
+            db.executemany(
+                "INSERT OR IGNORE INTO equipment_types (name) VALUES (?)",
+                [[e] for e in equipment],
+            )
+        if weightlifting:
+            db.executemany(INSERT_WEIGHTLIFTING, weightlifting)
+        if cardio:
+            db.executemany(INSERT_CARDIO, cardio)
+        refresh_sessions(db, min(row[-1] for row in rows), max(row[-1] for row in rows))
+        refresh_rollups(db, [rollup_key(row[0], row[-2]) for row in weightlifting])
+        refresh_cardio_rollups(db, [rollup_key(row[0], row[-2]) for row in cardio])
+        record_prs(db, [(row[0], row[2], row[3], row[-1]) for row in weightlifting])
+        # Usage ranks lifting suggestions and is counted from lifting sets only
+        usage = record_usage(db, [(row[0], row[1], row[-1]) for row in weightlifting])
+        bump_data_version(db)
+
+    vocabulary.add_movements(movements)
+    vocabulary.add_equipment(equipment)
+    vocabulary.update_usage(usage)
+
+
+def _run():
+    db = get_write_db()
+    while True:
+        batch = [_queue.get()]
+        # Everything that queued up while the last commit ran joins this one
+        while len(batch) < MAX_BATCH_SIZE:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            _write_batch(db, batch)
+        except Exception:
+            # Retry one by one so a single bad row only fails its own request
+            for entry in batch:
+                try:
+                    _write_batch(db, [entry])
+                except Exception as e:
+                    entry[2].set_exception(e)
+                else:
+                    entry[2].set_result(entry[1][-2])
+        else:
+            for _, params, future in batch:
+                future.set_result(params[-2])
+
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run, name="set-writer", daemon=True)
+            _writer.start()
+
+
+def _submit(insert: str, values: tuple) -> str:
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    future = Future()
+    _ensure_writer()
+    _queue.put((insert, (*values, format_timestamp(now), to_epoch_ms(now)), future))
+    return future.result()
+
+
+def log_weightlifting_set(
+    movement: str, equipment_type: str, weight: float, n_of_reps: int
+) -> str:
+    """
+    Durably log a set and return its timestamp.
+
+    Concurrent callers are coalesced by a single writer thread into one
+    transaction per batch, with movement and equipment upserts done as
+    INSERT OR IGNORE in the same batch. Returns once the batch is committed.
+    """
+    return _submit(INSERT_WEIGHTLIFTING, (movement, equipment_type, weight, n_of_reps))
+
+
+def log_cardio_set(
+    movement: str, equipment_type: str, distance: float, duration: float, power_output: float = 0
+) -> str:
+    """Durably log a cardio set and return its timestamp; batched like log_weightlifting_set."""
+    return _submit(INSERT_CARDIO, (movement, equipment_type, distance, duration, power_output))
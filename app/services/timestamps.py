@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def parse_timestamp(ts) -> datetime:
+    """Parse a stored timestamp into a naive UTC datetime."""
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def format_timestamp(ts: datetime) -> str:
+    """Format a datetime the way SQLite's CURRENT_TIMESTAMP does."""
+    return ts.isoformat(sep=" ")
+
+
+def to_epoch_ms(ts) -> int:
+    """
+    Milliseconds since the Unix epoch for a timestamp.
+
+    Sets store this next to the original text, so it is parsed once on write
+    and everything downstream compares and subtracts plain ints.
+    """
+    return (parse_timestamp(ts) - _EPOCH) // _MILLISECOND
+
+
+def from_epoch_ms(ms: int) -> datetime:
+    """The naive UTC datetime for an epoch-ms timestamp."""
+    return _EPOCH + ms * _MILLISECOND
@@ -0,0 +1,111 @@
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+
+from app.services.timestamps import format_timestamp, from_epoch_ms, parse_timestamp
+
+# Usage counted this many days ago weighs half as much as usage today
+USAGE_HALF_LIFE_DAYS = 30
+
+Pair = Tuple[str, str]
+
+
+def usage_score(set_count: int, last_used: datetime, now: datetime) -> float:
+    """Frecency: set count decayed by how long ago the pair was last logged."""
+    days = max((now - last_used).total_seconds() / 86400, 0)
+    return set_count * 0.5 ** (days / USAGE_HALF_LIFE_DAYS)
+
+
+def _read_usage(db, pairs: Iterable[Pair]) -> Dict[Pair, tuple]:
+    usage = {}
+    for movement, equipment_type in pairs:
+        row = db.execute(
+            """
+            SELECT set_count, last_used FROM movement_usage
+            WHERE movement = ? AND equipment_type = ?
+            """,
+            [movement, equipment_type],
+        ).fetchone()
+        usage[(movement, equipment_type)] = (
+            (row[0], parse_timestamp(row[1])) if row else (0, None)
+        )
+    return usage
+
+
+def record_usage(db, sets: Iterable[tuple]) -> Dict[Pair, tuple]:
+    """
+    Count newly inserted (movement, equipment_type, timestamp_ms) sets.
+
+    Returns the updated (set_count, last_used) of every touched pair.
+    """
+    totals: Dict[Pair, list] = {}
+    for movement, equipment_type, timestamp_ms in sets:
+        entry = totals.setdefault((movement, equipment_type), [0, timestamp_ms])
+        entry[0] += 1
+        entry[1] = max(entry[1], timestamp_ms)
+
+    db.executemany(
+        """
+        INSERT INTO movement_usage (movement, equipment_type, set_count, last_used)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (movement, equipment_type) DO UPDATE SET
+            set_count = set_count + excluded.set_count,
+            last_used = max(last_used, excluded.last_used)
+        """,
+        [
+            [m, e, count, format_timestamp(from_epoch_ms(last))]
+            for (m, e), (count, last) in totals.items()
+        ],
+    )
+    return _read_usage(db, totals)
+
+
+def refresh_usage(db, pairs: Iterable[Pair]) -> Dict[Pair, tuple]:
+    """
+    Recount pairs exactly after sets were edited or deleted.
+
+    Returns the updated (set_count, last_used) of every pair; pairs with no
+    sets left are removed and reported as (0, None).
+    """
+    pairs = set(pairs)
+    for movement, equipment_type in pairs:
+        row = db.execute(
+            """
+            SELECT count(*), max(timestamp_ms) FROM weightlifting_set
+            WHERE movement = ? AND equipment_type = ?
+            """,
+            [movement, equipment_type],
+        ).fetchone()
+        if row[0]:
+            db.execute(
+                """
+                INSERT OR REPLACE INTO movement_usage (movement, equipment_type, set_count, last_used)
+                VALUES (?, ?, ?, ?)
+                """,
+                [movement, equipment_type, row[0], format_timestamp(from_epoch_ms(row[1]))],
+            )
+        else:
+            db.execute(
+                "DELETE FROM movement_usage WHERE movement = ? AND equipment_type = ?",
+                [movement, equipment_type],
+            )
+    return _read_usage(db, pairs)
+
+
+def rebuild_usage(db):
+    """Recount every pair from the raw sets."""
+    db.execute("DELETE FROM movement_usage")
+    db.execute("""
+        INSERT INTO movement_usage (movement, equipment_type, set_count, last_used)
+        SELECT movement, equipment_type, count(*),
+               datetime(max(timestamp_ms) / 1000, 'unixepoch')
+        FROM weightlifting_set
+        GROUP BY movement, equipment_type
+    """)
+
+
+def load_usage(db) -> Dict[Pair, tuple]:
+    """All pairs with their (set_count, last_used)."""
+    rows = db.execute(
+        "SELECT movement, equipment_type, set_count, last_used FROM movement_usage"
+    ).fetchall()
+    return {(r[0], r[1]): (r[2], parse_timestamp(r[3])) for r in rows}
@@ -0,0 +1,181 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from app.config import VOCABULARY_REFRESH_SECONDS
+from app.database import get_db
+from app.services.autocomplete_index import AutocompleteIndex
+from app.services.usage import load_usage, usage_score
+
+_lock = threading.Lock()
+_movements = AutocompleteIndex()
+_equipment = AutocompleteIndex()
+# movement -> equipment_type -> (set_count, last_used)
+_usage: Dict[str, Dict[str, tuple]] = {}
+# equipment_type -> (set_count, last_used) summed over movements
+_equipment_usage: Dict[str, tuple] = {}
+_loaded_at = None
+# Writes recorded while a load reads the database, replayed onto what it read
+_replay: Optional[list] = None
+
+# One worker, so stale caches are reloaded once at a time and off the
+# request path, over a connection the worker keeps
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vocabulary")
+_reload: Optional[Future] = None
+
+
+def load_vocabulary(db):
+    """(Re)load the movement and equipment vocabularies from the database."""
+    global _movements, _equipment, _usage, _equipment_usage, _loaded_at, _replay
+    with _lock:
+        _replay = []
+    movements = AutocompleteIndex(
+        row[0] for row in db.execute("SELECT name FROM movements").fetchall()
+    )
+    equipment = AutocompleteIndex(
+        row[0] for row in db.execute("SELECT name FROM equipment_types").fetchall()
+    )
+    usage = {}
+    for (movement, equipment_type), stats in load_usage(db).items():
+        usage.setdefault(movement, {})[equipment_type] = stats
+    equipment_usage = {
+        equipment_type: _total_usage(usage, equipment_type)
+        for equipment_type in {e for by_equipment in usage.values() for e in by_equipment}
+    }
+    with _lock:
+        _movements, _equipment = movements, equipment
+        _usage, _equipment_usage = usage, equipment_usage
+        for apply, args in _replay:
+            apply(*args)
+        _replay = None
+        _loaded_at = time.monotonic()
+
+
+def _total_usage(usage: Dict[str, Dict[str, tuple]], equipment_type: str) -> tuple:
+    stats = [
+        by_equipment[equipment_type]
+        for by_equipment in usage.values()
+        if equipment_type in by_equipment
+    ]
+    return (sum(s[0] for s in stats), max(s[1] for s in stats)) if stats else (0, None)
+
+
+def _ensure_fresh():
+    """
+    Reload when the cache is older than VOCABULARY_REFRESH_SECONDS.
+
+    Only a cache that was never loaded is loaded in line. A stale one is
+    reloaded in the background and swapped in when done; requests keep
+    searching the current one meanwhile. Names written through this process
+    are added immediately; names added by other workers sharing the replica
+    show up after at most one refresh. A failed reload is retried by the
+    next request.
+    """
+    global _reload
+    if _loaded_at is None:
+        load_vocabulary(get_db())
+    elif time.monotonic() - _loaded_at > VOCABULARY_REFRESH_SECONDS:
+        with _lock:
+            if _reload is None or _reload.done():
+                _reload = _executor.submit(_reload_vocabulary)
+
+
+def _reload_vocabulary():
+    load_vocabulary(get_db())
+
+
+def _record(apply, *args):
+    """Apply a write to the cache, and again to a load that is reading the database."""
+    with _lock:
+        apply(*args)
+        if _replay is not None:
+            _replay.append((apply, args))
+
+
+def _add_movements(names: List[str]):
+    for name in names:
+        _movements.add(name)
+
+
+def _add_equipment(names: List[str]):
+    for name in names:
+        _equipment.add(name)
+
+
+def _update_usage(usage: Dict[tuple, tuple]):
+    for (movement, equipment_type), (set_count, last_used) in usage.items():
+        if set_count:
+            _usage.setdefault(movement, {})[equipment_type] = (set_count, last_used)
+        else:
+            _usage.get(movement, {}).pop(equipment_type, None)
+    for equipment_type in {pair[1] for pair in usage}:
+        _equipment_usage[equipment_type] = _total_usage(_usage, equipment_type)
+
+
+def add_movements(names: Iterable[str]):
+    """Record movements that were just written."""
+    _record(_add_movements, list(names))
+
+
+def add_equipment(names: Iterable[str]):
+    """Record equipment types that were just written."""
+    _record(_add_equipment, list(names))
+
+
+def update_usage(usage: Dict[tuple, tuple]):
+    """Apply (set_count, last_used) per (movement, equipment_type) after a write."""
+    _record(_update_usage, dict(usage))
+
+
+def _movement_rank(now: datetime):
+    def rank(movement: str) -> float:
+        return sum(
+            usage_score(count, last, now) for count, last in _usage.get(movement, {}).values()
+        )
+
+    return rank
+
+
+def _equipment_rank(movement: str, now: datetime):
+    pair_usage = _usage.get(movement, {})
+
+    def rank(equipment_type: str) -> tuple:
+        # Usage with the movement being logged first, then usage overall
+        pair = pair_usage.get(equipment_type)
+        overall = _equipment_usage.get(equipment_type)
+        return (
+            usage_score(*pair, now) if pair else 0.0,
+            usage_score(*overall, now) if overall and overall[0] else 0.0,
+        )
+
+    return rank
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def has_movement(name: str) -> bool:
+    _ensure_fresh()
+    return name in _movements
+
+
+def has_equipment(name: str) -> bool:
+    _ensure_fresh()
+    return name in _equipment
+
+
+def search_movements(q: str, limit: int = 10) -> List[str]:
+    """Movement suggestions for `q`, most frequently and recently used first."""
+    _ensure_fresh()
+    with _lock:
+        return _movements.search(q, limit, rank=_movement_rank(_now()))
+
+
+def search_equipment(q: str, movement: str = "", limit: int = 10) -> List[str]:
+    """Equipment suggestions for `q`, ranked by use with `movement` first."""
+    _ensure_fresh()
+    with _lock:
+        return _equipment.search(q, limit, rank=_equipment_rank(movement, _now()))
@@ -0,0 +1,18 @@
+from functools import lru_cache
+
+from fastapi.templating import Jinja2Templates
+
+# One environment (and template cache) shared by every router
+templates = Jinja2Templates(directory="app/templates")
+
+
+def render(template_name: str, context: dict) -> str:
+    """Render a template to a string; no request is needed."""
+    return templates.get_template(template_name).render(context)
+
+
+@lru_cache(maxsize=None)
+def render_tabs(active_tab: str) -> str:
+    """The tab bar as an out-of-band swap, rendered once per active tab."""
+    tabs = render("partials/tabs.html", {"active_tab": active_tab})
+    return f'<div id="tabs-container" hx-swap-oob="innerHTML">{tabs}</div>'
@@ -0,0 +1,138 @@
+"""
+p50/p99 request latency under concurrent mixed load.
+
+Runs the app in-process against a seeded local-first database and sends it
+requests at a fixed rate, whether or not earlier ones have finished, mixing
+history, day, chart, summary and autocomplete reads with set logging.
+`--mode before` serves every handler on the event loop, as before handlers
+ran in the threadpool; `--mode after` serves the app as it is.
+
+sqlite3 stands in for libsql_experimental (see benchmarks/stand_in.py), and
+each statement sleeps `--latency-ms` first.
+
+    uv run python -m benchmarks.concurrency --mode before
+    uv run python -m benchmarks.concurrency --mode after
+"""
+import argparse
+import asyncio
+import inspect
+import random
+import time
+from statistics import quantiles
+
+from benchmarks import stand_in
+
+
+def _on_event_loop(endpoint):
+    """Wrap a sync handler as a coroutine, so it blocks the loop like it used to."""
+
+    async def run(*args, **kwargs):
+        return endpoint(*args, **kwargs)
+
+    run.__signature__ = inspect.signature(endpoint)
+    return run
+
+
+def _serve_on_event_loop(app):
+    from fastapi.routing import APIRoute
+
+    for i, route in enumerate(app.router.routes):
+        if isinstance(route, APIRoute) and not inspect.iscoroutinefunction(route.endpoint):
+            app.router.routes[i] = APIRoute(
+                route.path,
+                _on_event_loop(route.endpoint),
+                methods=route.methods,
+                response_class=route.response_class,
+                name=route.name,
+            )
+
+
+def _requests(export: dict, rng: random.Random):
+    """Endless (kind, method, url, form) tuples in the benchmark's mix."""
+    lifting = export["weightliftingSets"]
+    while True:
+        row = rng.choice(lifting)
+        movement, equipment, day = row["movement"], row["equipmentType"], row["timestamp"][:10]
+        roll = rng.random()
+        if roll < 0.3:
+            yield "history", "GET", f"/api/visualizer/search?movement={movement}&equipment={equipment}", None
+        elif roll < 0.5:
+            yield "day", "GET", f"/api/visualizer/day?movement={movement}&date={day}", None
+        elif roll < 0.6:
+            yield "chart", "GET", f"/api/visualizer/chart?movement={movement}", None
+        elif roll < 0.7:
+            yield "summary", "GET", "/api/summary", None
+        elif roll < 0.9:
+            yield "autocomplete", "GET", f"/api/autocomplete/movements?movement={movement[:2]}", None
+        else:
+            form = {"movement": movement, "equipment_type": equipment, "weight": "60", "n_of_reps": "5"}
+            yield "log set", "POST", "/api/exercises/weightlifting", form
+
+
+async def _request(http, request, scheduled: float, latencies: dict):
+    kind, method, url, form = request
+    response = await http.request(method, url, data=form)
+    response.raise_for_status()
+    # From when the request was due, so time spent waiting on a blocked loop counts
+    latencies.setdefault(kind, []).append(time.perf_counter() - scheduled)
+
+
+def _report(latencies: dict):
+    print(f"{'request':<14}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    every = [value for values in latencies.values() for value in values]
+    for kind, values in sorted(latencies.items()) + [("all", every)]:
+        cuts = quantiles(values, n=100) if len(values) > 1 else values * 99
+        print(f"{kind:<14}{len(values):>8}{cuts[49] * 1000:>10.1f}{cuts[98] * 1000:>10.1f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("before", "after"), default="after")
+    parser.add_argument("--rate", type=float, default=60, help="requests per second")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--sets", type=int, default=20000)
+    parser.add_argument("--latency-ms", type=float, default=3)
+    args = parser.parse_args()
+
+    stand_in.install()
+
+    import httpx
+
+    from app.database import connect as connect_db
+    from app.main import app
+    from app.migrations import run_migrations
+    from app.services.importer import import_export
+    from tests.helpers import make_export
+
+    export = make_export(args.sets)
+    db = connect_db()
+    run_migrations(db)
+    import_export(db, export)
+    db.close()
+
+    if args.mode == "before":
+        _serve_on_event_loop(app)
+    stand_in.LATENCY_SECONDS = args.latency_ms / 1000
+    latencies = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            requests = _requests(export, random.Random(1))
+            tasks = []
+            started = time.perf_counter()
+            for i in range(int(args.rate * args.seconds)):
+                scheduled = started + i / args.rate
+                await asyncio.sleep(scheduled - time.perf_counter())
+                tasks.append(
+                    asyncio.create_task(_request(http, next(requests), scheduled, latencies))
+                )
+            await asyncio.gather(*tasks)
+
+    print(
+        f"mode={args.mode} rate={args.rate:g}/s sets={args.sets} latency={args.latency_ms}ms"
+    )
+    _report(latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
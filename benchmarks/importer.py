@@ -0,0 +1,98 @@
+"""
+Import throughput (rows/sec) of a generated Flutter export.
+
+`--mode before` inserts the export one statement per row in autocommit
+mode, as the import handler used to; `--mode after` runs import_export (one
+transaction, executemany batches and the derived tables refreshed once) and
+`--mode batched` runs import_stream with a transaction per batch, as
+background imports do.
+
+sqlite3 stands in for libsql_experimental (see benchmarks/stand_in.py), and
+each statement sleeps `--latency-ms` first.
+
+    uv run python -m benchmarks.importer --mode before
+    uv run python -m benchmarks.importer --mode after
+    uv run python -m benchmarks.importer --mode batched
+"""
+import argparse
+import io
+import json
+import time
+
+from benchmarks import stand_in
+
+
+def _import_row_by_row(db, export: dict):
+    db.isolation_level = None
+    for item in export["weightliftingSets"]:
+        db.execute(
+            """
+            INSERT INTO weightlifting_set (movement, equipment_type, timestamp, n_of_reps, weight)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                item["movement"].lower().strip(),
+                item["equipmentType"].lower().strip(),
+                item["timestamp"],
+                item["nOfReps"],
+                item["weight"],
+            ],
+        )
+    for item in export["cardioSets"]:
+        db.execute(
+            """
+            INSERT INTO cardio_set (movement, equipment_type, timestamp, distance, duration, power_output)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                item["movement"].lower().strip(),
+                item["equipmentType"].lower().strip(),
+                item["timestamp"],
+                item["distance"],
+                item["duration"],
+                item.get("powerOutput", 0),
+            ],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=("before", "after", "batched"), default="after")
+    parser.add_argument("--sets", type=int, default=100000, help="lifting sets (every 7th adds a cardio set)")
+    parser.add_argument("--latency-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    stand_in.install()
+
+    from app.database import connect
+    from app.migrations import run_migrations
+    from app.services.importer import import_export, import_stream
+    from tests.helpers import make_export
+
+    export = make_export(args.sets)
+    rows = len(export["weightliftingSets"]) + len(export["cardioSets"])
+    db = connect()
+    run_migrations(db)
+
+    stand_in.LATENCY_SECONDS = args.latency_ms / 1000
+    started = time.perf_counter()
+    if args.mode == "before":
+        _import_row_by_row(db, export)
+    elif args.mode == "after":
+        import_export(db, export)
+    else:
+        import_stream(db, io.BytesIO(json.dumps(export).encode()), batched=True)
+    elapsed = time.perf_counter() - started
+
+    stand_in.LATENCY_SECONDS = 0
+    stored = sum(
+        db.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+        for table in ("weightlifting_set", "cardio_set")
+    )
+    assert stored == rows, (stored, rows)
+    print(f"mode={args.mode} rows={rows} latency={args.latency_ms}ms")
+    print(f"{elapsed:.2f} s, {rows / elapsed:,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
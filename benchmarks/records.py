@@ -0,0 +1,116 @@
+"""
+Memory and time per request of set rows held as dicts vs tuple records.
+
+Every set is read back with WEIGHTLIFTING_COLUMNS / CARDIO_COLUMNS and kept
+either as a dict per row, as get_edit_modal and the History search used to
+build them, or as WeightliftingRow / CardioRow records. Lifting sets are
+then grouped by day the way History did, with dict lookups or with
+summarize_days. tracemalloc reports what the rows hold once built and the
+peak while grouping; times are the best of `--runs` without tracemalloc.
+
+    uv run python -m benchmarks.records --sets 100000
+"""
+import argparse
+import tracemalloc
+
+from benchmarks import stand_in
+from benchmarks.timestamps import _best_of
+
+
+def _summarize_dicts(sets):
+    by_date = {}
+    for s in sets:
+        by_date.setdefault(s["timestamp"][:10], []).append(s)
+
+    days = []
+    for day, day_sets in sorted(by_date.items(), reverse=True):
+        day_sets.sort(key=lambda s: s["timestamp_ms"], reverse=True)
+        total_weight, bodyweight_reps = 0.0, 0
+        for s in day_sets:
+            equipment = s["equipment_type"].lower()
+            if equipment == "bodyweight":
+                bodyweight_reps += s["n_of_reps"]
+            elif equipment == "dumbbell":
+                total_weight += s["weight"] * s["n_of_reps"] * 2
+            else:
+                total_weight += s["weight"] * s["n_of_reps"]
+        days.append(
+            {
+                "date": day,
+                "movement": day_sets[0]["movement"],
+                "total_weight": total_weight,
+                "bodyweight_reps": bodyweight_reps,
+                "first_ms": day_sets[-1]["timestamp_ms"],
+                "last_ms": day_sets[0]["timestamp_ms"],
+                "set_count": len(day_sets),
+                "sets": day_sets,
+            }
+        )
+    return days
+
+
+def _measure(build, summarize=None):
+    """(held KiB, peak KiB) of building the rows and then grouping them."""
+    tracemalloc.start()
+    rows = build()
+    held = tracemalloc.get_traced_memory()[0]
+    if summarize:
+        summarize(rows)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return held / 1024, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sets", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    stand_in.install()
+
+    from app.database import connect
+    from app.migrations import run_migrations
+    from app.models.records import CARDIO_COLUMNS, WEIGHTLIFTING_COLUMNS, CardioRow, WeightliftingRow
+    from app.services.aggregation import summarize_days
+    from app.services.importer import import_export
+    from tests.helpers import make_export
+
+    db = connect()
+    run_migrations(db)
+    import_export(db, make_export(args.sets))
+
+    cases = []
+    for table, columns, record, summarize in (
+        ("weightlifting_set", WEIGHTLIFTING_COLUMNS, WeightliftingRow, summarize_days),
+        ("cardio_set", CARDIO_COLUMNS, CardioRow, None),
+    ):
+        rows = db.execute(f"SELECT {columns} FROM {table}").fetchall()
+        keys = columns.split(", ")
+        cases += [
+            (f"{table} dicts", rows, lambda rows=rows, keys=keys: [dict(zip(keys, row)) for row in rows],
+             summarize and _summarize_dicts),
+            (f"{table} records", rows, lambda rows=rows, record=record: [record._make(row) for row in rows],
+             summarize),
+        ]
+
+    # Same days and totals either way
+    dicts, records = cases[0][2](), cases[1][2]()
+    assert [(d["date"], d["total_weight"], d["set_count"]) for d in _summarize_dicts(dicts)] == [
+        (d["date"], d["total_weight"], d["set_count"]) for d in summarize_days(records)
+    ]
+    del dicts, records
+
+    print(f"best of {args.runs}")
+    print(f"{'':<28}{'rows':>8}{'held KiB':>10}{'B/row':>7}{'peak KiB':>10}{'ms':>8}")
+    for name, rows, build, summarize in cases:
+        held, peak = _measure(build, summarize)
+        elapsed = _best_of(args.runs, lambda: summarize(build()) if summarize else build())
+        print(
+            f"{name:<28}{len(rows):>8}{held:>10.0f}{held * 1024 / len(rows):>7.0f}"
+            f"{peak:>10.0f}{elapsed * 1000:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+sqlite3 in place of libsql_experimental, so benchmarks need no Turso database.
+
+Each statement sleeps LATENCY_SECONDS first, standing in for the I/O of a
+replica whose pages are not all cached.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import types
+
+LATENCY_SECONDS = 0.0
+
+
+class Connection(sqlite3.Connection):
+    def sync(self):
+        """A plain database has nothing to pull, unlike an embedded replica."""
+
+    def execute(self, *args):
+        time.sleep(LATENCY_SECONDS)
+        return super().execute(*args)
+
+    def executemany(self, *args):
+        time.sleep(LATENCY_SECONDS)
+        return super().executemany(*args)
+
+
+def connect(database, sync_url=None, auth_token=None):
+    return sqlite3.connect(database, factory=Connection, check_same_thread=False)
+
+
+def install():
+    """Run the app in local-first mode on a fresh database in a temporary directory."""
+    directory = tempfile.mkdtemp()
+    os.environ.update(
+        LOCAL_FIRST="1",
+        LOCAL_DATABASE_PATH=os.path.join(directory, "local.db"),
+        SYNC_UPSTREAM_PATH=os.path.join(directory, "upstream.db"),
+    )
+    sys.modules["libsql_experimental"] = types.SimpleNamespace(connect=connect)
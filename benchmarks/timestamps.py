@@ -0,0 +1,105 @@
+"""
+Day aggregation and session detection on epoch-ms ints vs re-parsed ISO text.
+
+Both paths run in memory over the same WeightliftingRow records (half of
+them stored with a 'T' separator, half with a space). The parsing path is
+the one before timestamps were stored as epoch ms: every row's text is
+parsed to group it by day, again in the sort key, again for a day's
+elapsed time, and once more to split sessions. The int path is the app's
+summarize_days / format_elapsed and sessions._iter_sessions.
+
+    uv run python -m benchmarks.timestamps --sets 100000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from app.models.records import WeightliftingRow
+from app.services.aggregation import calculate_total_weight, format_elapsed, summarize_days
+from app.services.sessions import WORKOUT_SESSION_THRESHOLD, _iter_sessions
+from app.services.timestamps import to_epoch_ms
+from tests.helpers import make_export
+
+
+def _parse(ts: str) -> datetime:
+    return datetime.fromisoformat(ts.replace("Z", "+00:00"))
+
+
+def _days_parsing(sets):
+    by_date = {}
+    for s in sets:
+        by_date.setdefault(_parse(s.timestamp).strftime("%Y-%m-%d"), []).append(s)
+
+    days = []
+    for day, day_sets in sorted(by_date.items(), reverse=True):
+        day_sets.sort(key=lambda s: _parse(s.timestamp), reverse=True)
+        total_weight, bodyweight_reps = calculate_total_weight(day_sets)
+        elapsed = _parse(day_sets[0].timestamp) - _parse(day_sets[-1].timestamp)
+        days.append((day, total_weight, bodyweight_reps, len(day_sets), elapsed.seconds))
+    return days
+
+
+def _days_ints(sets):
+    return [
+        (d["date"], d["total_weight"], d["bodyweight_reps"], d["set_count"],
+         format_elapsed(d["first_ms"], d["last_ms"]))
+        for d in summarize_days(sets)
+    ]
+
+
+def _sessions_parsing(sets):
+    sessions, session = [], []
+    for s in sorted(((_parse(s.timestamp), s) for s in sets), key=lambda p: p[0]):
+        if session and s[0] - session[-1][0] >= WORKOUT_SESSION_THRESHOLD:
+            sessions.append(session)
+            session = []
+        session.append(s)
+    return sessions + [session]
+
+
+def _sessions_ints(sets):
+    return list(_iter_sessions(sorted((s.timestamp_ms, s) for s in sets)))
+
+
+def _best_of(runs: int, call) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sets", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    sets = []
+    for i, item in enumerate(make_export(args.sets)["weightliftingSets"]):
+        timestamp = item["timestamp"] if i % 2 else item["timestamp"].replace("T", " ")
+        sets.append(
+            WeightliftingRow(
+                i, item["movement"], item["equipmentType"], timestamp,
+                to_epoch_ms(timestamp), item["nOfReps"], item["weight"],
+            )
+        )
+
+    # Same days, totals and sessions either way
+    assert [d[:4] for d in _days_parsing(sets)] == [d[:4] for d in _days_ints(sets)]
+    assert [len(s) for s in _sessions_parsing(sets)] == [len(s) for s in _sessions_ints(sets)]
+
+    print(f"sets={args.sets} best of {args.runs}")
+    print(f"{'':<20}{'parsing ms':>12}{'ints ms':>10}{'speedup':>9}")
+    for name, parsing, ints in (
+        ("days", _days_parsing, _days_ints),
+        ("sessions", _sessions_parsing, _sessions_ints),
+    ):
+        before = _best_of(args.runs, lambda: parsing(sets))
+        after = _best_of(args.runs, lambda: ints(sets))
+        print(f"{name:<20}{before * 1000:>12.1f}{after * 1000:>10.1f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Shared fixtures.
+
+Tests run against sqlite3 in place of libsql_experimental: it needs no
+network or replica, and follows the same DB-API implicit transactions (a
+write outside BEGIN opens a transaction holding the write lock until
+committed), which is what the locking tests exercise.
+"""
+import sqlite3
+import sys
+import threading
+import types
+
+import pytest
+
+
+class Connection(sqlite3.Connection):
+    def sync(self):
+        """A plain database has nothing to pull, unlike an embedded replica."""
+
+
+def connect(database, sync_url=None, auth_token=None):
+    return sqlite3.connect(database, factory=Connection, check_same_thread=False)
+
+
+sys.modules["libsql_experimental"] = types.SimpleNamespace(connect=connect)
+
+from app import database  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Point get_db() (in every thread) at a fresh local-first database file."""
+    path = str(tmp_path / "local.db")
+    monkeypatch.setattr(database, "LOCAL_FIRST", True)
+    monkeypatch.setattr(database, "LOCAL_DATABASE_PATH", path)
+    monkeypatch.setattr(database, "_local", threading.local())
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    """The calling thread's connection to a migrated database."""
+    db = database.get_db()
+    run_migrations(db)
+    return db
@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta
+
+MOVEMENTS = ["bench press", "squat", "deadlift", "pull up", "curl"]
+EQUIPMENT = ["barbell", "dumbbell", "bodyweight", "machine"]
+
+# Every derived table, in a comparable order
+DERIVED_QUERIES = {
+    "sessions": "SELECT start_ms, end_ms, set_count FROM workout_session ORDER BY start_ms",
+    "session_movements": """
+        SELECT s.start_ms, m.movement, round(m.total_weight, 6), m.set_count
+        FROM workout_session_movement m JOIN workout_session s ON s.id = m.session_id
+        ORDER BY 1, 2
+    """,
+    "session_cardio": """
+        SELECT s.start_ms, c.movement, round(c.distance, 6), c.duration, c.set_count
+        FROM workout_session_cardio c JOIN workout_session s ON s.id = c.session_id
+        ORDER BY 1, 2
+    """,
+    "daily": """
+        SELECT movement, date, round(total_weight, 6), bodyweight_reps, first_ms, last_ms,
+               set_count, round(e1rm_epley, 6), top_weight
+        FROM daily_movement_rollup ORDER BY 1, 2
+    """,
+    "weekly": """
+        SELECT movement, week, round(total_weight, 6), set_count
+        FROM weekly_movement_rollup ORDER BY 1, 2
+    """,
+    "cardio": "SELECT * FROM daily_cardio_rollup ORDER BY movement, date",
+    "daily_equipment": """
+        SELECT movement, equipment_type, date, round(total_weight, 6), bodyweight_reps,
+               first_ms, last_ms, set_count, round(e1rm_epley, 6), top_weight
+        FROM daily_equipment_rollup ORDER BY 1, 2, 3
+    """,
+    "cardio_equipment": "SELECT * FROM daily_cardio_equipment_rollup ORDER BY 1, 2, 3",
+    "usage": "SELECT movement, equipment_type, set_count FROM movement_usage ORDER BY 1, 2",
+    "records": "SELECT movement, min_reps, weight, timestamp_ms FROM movement_pr ORDER BY 1, 2",
+}
+
+
+def make_export(n_sets: int, seed: int = 1, start: datetime = datetime(2024, 1, 1, 6)) -> dict:
+    """A Flutter-style export of `n_sets` lifting sets (and every 7th as cardio), oldest first."""
+    rng = random.Random(seed)
+    t = start
+    lifting, cardio = [], []
+    for i in range(n_sets):
+        t += timedelta(minutes=rng.choice([1, 2, 3, 5, 180, 1500]), seconds=rng.randint(0, 59))
+        lifting.append(
+            {
+                "movement": rng.choice(MOVEMENTS),
+                "equipmentType": rng.choice(EQUIPMENT),
+                "timestamp": t.isoformat(),
+                "nOfReps": rng.randint(1, 12),
+                "weight": float(rng.randint(0, 300)),
+            }
+        )
+        if i % 7 == 0:
+            cardio.append(
+                {
+                    "movement": "row",
+                    "equipmentType": "machine",
+                    "timestamp": (t + timedelta(seconds=30)).isoformat(),
+                    "distance": 1.5,
+                    "duration": 600,
+                    "powerOutput": rng.choice([0, 180]),
+                }
+            )
+    return {"weightliftingSets": lifting, "cardioSets": cardio}
+
+
+def derived_state(db) -> dict:
+    return {name: db.execute(sql).fetchall() for name, sql in DERIVED_QUERIES.items()}
+
+
+def query_plans(db, call) -> list:
+    """Run `call()` and return (sql, EXPLAIN QUERY PLAN details) for every statement it ran."""
+    statements = []
+    db.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.set_trace_callback(None)
+    return [
+        (sql, [row[3] for row in db.execute("EXPLAIN QUERY PLAN " + sql).fetchall()])
+        for sql in statements
+    ]
+
+
+def assert_indexed(plans: list):
+    """Every statement only searches indexes: no table scans and no temporary sort b-trees."""
+    assert plans
+    for sql, details in plans:
+        # Reading back a subquery's already bounded rows is fine
+        slow = [
+            detail
+            for detail in details
+            if (detail.startswith("SCAN") and not detail.startswith("SCAN (subquery"))
+            or "TEMP B-TREE" in detail
+        ]
+        assert not slow, f"{sql}\n{details}"
@@ -0,0 +1,175 @@
+import math
+from concurrent.futures import Future
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.analytics import (
+    BRZYCKI_SQL,
+    EPLEY_SQL,
+    brzycki,
+    chart_series,
+    epley,
+    fetch_prs,
+    lttb,
+    record_prs,
+    refresh_prs,
+)
+from app.services.set_writer import INSERT_WEIGHTLIFTING, _write_batch
+from app.services.timestamps import from_epoch_ms
+
+DAY_MS = 86400000
+
+
+def _log(db, *sets):
+    """Log (movement, weight, n_of_reps, timestamp_ms) sets through the set writer."""
+    batch = []
+    for movement, weight, reps, timestamp_ms in sets:
+        timestamp = from_epoch_ms(timestamp_ms).isoformat(sep=" ")
+        params = (movement, "barbell", weight, reps, timestamp, timestamp_ms)
+        batch.append((INSERT_WEIGHTLIFTING, params, Future()))
+    _write_batch(db, batch)
+
+
+def _records(db, movement):
+    return {
+        pr["min_reps"]: (pr["weight"], pr["n_of_reps"], pr["achieved"])
+        for pr in fetch_prs(db, movement)
+    }
+
+
+@pytest.mark.parametrize(
+    "weight, reps, want_epley, want_brzycki",
+    [
+        (100.0, 1, 100.0, 100.0),
+        (100.0, 10, 100 * (1 + 10 / 30), 100 * 36 / 27),
+        (100.0, 36, 100 * (1 + 36 / 30), 3600.0),
+        # Brzycki is undefined from 37 reps on
+        (100.0, 37, 100 * (1 + 37 / 30), None),
+        # Bodyweight sets and empty sets have no estimate
+        (0.0, 10, None, None),
+        (100.0, 0, None, None),
+    ],
+)
+def test_estimated_one_rep_max(db, weight, reps, want_epley, want_brzycki):
+    assert epley(weight, reps) == pytest.approx(want_epley)
+    assert brzycki(weight, reps) == pytest.approx(want_brzycki)
+
+    # The rollup queries use the same formulas
+    row = db.execute(
+        f"SELECT {EPLEY_SQL}, {BRZYCKI_SQL} FROM (SELECT ? AS weight, ? AS n_of_reps)",
+        [weight, reps],
+    ).fetchone()
+    assert row == (pytest.approx(want_epley), pytest.approx(want_brzycki))
+
+
+def test_records_are_upserted_per_rep_range(db):
+    record_prs(db, [("bench", 100.0, 5, 1000), ("bench", 120.0, 1, 2000), ("bench", 90.0, 8, 3000)])
+    assert _records(db, "bench") == {
+        1: (120.0, 1, from_epoch_ms(2000)),
+        3: (100.0, 5, from_epoch_ms(1000)),
+        5: (100.0, 5, from_epoch_ms(1000)),
+        8: (90.0, 8, from_epoch_ms(3000)),
+    }
+
+    record_prs(
+        db,
+        [
+            # Raises the 3RM only; bodyweight sets never count
+            ("bench", 110.0, 3, 4000),
+            ("bench", 0.0, 20, 4000),
+            # A tie keeps the earlier record, unless the new set is older
+            ("bench", 90.0, 8, 5000),
+            ("bench", 100.0, 5, 500),
+        ],
+    )
+    assert _records(db, "bench") == {
+        1: (120.0, 1, from_epoch_ms(2000)),
+        3: (110.0, 3, from_epoch_ms(4000)),
+        5: (100.0, 5, from_epoch_ms(500)),
+        8: (90.0, 8, from_epoch_ms(3000)),
+    }
+
+
+def test_records_are_recounted_after_edit_and_delete(db):
+    _log(db, ("squat", 200.0, 5, DAY_MS), ("squat", 180.0, 5, 2 * DAY_MS), ("squat", 150.0, 1, 3 * DAY_MS))
+    assert _records(db, "squat")[5] == (200.0, 5, from_epoch_ms(DAY_MS))
+    top = db.execute("SELECT id FROM weightlifting_set WHERE weight = 200").fetchone()[0]
+
+    # Lowering the record falls back to the next best set
+    db.execute("UPDATE weightlifting_set SET weight = 170 WHERE id = ?", [top])
+    refresh_prs(db, ["squat"])
+    assert _records(db, "squat") == {
+        1: (180.0, 5, from_epoch_ms(2 * DAY_MS)),
+        3: (180.0, 5, from_epoch_ms(2 * DAY_MS)),
+        5: (180.0, 5, from_epoch_ms(2 * DAY_MS)),
+    }
+
+    # Moving a set to another movement recounts both
+    db.execute("UPDATE weightlifting_set SET movement = 'front squat' WHERE weight = 180")
+    refresh_prs(db, ["squat", "front squat"])
+    assert _records(db, "squat")[5] == (170.0, 5, from_epoch_ms(DAY_MS))
+    assert _records(db, "squat")[1] == (170.0, 5, from_epoch_ms(DAY_MS))
+    assert _records(db, "front squat")[5] == (180.0, 5, from_epoch_ms(2 * DAY_MS))
+
+    db.execute("DELETE FROM weightlifting_set WHERE movement = 'squat' AND n_of_reps = 5")
+    refresh_prs(db, ["squat"])
+    assert _records(db, "squat") == {1: (150.0, 1, from_epoch_ms(3 * DAY_MS))}
+
+    db.execute("DELETE FROM weightlifting_set WHERE movement = 'squat'")
+    refresh_prs(db, ["squat"])
+    assert _records(db, "squat") == {}
+
+
+def _wave(n):
+    return [(float(x), math.sin(x / 7) * 100 + x) for x in range(n)]
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 200), (1000, 3), (201, 200), (10, 7), (5000, 137)])
+def test_lttb_keeps_endpoints_and_returns_threshold_points(n, threshold):
+    points = _wave(n)
+    sampled = lttb(points, threshold)
+    assert len(sampled) == threshold
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    # A subset of the input, still in x order
+    assert set(sampled) <= set(points)
+    assert [p[0] for p in sampled] == sorted({p[0] for p in sampled})
+
+
+@pytest.mark.parametrize("n, threshold", [(0, 200), (1, 200), (150, 200), (200, 200)])
+def test_lttb_returns_short_series_unchanged(n, threshold):
+    points = _wave(n)
+    assert lttb(points, threshold) == points
+
+
+def test_lttb_keeps_a_peak():
+    points = [(float(x), 100.0) for x in range(1000)]
+    points[437] = (437.0, 500.0)
+    assert (437.0, 500.0) in lttb(points, 20)
+    # Below three points only the endpoints remain
+    assert lttb(points, 2) == [points[0], points[-1]]
+
+
+def test_chart_series_is_oldest_first_and_bounded():
+    first = date(2024, 1, 1)
+    days = [
+        {
+            "date": (first + timedelta(days=i)).isoformat(),
+            "total_weight": 1000.0 + i,
+            # Bodyweight-only days have no top set
+            "top_weight": None if i % 3 == 0 else 100.0 + i,
+        }
+        for i in range(500)
+    ]
+    series = chart_series(reversed(days), points=50)
+    assert len(series["volume"]) == 50
+    assert series["volume"][0] == ["2024-01-01", 1000.0]
+    assert series["volume"][-1] == [(first + timedelta(days=499)).isoformat(), 1499.0]
+    assert len(series["top_weight"]) == 50
+    assert series["top_weight"][0] == ["2024-01-02", 101.0]
+    assert all(value is not None for _, value in series["top_weight"])
+
+    # Fewer days than points come back whole
+    few = chart_series(days[:10], points=50)
+    assert [d for d, _ in few["volume"]] == [d["date"] for d in days[:10]]
+    assert len(few["top_weight"]) == 6
@@ -0,0 +1,85 @@
+import pytest
+
+from app.services.autocomplete_index import AutocompleteIndex
+
+NAMES = ["press", "bench press", "overhead press", "leg press machine", "compress", "dress", "squat"]
+
+
+@pytest.fixture
+def index():
+    return AutocompleteIndex(NAMES)
+
+
+def test_tiers_come_prefix_word_prefix_substring_typo(index):
+    assert index.search("press") == [
+        "press",
+        # Word prefixes, by the word they match at
+        "bench press",
+        "overhead press",
+        "leg press machine",
+        "compress",
+        "dress",
+    ]
+
+
+def test_rank_orders_within_a_tier_only(index):
+    rank = {"compress": 100, "overhead press": 10, "bench press": 1}.get
+    assert index.search("press", rank=lambda name: rank(name, 0)) == [
+        "press",
+        "overhead press",
+        "bench press",
+        "leg press machine",
+        "compress",
+        "dress",
+    ]
+
+
+@pytest.mark.parametrize(
+    "q, tiers",
+    [
+        # One character: prefixes only; two add substrings; three add typos
+        ("p", 2),
+        ("pr", 3),
+        ("pre", 4),
+    ],
+)
+def test_short_queries_skip_substring_and_typo_tiers(index, q, tiers):
+    assert len(list(index.tiers(q))) == tiers
+
+
+def test_short_query_hits(index):
+    assert index.search("p") == ["press", "bench press", "overhead press", "leg press machine"]
+    assert index.search("ss") == [
+        "bench press", "compress", "dress", "leg press machine", "overhead press", "press",
+    ]
+    assert index.search("") == sorted(NAMES)
+    assert index.search("x") == []
+
+
+def test_substring_hits(index):
+    # Inside a word, not at a word start
+    assert index.search("mpre") == ["compress"]
+    assert index.search("ead pr") == ["overhead press"]
+
+
+def test_typo_hits(index):
+    assert index.search("bnch press")[0] == "bench press"
+    # Typo matches stay ordered by similarity, whatever their rank
+    assert index.search("bnch press", rank=lambda name: name == "press")[0] == "bench press"
+    assert index.search("sqat") == ["squat"]
+    assert index.search("zzzz") == []
+
+
+def test_limit(index):
+    assert index.search("press", limit=2) == ["press", "bench press"]
+
+
+def test_added_names_are_searchable_in_order(index):
+    index.add("push press")
+    index.add("press")
+    assert len(index) == len(NAMES) + 1
+    assert "push press" in index
+    assert index.search("press", limit=5) == [
+        "press", "bench press", "overhead press", "push press", "leg press machine",
+    ]
+    assert index.search("psh press")[0] == "push press"
@@ -0,0 +1,75 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import database
+from app.database import connect, transaction
+from tests import conftest
+
+
+def test_transaction_commits_pending_implicit_transaction(db):
+    # A write outside transaction() leaves an implicit transaction open
+    db.execute("INSERT INTO movements (name) VALUES (?)", ["pending"])
+    assert db.in_transaction
+
+    with transaction(db):
+        db.execute("INSERT INTO movements (name) VALUES (?)", ["inside"])
+
+    assert not db.in_transaction
+    other = connect()
+    names = {row[0] for row in other.execute("SELECT name FROM movements").fetchall()}
+    assert {"pending", "inside"} <= names
+    # The write lock was released
+    with transaction(other):
+        other.execute("INSERT INTO movements (name) VALUES (?)", ["other"])
+
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(ValueError):
+        with transaction(db):
+            db.execute("INSERT INTO movements (name) VALUES (?)", ["discarded"])
+            raise ValueError
+
+    assert not db.in_transaction
+    assert not db.execute("SELECT 1 FROM movements WHERE name = 'discarded'").fetchall()
+
+
+def test_replica_mode_writes_through_one_syncing_connection(tmp_path, monkeypatch):
+    opened, synced, active = [], [], []
+
+    class Replica(conftest.Connection):
+        def sync(self):
+            synced.append(self)
+
+    def connect(database, sync_url=None, auth_token=None):
+        opened.append((database, sync_url))
+        return sqlite3.connect(database, factory=Replica, check_same_thread=False)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database.libsql, "connect", connect)
+    monkeypatch.setattr(database, "LOCAL_FIRST", False)
+    monkeypatch.setattr(database, "TURSO_DATABASE_URL", "libsql://turso")
+    monkeypatch.setattr(database, "_local", threading.local())
+    monkeypatch.setattr(database, "_replica", None)
+    with transaction(database.get_write_db()) as db:
+        db.execute("CREATE TABLE logged (worker INTEGER, n INTEGER)")
+
+    def work(worker):
+        reader = database.get_db()
+        for n in range(5):
+            with transaction(database.get_write_db()) as db:
+                # Threads share the connection, one transaction at a time
+                active.append(worker)
+                db.execute("INSERT INTO logged VALUES (?, ?)", [worker, n])
+                assert active.pop() == worker and not active
+        return reader.execute("SELECT count(*) FROM logged WHERE worker = ?", [worker]).fetchall()
+
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(work, range(4))) == [[(5,)]] * 4
+
+    # One replica connection syncs and writes; every reader is a plain connection
+    assert opened[0] == (database.REPLICA_PATH, "libsql://turso")
+    assert opened[1:] == [(database.REPLICA_PATH, None)] * 4
+    assert synced == [database._replica]
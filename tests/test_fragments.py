@@ -0,0 +1,50 @@
+from concurrent.futures import Future
+from datetime import datetime
+
+from starlette.requests import Request
+
+from app import fragments
+from app.routers import workout_summary
+from app.services import fragment_cache, set_writer
+from app.services.timestamps import format_timestamp, to_epoch_ms
+
+
+def _request(etag: str = "") -> Request:
+    headers = [(b"if-none-match", etag.encode())] if etag else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def _log_set(db, movement: str):
+    now = datetime.now().replace(microsecond=0)
+    params = (movement, "barbell", 100.0, 5, format_timestamp(now), to_epoch_ms(now))
+    set_writer._write_batch(db, [(set_writer.INSERT_WEIGHTLIFTING, params, Future())])
+
+
+def test_etag_changes_with_the_build(db, monkeypatch):
+    response = fragments.cached_fragment(_request(), ("page",), lambda: "<p>old</p>")
+    etag = response.headers["etag"]
+    assert fragments.cached_fragment(_request(etag), ("page",), lambda: "").status_code == 304
+
+    # A deploy starts new processes, with new markup and an empty cache
+    monkeypatch.setattr(fragments, "BUILD_ID", "next deploy")
+    fragment_cache._clear()
+    response = fragments.cached_fragment(_request(etag), ("page",), lambda: "<p>new</p>")
+    assert response.status_code == 200
+    assert response.body == b"<p>new</p>"
+
+
+def test_summary_written_during_a_request_is_not_cached_as_current(db, monkeypatch):
+    fragment_cache._clear()
+    _log_set(db, "squat")
+    read_session = workout_summary.get_latest_session
+
+    def read_then_write(db):
+        # Another request logs a set right after this one read the session
+        session = read_session(db)
+        monkeypatch.setattr(workout_summary, "get_latest_session", read_session)
+        _log_set(db, "deadlift")
+        return session
+
+    monkeypatch.setattr(workout_summary, "get_latest_session", read_then_write)
+    assert b"deadlift" not in workout_summary.get_workout_summary(_request()).body.lower()
+    assert b"deadlift" in workout_summary.get_workout_summary(_request()).body.lower()
@@ -0,0 +1,54 @@
+import io
+import json
+import threading
+import time
+from concurrent.futures import Future
+
+from app import database
+from app.services import importer, set_writer
+from app.services.importer import import_export, import_stream
+from tests.helpers import derived_state, make_export
+
+
+def test_batched_import_matches_single_transaction(db, monkeypatch):
+    export = make_export(900)
+    import_export(db, export)
+    expected = derived_state(db)
+
+    for table in ("weightlifting_set", "cardio_set", "workout_session", "movement_pr", "movement_usage"):
+        db.execute(f"DELETE FROM {table}")
+    db.commit()
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 100)
+    result = import_stream(db, io.BytesIO(json.dumps(export).encode()), batched=True)
+
+    assert result.weightlifting_count == 900
+    assert derived_state(db) == expected
+
+
+class SlowStream(io.BytesIO):
+    def read(self, size=-1):
+        time.sleep(0.02)
+        return super().read(min(size, 4096))
+
+
+def test_writes_get_in_during_a_batched_import(db, db_path, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 200)
+    stream = SlowStream(json.dumps(make_export(6000)).encode())
+    first_batch = threading.Event()
+    importing = threading.Thread(
+        target=lambda: import_stream(
+            database.connect(), stream, lambda result: first_batch.set(), batched=True
+        )
+    )
+    importing.start()
+    assert first_batch.wait(10)
+
+    # The set writer's own connection, waiting at most 1s for the lock
+    writer = database.connect()
+    writer.execute("PRAGMA busy_timeout = 1000")
+    params = ("squat", "barbell", 100.0, 5, "2030-01-01 10:00:00", 1893492000000)
+    set_writer._write_batch(writer, [(set_writer.INSERT_WEIGHTLIFTING, params, Future())])
+
+    assert importing.is_alive()
+    importing.join()
+    assert db.execute("SELECT count(*) FROM weightlifting_set").fetchone()[0] == 6001
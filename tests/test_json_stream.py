@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+from app.services.json_stream import CHUNK_SIZE, iter_sections
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO that records how much was read and in how many calls."""
+
+    def __init__(self, data: bytes):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+
+DOCUMENT = {
+    "weightliftingSets": [
+        {"movement": "bench press", "weight": 135.5, "reps": 8, "rpe": -2.5e10},
+        {"movement": "squat \"deep\" café \U0001F600", "weight": 0, "reps": 1.25e-3},
+        {"ok": True, "no": False, "none": None, "nested": {"k": [1, [2, {}]]}},
+        12345,
+        -0.5,
+    ],
+    "skipped": {"a": 1},
+    "empty": [],
+    "cardioSets": [{"movement": "run", "distance": 3.1, "duration": 1800}],
+}
+
+
+def expected_items():
+    return [
+        (key, index, item)
+        for key, value in DOCUMENT.items()
+        if isinstance(value, list)
+        for index, item in enumerate(value)
+    ]
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_every_chunk_boundary_parses_like_json_loads(ensure_ascii):
+    # Small chunks cut literals, numbers, strings and escapes at every offset
+    data = json.dumps(DOCUMENT, ensure_ascii=ensure_ascii).encode()
+    for chunk_size in range(1, 24):
+        assert list(iter_sections(io.BytesIO(data), chunk_size)) == expected_items()
+
+
+def test_malformed_element_fails_without_reading_the_rest():
+    good = json.dumps({"movement": "squat", "weight": 100, "reps": 5})
+    data = ('{"weightliftingSets": [' + good + ", {\"movement\": tru3}, "
+            + ", ".join([good] * 50000) + "]}").encode()
+    stream = CountingStream(data)
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_sections(stream))
+    assert stream.tell() <= CHUNK_SIZE
+
+
+def test_large_element_is_read_in_growing_chunks():
+    data = json.dumps({"weightliftingSets": [{"note": "x" * 2_000_000}, 1]}).encode()
+    stream = CountingStream(data)
+
+    items = list(iter_sections(stream, chunk_size=1024))
+
+    assert [index for _, index, _ in items] == [0, 1]
+    # Doubling reads: about log2(2 MB / 1 KB) calls, not 2000
+    assert stream.reads < 20
@@ -0,0 +1,99 @@
+import ast
+import inspect
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import database, migrations
+from app.migrations import run_migrations
+from app.services.analytics import refresh_prs
+from app.services.rollups import rebuild_cardio_rollups, rebuild_rollups
+from app.services.sessions import rebuild_sessions
+from app.services.timestamps import to_epoch_ms
+from app.services.usage import rebuild_usage
+from tests.helpers import derived_state, make_export
+
+
+def _export() -> dict:
+    """An export ending in a tied record and gaps just either side of the session threshold."""
+    export = make_export(300)
+    t = datetime.fromisoformat(export["weightliftingSets"][-1]["timestamp"])
+    for minutes in (60, 119, 121):
+        t += timedelta(minutes=minutes)
+        export["weightliftingSets"].append(
+            {
+                "movement": "squat",
+                "equipmentType": "barbell",
+                "timestamp": t.isoformat(),
+                "nOfReps": 5,
+                "weight": 999.0,
+            }
+        )
+    return export
+
+
+def _insert_sets(db, export: dict, epoch_ms: bool):
+    """Raw sets the way a writer of that version stored them, in both timestamp spellings."""
+    for i, row in enumerate(export["weightliftingSets"]):
+        timestamp = row["timestamp"] if i % 2 else row["timestamp"].replace("T", " ")
+        db.execute(
+            """
+            INSERT INTO weightlifting_set (movement, equipment_type, weight, n_of_reps, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [row["movement"], row["equipmentType"], row["weight"], row["nOfReps"], timestamp],
+        )
+    for row in export["cardioSets"]:
+        db.execute(
+            """
+            INSERT INTO cardio_set (movement, equipment_type, distance, duration, power_output, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                row["movement"], row["equipmentType"], row["distance"], row["duration"],
+                row["powerOutput"], row["timestamp"],
+            ],
+        )
+    if epoch_ms:
+        for table in ("weightlifting_set", "cardio_set"):
+            rows = db.execute(f"SELECT id, timestamp FROM {table}").fetchall()
+            db.executemany(
+                f"UPDATE {table} SET timestamp_ms = ? WHERE id = ?",
+                [[to_epoch_ms(row[1]), row[0]] for row in rows],
+            )
+    db.commit()
+
+
+def _rebuild(db):
+    rebuild_sessions(db)
+    rebuild_rollups(db)
+    rebuild_cardio_rollups(db)
+    rebuild_usage(db)
+    movements = db.execute("SELECT DISTINCT movement FROM weightlifting_set").fetchall()
+    refresh_prs(db, [row[0] for row in movements])
+
+
+@pytest.mark.parametrize("version", [2, 4, 7, 10, 12, 14, 16, 17])
+def test_upgrade_fills_derived_tables_like_a_rebuild(db_path, monkeypatch, version):
+    db = database.get_db()
+    with monkeypatch.context() as m:
+        m.setattr(migrations, "MIGRATIONS", [mig for mig in migrations.MIGRATIONS if mig[0] <= version])
+        run_migrations(db)
+    _insert_sets(db, _export(), epoch_ms=version >= 6)
+
+    run_migrations(db)
+    upgraded = derived_state(db)
+    assert upgraded["sessions"] and upgraded["records"] and upgraded["daily_equipment"]
+
+    _rebuild(db)
+    assert upgraded == derived_state(db)
+
+
+def test_migrations_do_not_depend_on_services():
+    # Services follow the newest schema; a migration must keep doing what it
+    # did against the schema of its own version
+    tree = ast.parse(inspect.getsource(migrations))
+    imported = [
+        node.module for node in ast.walk(tree) if isinstance(node, ast.ImportFrom)
+    ] + [alias.name for node in ast.walk(tree) if isinstance(node, ast.Import) for alias in node.names]
+    assert not [name for name in imported if name.startswith("app.services")]
@@ -0,0 +1,79 @@
+"""The hot read paths stay bounded index searches as the tables grow."""
+import pytest
+
+from app.services.importer import import_export
+from app.services.rollups import (
+    fetch_cardio_day_sets,
+    fetch_cardio_rollups,
+    fetch_day_sets,
+    fetch_rollups,
+    refresh_cardio_rollups,
+    refresh_rollups,
+)
+from app.services.sessions import _iter_sets, refresh_sessions
+from app.services.timestamps import to_epoch_ms
+from tests.helpers import assert_indexed, make_export, query_plans
+
+DAY = "2024-01-05"
+DAY_MS = to_epoch_ms(DAY + " 00:00:00")
+
+
+@pytest.fixture
+def sets(db):
+    import_export(db, make_export(300))
+    return db
+
+
+def test_rollup_refresh(sets):
+    # DAY_TOTALS over one day, for the daily, per-equipment and weekly rows
+    assert_indexed(query_plans(sets, lambda: refresh_rollups(sets, [("squat", DAY)])))
+
+
+def test_rollup_span_refresh(sets):
+    # Enough days of one movement to re-total its whole span at once
+    days = [f"2024-01-{day:02d}" for day in range(1, 29)]
+    assert_indexed(query_plans(sets, lambda: refresh_rollups(sets, [("squat", d) for d in days])))
+    assert_indexed(
+        query_plans(sets, lambda: refresh_cardio_rollups(sets, [("row", d) for d in days]))
+    )
+
+
+def test_cardio_rollup_refresh(sets):
+    assert_indexed(query_plans(sets, lambda: refresh_cardio_rollups(sets, [("row", DAY)])))
+
+
+def test_day_sets(sets):
+    assert_indexed(query_plans(sets, lambda: fetch_day_sets(sets, "squat", DAY, "barbell")))
+    assert_indexed(query_plans(sets, lambda: fetch_cardio_day_sets(sets, "row", DAY)))
+
+
+def test_sets_in_time_order(sets):
+    # The weightlifting and cardio ranges are merged, never sorted
+    assert_indexed(query_plans(sets, lambda: list(_iter_sets(sets, DAY_MS, DAY_MS + 86400000))))
+
+
+def test_session_refresh(sets):
+    assert_indexed(
+        query_plans(sets, lambda: refresh_sessions(sets, DAY_MS, DAY_MS + 86400000))
+    )
+
+HISTORY_FILTERS = [
+    {},
+    {"equipment": "barbell"},
+    {"start": "2024-01-01", "end": "2024-03-31", "before": "2024-03-01"},
+    {"equipment": "machine", "start": "2024-01-01", "before": "2024-03-01"},
+]
+
+
+@pytest.mark.parametrize("filters", HISTORY_FILTERS)
+def test_history_pages(db, filters):
+    assert_indexed(
+        query_plans(db, lambda: fetch_rollups(db, ["squat", "curl"], limit=31, **filters))
+    )
+
+
+@pytest.mark.parametrize("filters", HISTORY_FILTERS)
+def test_cardio_history_pages(db, filters):
+    assert_indexed(
+        query_plans(db, lambda: fetch_cardio_rollups(db, ["row", "bike"], limit=31, **filters))
+    )
@@ -0,0 +1,29 @@
+from concurrent.futures import Future
+
+from app import database
+from app.migrations import run_migrations
+from app.services import replica_sync, set_writer
+
+
+def _log_set(db, timestamp: str, timestamp_ms: int):
+    params = ("squat", "barbell", 100.0, 5, timestamp, timestamp_ms)
+    set_writer._write_batch(db, [(set_writer.INSERT_WEIGHTLIFTING, params, Future())])
+
+
+def test_sets_can_be_logged_after_a_push(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "SYNC_UPSTREAM_PATH", str(tmp_path / "upstream.db"))
+    monkeypatch.setattr(database, "BUSY_TIMEOUT_MS", 100)
+    db = database.get_db()
+    run_migrations(db)
+    upstream = database.connect_upstream()
+    run_migrations(upstream)
+    replica_sync.seed(db, upstream)
+
+    # The sync thread pushes over its own connection, the set writer logs over another
+    syncing = database.connect()
+    _log_set(db, "2024-01-01 10:00:00", 1704103200000)
+    assert replica_sync.push_changes(syncing, upstream) == 1
+
+    _log_set(db, "2024-01-01 10:05:00", 1704103500000)
+    assert replica_sync._pending(syncing)[0] == 1
+    assert upstream.execute("SELECT count(*) FROM weightlifting_set").fetchone()[0] == 1
@@ -0,0 +1,67 @@
+from app.services.rollups import (
+    DAY_TOTALS,
+    ROLLUP_COLUMNS,
+    fetch_rollups,
+    rebuild_cardio_rollups,
+    rebuild_rollups,
+    refresh_cardio_rollups,
+    refresh_rollups,
+    rollup_key,
+)
+from app.services.importer import import_export
+from tests.helpers import EQUIPMENT, MOVEMENTS, derived_state, make_export
+
+
+def _totals_from_sets(db, movement, equipment):
+    rows = db.execute(
+        DAY_TOTALS.format(
+            where="WHERE movement = ? AND equipment_type = ?", equipment="", group="movement, date"
+        )
+        + " ORDER BY date DESC",
+        [movement, equipment],
+    ).fetchall()
+    return [dict(zip(ROLLUP_COLUMNS, row)) for row in rows]
+
+
+def test_equipment_history_counts_only_that_equipment(db):
+    import_export(db, make_export(600))
+    edited = db.execute(
+        "SELECT id, movement, timestamp FROM weightlifting_set ORDER BY id LIMIT 1"
+    ).fetchone()
+    db.execute("UPDATE weightlifting_set SET equipment_type = 'kettlebell' WHERE id = ?", [edited[0]])
+    refresh_rollups(db, [rollup_key(edited[1], edited[2])])
+
+    for movement in MOVEMENTS:
+        history = fetch_rollups(db, [movement], equipment="kettlebell")[movement]
+        assert history == _totals_from_sets(db, movement, "kettlebell")
+        for equipment in EQUIPMENT:
+            history = fetch_rollups(db, [movement], equipment=equipment)[movement]
+            assert history == _totals_from_sets(db, movement, equipment)
+
+
+def test_refreshed_rollups_match_a_rebuild(db):
+    import_export(db, make_export(600))
+    refreshed = derived_state(db)
+    rebuild_rollups(db)
+    rebuild_cardio_rollups(db)
+    assert derived_state(db) == refreshed
+
+
+def test_day_by_day_refresh_matches_a_span_refresh(db):
+    # The import touches enough days to re-total each movement's span at once
+    import_export(db, make_export(600))
+    spans = derived_state(db)
+
+    keys = db.execute(
+        "SELECT movement, date FROM daily_movement_rollup"
+        " UNION SELECT movement, date FROM daily_cardio_rollup"
+    ).fetchall()
+    for table in (
+        "daily_movement_rollup", "daily_equipment_rollup", "weekly_movement_rollup",
+        "daily_cardio_rollup", "daily_cardio_equipment_rollup",
+    ):
+        db.execute(f"DELETE FROM {table}")
+    for key in keys:
+        refresh_rollups(db, [key])
+        refresh_cardio_rollups(db, [key])
+    assert derived_state(db) == spans
@@ -0,0 +1,137 @@
+import pytest
+
+from app.services.sessions import rebuild_sessions, refresh_sessions
+from app.services.timestamps import from_epoch_ms
+from tests.helpers import derived_state
+
+MINUTE_MS = 60000
+T0 = 1704096000000  # 2024-01-01 08:00 UTC
+
+
+def _log(db, minutes: float, movement: str = "squat", weight: float = 100.0) -> int:
+    """Insert a five-rep set `minutes` after T0 and refresh the sessions around it."""
+    timestamp_ms = T0 + int(minutes * MINUTE_MS)
+    cursor = db.execute(
+        """
+        INSERT INTO weightlifting_set (movement, equipment_type, timestamp, timestamp_ms, n_of_reps, weight)
+        VALUES (?, 'barbell', ?, ?, 5, ?)
+        """,
+        [movement, from_epoch_ms(timestamp_ms).isoformat(sep=" "), timestamp_ms, weight],
+    )
+    refresh_sessions(db, timestamp_ms)
+    return cursor.lastrowid
+
+
+def _sessions(db):
+    """(start minute, end minute, set count, {movement: total weight}) per stored session."""
+    sessions = []
+    for session_id, start_ms, end_ms, set_count in db.execute(
+        "SELECT id, start_ms, end_ms, set_count FROM workout_session ORDER BY start_ms"
+    ).fetchall():
+        totals = dict(
+            db.execute(
+                "SELECT movement, total_weight FROM workout_session_movement WHERE session_id = ?",
+                [session_id],
+            ).fetchall()
+        )
+        sessions.append(
+            ((start_ms - T0) / MINUTE_MS, (end_ms - T0) / MINUTE_MS, set_count, totals)
+        )
+    return sessions
+
+
+def _assert_matches_rebuild(db):
+    refreshed = derived_state(db)
+    rebuild_sessions(db)
+    assert derived_state(db) == refreshed
+
+
+@pytest.fixture
+def two_sessions(db):
+    """Sessions at 0-30 and 240-270 minutes, four hours apart."""
+    for minutes in (0, 30, 240, 270):
+        _log(db, minutes)
+    assert [s[:3] for s in _sessions(db)] == [(0, 30, 2), (240, 270, 2)]
+    return db
+
+
+def test_set_in_the_gap_merges_sessions(two_sessions):
+    db = two_sessions
+    _log(db, 140, movement="bench", weight=60.0)
+    assert _sessions(db) == [(0, 270, 5, {"squat": 2000.0, "bench": 300.0})]
+    _assert_matches_rebuild(db)
+
+
+def test_deleting_the_bridging_set_splits_the_session(two_sessions):
+    db = two_sessions
+    bridge = _log(db, 140)
+    ms = db.execute(
+        "DELETE FROM weightlifting_set WHERE id = ? RETURNING timestamp_ms", [bridge]
+    ).fetchone()[0]
+    refresh_sessions(db, ms)
+    assert [s[:3] for s in _sessions(db)] == [(0, 30, 2), (240, 270, 2)]
+    _assert_matches_rebuild(db)
+
+
+def test_gap_of_exactly_the_threshold_splits(two_sessions):
+    db = two_sessions
+    _log(db, 150)
+    assert [s[:3] for s in _sessions(db)] == [(0, 30, 2), (150, 270, 3)]
+    _assert_matches_rebuild(db)
+
+
+def test_moving_a_set_across_the_boundary(two_sessions):
+    db = two_sessions
+    last = db.execute(
+        "SELECT id, timestamp_ms FROM weightlifting_set WHERE timestamp_ms = ?",
+        [T0 + 30 * MINUTE_MS],
+    ).fetchone()
+
+    # Moved from the end of the first session to the start of the second;
+    # the refresh spans its old and new time
+    moved_ms = T0 + 200 * MINUTE_MS
+    db.execute(
+        "UPDATE weightlifting_set SET timestamp_ms = ?, timestamp = ? WHERE id = ?",
+        [moved_ms, from_epoch_ms(moved_ms).isoformat(sep=" "), last[0]],
+    )
+    refresh_sessions(db, last[1], moved_ms)
+    assert [s[:3] for s in _sessions(db)] == [(0, 0, 1), (200, 270, 3)]
+    _assert_matches_rebuild(db)
+
+
+def test_editing_a_set_at_the_boundary_updates_its_session_only(two_sessions):
+    db = two_sessions
+    untouched = db.execute("SELECT id FROM workout_session ORDER BY start_ms").fetchone()
+    db.execute(
+        "UPDATE weightlifting_set SET movement = 'deadlift', weight = 140 WHERE timestamp_ms = ?",
+        [T0 + 240 * MINUTE_MS],
+    )
+    refresh_sessions(db, T0 + 240 * MINUTE_MS)
+    assert _sessions(db)[1] == (240, 270, 2, {"squat": 500.0, "deadlift": 700.0})
+    # The other session was outside the threshold and kept its row
+    assert db.execute("SELECT id FROM workout_session ORDER BY start_ms").fetchone() == untouched
+    _assert_matches_rebuild(db)
+
+
+@pytest.mark.parametrize(
+    "deleted, expected",
+    [
+        # The first or last set moves the session's bounds
+        (0, [(30, 30, 1), (240, 270, 2)]),
+        (270, [(0, 30, 2), (240, 240, 1)]),
+    ],
+)
+def test_deleting_a_set_at_the_edge(two_sessions, deleted, expected):
+    db = two_sessions
+    db.execute("DELETE FROM weightlifting_set WHERE timestamp_ms = ?", [T0 + deleted * MINUTE_MS])
+    refresh_sessions(db, T0 + deleted * MINUTE_MS)
+    assert [s[:3] for s in _sessions(db)] == expected
+    _assert_matches_rebuild(db)
+
+
+def test_deleting_a_sessions_only_set_removes_it(db):
+    _log(db, 0)
+    db.execute("DELETE FROM weightlifting_set")
+    refresh_sessions(db, T0)
+    assert _sessions(db) == []
+    assert db.execute("SELECT count(*) FROM workout_session_movement").fetchone() == (0,)
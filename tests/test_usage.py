@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import vocabulary
+from app.services.timestamps import to_epoch_ms
+from app.services.usage import USAGE_HALF_LIFE_DAYS, record_usage, refresh_usage, usage_score
+
+NOW = datetime(2024, 6, 1, 12)
+MOVEMENTS = ["tempo bench", "tempo curl", "tempo lunge", "tempo row", "tempo squat"]
+
+
+@pytest.fixture
+def usage(db, monkeypatch):
+    """Movements with no sets yet, loaded into the vocabulary at a fixed time."""
+    db.executemany("INSERT INTO movements (name) VALUES (?)", [[m] for m in MOVEMENTS])
+    db.commit()
+    monkeypatch.setattr(vocabulary, "_now", lambda: NOW)
+    vocabulary.load_vocabulary(db)
+    return db
+
+
+def _log(db, movement: str, equipment_type: str, days_ago: float = 0, count: int = 1):
+    """Insert sets like the set writer and apply their usage to the vocabulary."""
+    timestamp = (NOW - timedelta(days=days_ago)).isoformat(sep=" ")
+    sets = [(movement, equipment_type, to_epoch_ms(timestamp))] * count
+    db.executemany(
+        """
+        INSERT INTO weightlifting_set (movement, equipment_type, timestamp, timestamp_ms, n_of_reps, weight)
+        VALUES (?, ?, ?, ?, 5, 100)
+        """,
+        [[m, e, timestamp, ms] for m, e, ms in sets],
+    )
+    vocabulary.update_usage(record_usage(db, sets))
+
+
+def _assert_same_after_reload(db, search):
+    ranked = search()
+    vocabulary.load_vocabulary(db)
+    assert search() == ranked
+
+
+@pytest.mark.parametrize(
+    "set_count, days_ago, score",
+    [
+        (4, 0, 4.0),
+        (4, USAGE_HALF_LIFE_DAYS, 2.0),
+        (4, 2 * USAGE_HALF_LIFE_DAYS, 1.0),
+        # Clock skew never makes a pair score higher than its set count
+        (4, -1, 4.0),
+    ],
+)
+def test_usage_score_halves_every_half_life(set_count, days_ago, score):
+    assert usage_score(set_count, NOW - timedelta(days=days_ago), NOW) == pytest.approx(score)
+
+
+def test_movements_rank_by_frequency_and_recency(usage):
+    _log(usage, "tempo lunge", "barbell", days_ago=1, count=3)
+    # Four sets a half-life ago tie with two today
+    _log(usage, "tempo squat", "barbell", days_ago=USAGE_HALF_LIFE_DAYS, count=4)
+    _log(usage, "tempo bench", "barbell", count=2)
+    _log(usage, "tempo row", "machine")
+
+    # Ties and unused movements keep alphabetical order
+    assert vocabulary.search_movements("tempo") == [
+        "tempo lunge", "tempo bench", "tempo squat", "tempo row", "tempo curl",
+    ]
+    _assert_same_after_reload(usage, lambda: vocabulary.search_movements("tempo"))
+
+
+def test_equipment_ranks_by_use_with_the_movement_first(usage):
+    _log(usage, "tempo squat", "barbell", count=3)
+    _log(usage, "tempo squat", "kettlebell")
+    _log(usage, "tempo bench", "dumbbell", count=10)
+
+    # With the movement, then overall, then alphabetical
+    assert vocabulary.search_equipment("", "tempo squat") == [
+        "barbell", "kettlebell", "dumbbell", "bodyweight", "machine", "medicine ball",
+    ]
+    # A movement without usage falls back to overall usage
+    assert vocabulary.search_equipment("", "tempo row") == [
+        "dumbbell", "barbell", "kettlebell", "bodyweight", "machine", "medicine ball",
+    ]
+    _assert_same_after_reload(usage, lambda: vocabulary.search_equipment("", "tempo squat"))
+
+
+def test_ranking_follows_edits_and_deletes(usage):
+    _log(usage, "tempo squat", "barbell", count=3)
+    _log(usage, "tempo bench", "barbell", count=2)
+    assert vocabulary.search_movements("tempo")[:2] == ["tempo squat", "tempo bench"]
+
+    # Two squat sets become bench sets with dumbbells, as the edit handler recounts them
+    ids = [row[0] for row in usage.execute(
+        "SELECT id FROM weightlifting_set WHERE movement = 'tempo squat' LIMIT 2"
+    ).fetchall()]
+    usage.executemany(
+        "UPDATE weightlifting_set SET movement = 'tempo bench', equipment_type = 'dumbbell' WHERE id = ?",
+        [[i] for i in ids],
+    )
+    vocabulary.update_usage(
+        refresh_usage(usage, [("tempo squat", "barbell"), ("tempo bench", "dumbbell")])
+    )
+    assert vocabulary.search_movements("tempo")[:2] == ["tempo bench", "tempo squat"]
+    assert vocabulary.search_equipment("", "tempo bench")[:2] == ["barbell", "dumbbell"]
+    _assert_same_after_reload(usage, lambda: vocabulary.search_movements("tempo"))
+
+    # Deleting every bench set drops its usage, per pair and overall
+    usage.execute("DELETE FROM weightlifting_set WHERE movement = 'tempo bench'")
+    vocabulary.update_usage(
+        refresh_usage(usage, [("tempo bench", "barbell"), ("tempo bench", "dumbbell")])
+    )
+    assert vocabulary.search_movements("tempo") == [
+        "tempo squat", "tempo bench", "tempo curl", "tempo lunge", "tempo row",
+    ]
+    assert vocabulary.search_equipment("", "tempo bench")[:2] == ["barbell", "bodyweight"]
+    _assert_same_after_reload(usage, lambda: vocabulary.search_equipment("", "tempo bench"))
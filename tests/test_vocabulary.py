@@ -0,0 +1,40 @@
+import threading
+
+from app.services import vocabulary
+
+
+def test_stale_vocabulary_reloads_in_the_background(db, monkeypatch):
+    for name in ("tempo squat", "tempo bench"):
+        db.execute("INSERT INTO movements (name) VALUES (?)", [name])
+    db.commit()
+    vocabulary.load_vocabulary(db)
+
+    # A reload that takes as long as the test wants
+    reading, release = threading.Event(), threading.Event()
+    load_usage = vocabulary.load_usage
+
+    def slow_load_usage(db):
+        reading.set()
+        release.wait(5)
+        return load_usage(db)
+
+    monkeypatch.setattr(vocabulary, "load_usage", slow_load_usage)
+    monkeypatch.setattr(vocabulary, "VOCABULARY_REFRESH_SECONDS", 0)
+    db.execute("INSERT INTO movements (name) VALUES ('tempo lunge')")
+    db.commit()
+
+    # Requests keep searching the stale index and start a single reload
+    assert vocabulary.search_movements("tempo") == ["tempo bench", "tempo squat"]
+    assert reading.wait(5)
+    reload = vocabulary._reload
+    assert vocabulary.search_movements("tempo") == ["tempo bench", "tempo squat"]
+    assert vocabulary._reload is reload
+
+    # Names written while the reload was reading survive the swap
+    vocabulary.add_movements(["tempo row"])
+    release.set()
+    reload.result(5)
+    monkeypatch.setattr(vocabulary, "VOCABULARY_REFRESH_SECONDS", 60)
+    assert sorted(vocabulary.search_movements("tempo")) == [
+        "tempo bench", "tempo lunge", "tempo row", "tempo squat",
+    ]